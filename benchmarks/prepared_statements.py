@@ -0,0 +1,98 @@
+"""Compare the latency of short reads and writes with and without prepared statements.
+
+Usage:
+    python benchmarks/prepared_statements.py [--url URL] [--iterations N] [--rounds N]
+
+The two modes run in interleaved rounds, each on a fresh stream and connection.
+The change reported for an operation is the median of its per-round changes.
+
+The benchmark writes to dedicated streams, so it can run against a shared
+database; the messages it writes are left in place. Stream reads are not
+prepared, so their row shows the run-to-run noise.
+"""
+
+from __future__ import annotations
+
+import argparse
+import statistics
+import time
+from typing import Callable, Dict, List
+from uuid import uuid4
+
+from message_db.client import MessageDB
+
+DEFAULT_URL = "postgresql://message_store@localhost:5432/message_store"
+
+
+def measure(operation: Callable[[], object], iterations: int) -> List[float]:
+    """Return the latency of each call, in microseconds, after a warm-up."""
+    for _ in range(min(iterations, 100)):
+        operation()
+
+    latencies = []
+    for _ in range(iterations):
+        started = time.perf_counter()
+        operation()
+        latencies.append((time.perf_counter() - started) * 1_000_000)
+    return latencies
+
+
+def run(url: str, iterations: int, prepared: bool) -> Dict[str, float]:
+    """Return the median latency of each operation, in microseconds."""
+    client = MessageDB.from_url(url, max_connections=1, prepared_statements=prepared)
+    stream_name = f"benchmark-{uuid4().hex}"
+    try:
+        for i in range(10):
+            client.write(stream_name, "Benchmarked", {"i": i})
+
+        operations: Dict[str, Callable[[], object]] = {
+            "write": lambda: client.write(stream_name, "Benchmarked", {"i": 0}),
+            "read_stream (10 messages)": lambda: client.read_stream(
+                stream_name, no_of_messages=10
+            ),
+            "read_last_message": lambda: client.read_last_message(stream_name),
+            "stream_version": lambda: client.stream_version(stream_name),
+        }
+        return {
+            name: statistics.median(measure(operation, iterations))
+            for name, operation in operations.items()
+        }
+    finally:
+        client.connection_pool.closeall()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--url", default=DEFAULT_URL, help="Message DB URL")
+    parser.add_argument(
+        "--iterations", type=int, default=500, help="Calls per operation and round"
+    )
+    parser.add_argument(
+        "--rounds", type=int, default=10, help="Rounds of both modes, interleaved"
+    )
+    args = parser.parse_args()
+
+    plain: Dict[str, List[float]] = {}
+    prepared: Dict[str, List[float]] = {}
+    changes: Dict[str, List[float]] = {}
+    for index in range(args.rounds):
+        # Alternate which mode runs first, so that drift affects both alike
+        modes = [False, True] if index % 2 == 0 else [True, False]
+        results = {mode: run(args.url, args.iterations, mode) for mode in modes}
+        for operation, before in results[False].items():
+            after = results[True][operation]
+            plain.setdefault(operation, []).append(before)
+            prepared.setdefault(operation, []).append(after)
+            changes.setdefault(operation, []).append((after - before) / before)
+
+    print(f"{'operation':<28}{'plain p50':>12}{'prepared p50':>15}{'change':>10}")
+    for operation, round_changes in changes.items():
+        print(
+            f"{operation:<28}{statistics.median(plain[operation]):>10.0f}us"
+            f"{statistics.median(prepared[operation]):>13.0f}us"
+            f"{statistics.median(round_changes):>10.1%}"
+        )
+
+
+if __name__ == "__main__":
+    main()
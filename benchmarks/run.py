@@ -0,0 +1,358 @@
+"""Measure the throughput and latency of the client's write and read hot paths.
+
+Usage:
+    python benchmarks/run.py [--url URL] [--quick] [--only NAME] [--threads N]
+                             [--output results.json] [--compare baseline.json]
+
+Runs against any Postgres with Message DB installed, such as the image of
+`docker-compose.yml`. Each run writes to categories of its own, so it can use a
+shared database; the messages it writes are left in place.
+
+For each benchmark, the runner prints the messages written or read per second,
+and the p50 and p99 latency of a call. `--output` saves the results as JSON, and
+`--compare` prints the change from a saved run.
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import platform
+import statistics
+import sys
+import threading
+import time
+from datetime import datetime, timezone
+from functools import partial
+from typing import Any, Callable, Dict, List
+from uuid import uuid4
+
+import psycopg2
+
+from message_db import __version__
+from message_db.client import MessageDB
+
+DEFAULT_URL = "postgresql://message_store@localhost:5432/message_store"
+
+
+class Result:
+    """The latencies of the calls of one benchmark, and the messages they moved."""
+
+    def __init__(
+        self, name: str, latencies: List[float], messages: int, elapsed: float
+    ) -> None:
+        self.name = name
+        self.latencies = latencies
+        self.messages = messages
+        self.elapsed = elapsed
+
+    def to_dict(self) -> Dict[str, Any]:
+        latencies = sorted(self.latencies)
+        return {
+            "name": self.name,
+            "calls": len(latencies),
+            "messages": self.messages,
+            "seconds": round(self.elapsed, 6),
+            "messages_per_second": round(self.messages / self.elapsed, 1),
+            "p50_ms": round(statistics.median(latencies) * 1000, 3),
+            "p99_ms": round(percentile(latencies, 0.99) * 1000, 3),
+        }
+
+
+def percentile(values: List[float], fraction: float) -> float:
+    """Return the value below which *fraction* of the sorted *values* fall."""
+    return values[min(len(values) - 1, int(len(values) * fraction))]
+
+
+def measure(
+    name: str,
+    operation: Callable[[], int],
+    calls: int,
+    threads: int = 1,
+    warmup: int = 10,
+) -> Result:
+    """Call *operation*, which returns the number of messages it moved, *calls*
+    times on each of *threads* threads, after a warm-up."""
+    for _ in range(warmup):
+        operation()
+
+    latencies: List[float] = []
+    counts: List[int] = []
+    lock = threading.Lock()
+    barrier = threading.Barrier(threads + 1)
+
+    def work() -> None:
+        local_latencies = []
+        local_count = 0
+        barrier.wait()
+        for _ in range(calls):
+            started = time.perf_counter()
+            local_count += operation()
+            local_latencies.append(time.perf_counter() - started)
+        with lock:
+            latencies.extend(local_latencies)
+            counts.append(local_count)
+
+    workers = [threading.Thread(target=work) for _ in range(threads)]
+    for worker in workers:
+        worker.start()
+    barrier.wait()
+    started = time.perf_counter()
+    for worker in workers:
+        worker.join()
+    elapsed = time.perf_counter() - started
+
+    return Result(name, latencies, sum(counts), elapsed)
+
+
+def populate(client: MessageDB, category: str, streams: int, per_stream: int) -> None:
+    """Write *per_stream* messages to each of *streams* streams of a category."""
+    client.bulk_import(
+        (f"{category}-{stream}", "Populated", {"index": index, "payload": "x" * 100})
+        for index in range(per_stream)
+        for stream in range(streams)
+    )
+
+
+class Suite:
+    """The benchmarks of a run, sharing a client and the messages they read.
+
+    The category the read benchmarks read is populated the first time one of them
+    runs, so a run limited to writes with `--only` does not wait for it.
+    """
+
+    def __init__(
+        self, client: MessageDB, url: str, run_id: str, scale: int, threads: int
+    ) -> None:
+        self.client = client
+        self.url = url
+        self.run_id = run_id
+        self.scale = scale
+        self.threads = threads
+        self.data = {"name": "benchmark", "payload": "x" * 100}
+        self.calls = 200 * scale
+        self._read_category_name: str | None = None
+
+    @property
+    def read_category_name(self) -> str:
+        """The category the read benchmarks read, populated on first use."""
+        if self._read_category_name is None:
+            category = f"benchRead{self.run_id}"
+            populate(self.client, category, streams=10, per_stream=1000 * self.scale)
+            self._read_category_name = category
+        return self._read_category_name
+
+    def benchmarks(self) -> Dict[str, Callable[[], Result]]:
+        """Return the benchmarks by name, each a callable that runs it."""
+        return {
+            "write": self.write,
+            "write_batch[10]": partial(self.write_batch, 10),
+            "write_batch[100]": partial(self.write_batch, 100),
+            "write_batch[1000]": partial(self.write_batch, 1000),
+            "concurrent_write": partial(self.concurrent_write, False),
+            "concurrent_combined_write": partial(self.concurrent_write, True),
+            "read_stream[10]": partial(self.read_stream, 10),
+            "read_stream[100]": partial(self.read_stream, 100),
+            "read_stream[1000]": partial(self.read_stream, 1000),
+            "read_category[10]": partial(self.read_category, 10),
+            "read_category[100]": partial(self.read_category, 100),
+            "read_category[1000]": partial(self.read_category, 1000),
+            "read_consumer_group": self.read_consumer_group,
+            "concurrent_read": self.concurrent_read,
+            "stream_identifiers": self.stream_identifiers,
+        }
+
+    def write(self) -> Result:
+        stream_name = f"benchWrite{self.run_id}-1"
+
+        def call() -> int:
+            self.client.write(stream_name, "Written", self.data)
+            return 1
+
+        return measure("write", call, self.calls)
+
+    def write_batch(self, size: int) -> Result:
+        stream_name = f"benchBatch{self.run_id}-{size}"
+        batch = [("Written", self.data)] * size
+
+        def call() -> int:
+            self.client.write_batch(stream_name, batch)
+            return size
+
+        return measure(f"write_batch[{size}]", call, max(10, self.calls // size * 5))
+
+    def concurrent_write(self, combine_writes: bool) -> Result:
+        writer = self._client(combine_writes=combine_writes)
+        counter = iter(range(sys.maxsize))
+
+        def call() -> int:
+            stream_name = f"benchConcurrent{self.run_id}-{next(counter) % 100}"
+            writer.write(stream_name, "Written", self.data)
+            return 1
+
+        try:
+            return measure(
+                f"write[{self.threads} threads"
+                f"{', combined' if combine_writes else ''}]",
+                call,
+                self.calls // 2,
+                threads=self.threads,
+            )
+        finally:
+            writer.connection_pool.closeall()
+
+    def read_stream(self, size: int) -> Result:
+        stream_name = f"{self.read_category_name}-0"
+        return measure(
+            f"read_stream[{size}]",
+            lambda: len(self.client.read_stream(stream_name, no_of_messages=size)),
+            max(10, self.calls // max(1, size // 10)),
+        )
+
+    def read_category(self, size: int) -> Result:
+        category = self.read_category_name
+        return measure(
+            f"read_category[{size}]",
+            lambda: len(self.client.read_category(category, no_of_messages=size)),
+            max(10, self.calls // max(1, size // 10)),
+        )
+
+    def read_consumer_group(self) -> Result:
+        category = self.read_category_name
+        members = iter(range(sys.maxsize))
+        return measure(
+            "read_category[100, consumer group of 4]",
+            lambda: len(
+                self.client.read_category(
+                    category,
+                    no_of_messages=100,
+                    consumer_group_member=next(members) % 4,
+                    consumer_group_size=4,
+                )
+            ),
+            self.calls // 2,
+        )
+
+    def concurrent_read(self) -> Result:
+        stream_name = f"{self.read_category_name}-0"
+        reader = self._client()
+        try:
+            return measure(
+                f"read_stream[100, {self.threads} threads]",
+                lambda: len(reader.read_stream(stream_name, no_of_messages=100)),
+                self.calls // 2,
+                threads=self.threads,
+            )
+        finally:
+            reader.connection_pool.closeall()
+
+    def stream_identifiers(self) -> Result:
+        category = self.read_category_name
+        return measure(
+            "stream_identifiers",
+            lambda: len(self.client.stream_identifiers(category)),
+            max(10, self.calls // 10),
+        )
+
+    def _client(self, **kwargs: Any) -> MessageDB:
+        """Return a client with a connection per thread of the concurrent
+        benchmarks."""
+        return MessageDB.from_url(
+            self.url,
+            max_connections=self.threads,
+            min_connections=self.threads,
+            acquire_timeout=30,
+            **kwargs,
+        )
+
+
+def environment(url: str) -> Dict[str, Any]:
+    """Describe the machine and versions the benchmarks ran with."""
+    conn = psycopg2.connect(url)
+    try:
+        with conn.cursor() as cursor:
+            cursor.execute("SHOW server_version")
+            row = cursor.fetchone()
+    finally:
+        conn.close()
+
+    return {
+        "time": datetime.now(timezone.utc).isoformat(),
+        "message_db_py": __version__,
+        "python": platform.python_version(),
+        "psycopg2": getattr(psycopg2, "__version__").split()[0],
+        "postgres": row[0] if row else None,
+        "platform": platform.platform(),
+    }
+
+
+def print_results(
+    results: List[Dict[str, Any]], baseline: Dict[str, Dict[str, Any]]
+) -> None:
+    header = f"{'benchmark':<42}{'msg/s':>12}{'p50 ms':>10}{'p99 ms':>10}"
+    if baseline:
+        header += f"{'vs base':>10}"
+    print(header)
+
+    for result in results:
+        line = (
+            f"{result['name']:<42}{result['messages_per_second']:>12,.0f}"
+            f"{result['p50_ms']:>10.3f}{result['p99_ms']:>10.3f}"
+        )
+        before = baseline.get(result["name"])
+        if before:
+            change = result["messages_per_second"] / before["messages_per_second"] - 1
+            line += f"{change:>+10.1%}"
+        print(line)
+
+
+def main(argv: List[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(
+        description="Benchmark the Message DB client hot paths."
+    )
+    parser.add_argument("--url", default=DEFAULT_URL, help="Message DB URL")
+    parser.add_argument(
+        "--quick", action="store_true", help="Run fewer calls, for a smoke test"
+    )
+    parser.add_argument(
+        "--only",
+        action="append",
+        help="Only run benchmarks whose name contains this text; repeatable",
+    )
+    parser.add_argument(
+        "--threads", type=int, default=8, help="Threads of the concurrent benchmarks"
+    )
+    parser.add_argument("--output", help="Save the results to this JSON file")
+    parser.add_argument("--compare", help="Compare with the results of a JSON file")
+    args = parser.parse_args(argv)
+
+    baseline: Dict[str, Dict[str, Any]] = {}
+    if args.compare:
+        with open(args.compare) as file:
+            baseline = {result["name"]: result for result in json.load(file)["results"]}
+
+    client = MessageDB.from_url(args.url, min_connections=1)
+    run_id = uuid4().hex[:8]
+    results = []
+    try:
+        suite = Suite(client, args.url, run_id, 1 if args.quick else 5, args.threads)
+        for name, run in suite.benchmarks().items():
+            if args.only and not any(only in name for only in args.only):
+                continue
+            results.append(run().to_dict())
+    finally:
+        client.connection_pool.closeall()
+
+    print_results(results, baseline)
+
+    if args.output:
+        with open(args.output, "w") as file:
+            json.dump(
+                {"environment": environment(args.url), "results": results},
+                file,
+                indent=2,
+            )
+
+
+if __name__ == "__main__":
+    main()
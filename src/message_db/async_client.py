@@ -0,0 +1,454 @@
+from __future__ import annotations
+
+from typing import Any, Dict, List, Tuple
+from uuid import uuid4
+
+from psycopg import AsyncConnection, DatabaseError
+from psycopg.rows import dict_row
+from psycopg.types.json import Jsonb
+
+from message_db.async_connection import AsyncConnectionPool
+from message_db.client import (
+    LAST_STREAM_MESSAGE_SQL,
+    LOAD_ENTITY_BATCH_SIZE,
+    STREAM_IDENTIFIERS_SQL,
+    STREAM_VERSION_SQL,
+    STREAMS_MESSAGES_SQL,
+    WRITE_MESSAGE_SQL,
+    WRITE_MESSAGES_SQL,
+    batch_messages,
+    decode_message,
+    entity_from_snapshot,
+    filtered_batch,
+    read_params,
+    read_sql,
+    should_snapshot,
+    snapshot_stream_name,
+    streams_params,
+    validate_category_name,
+    validate_stream_name,
+)
+from message_db.codec import Codec, default_codec
+from message_db.message import Entity, Message
+
+
+def _write_error(exc: DatabaseError) -> ValueError:
+    """Translate a database error raised by `write_message` into a `ValueError`.
+
+    The message format matches the one raised by the synchronous client.
+    """
+    return ValueError(f"{exc.sqlstate}-ERROR:  {exc.diag.message_primary}")
+
+
+class AsyncMessageDB:
+    """This class provides an asyncio Python interface to all MessageDB commands.
+
+    It mirrors `MessageDB`, but every command is a coroutine and connections are
+    drawn from an `AsyncConnectionPool`, so many concurrent tasks can share a
+    small number of connections.
+    """
+
+    SNAPSHOT_MESSAGE_TYPE = "SNAPSHOT"
+
+    @classmethod
+    def from_url(
+        cls,
+        url: str,
+        codec: Codec | None = None,
+        lazy_decoding: bool = False,
+        **kwargs: Any,
+    ) -> AsyncMessageDB:
+        """Returns an AsyncMessageDB client object configured from the given URL.
+
+        Args:
+            url (str): Postgres-compliant URL connection string
+            codec (Codec): Codec for message data and metadata
+            lazy_decoding (bool): Return `Message` records instead of dictionaries
+            kwargs: Keyword arguments to pass to `AsyncConnectionPool.from_url()`
+
+        Returns:
+            AsyncMessageDB: AsyncMessageDB client object
+        """
+        connection_pool = AsyncConnectionPool.from_url(url, **kwargs)
+        return cls(
+            connection_pool=connection_pool, codec=codec, lazy_decoding=lazy_decoding
+        )
+
+    def __init__(
+        self,
+        dbname: str = "message_store",
+        user: str = "message_store",
+        password: str = "",
+        host: str = "localhost",
+        port: int = 5432,
+        connection_pool: AsyncConnectionPool | None = None,
+        codec: Codec | None = None,
+        lazy_decoding: bool = False,
+    ) -> None:
+        if not connection_pool:
+            connection_pool = AsyncConnectionPool(
+                dbname=dbname, user=user, password=password, host=host, port=port
+            )
+        self.connection_pool = connection_pool
+        self.codec = codec or default_codec()
+        self.lazy_decoding = lazy_decoding
+
+    def _decode(self, row: Dict[str, Any]) -> Any:
+        """Turn a row into a `Message` when decoding lazily, or a dictionary otherwise."""
+        if self.lazy_decoding:
+            return Message.from_row(row, self.codec)
+        return decode_message(row, self.codec)
+
+    async def _write(
+        self,
+        connection: AsyncConnection,
+        stream_name: str,
+        message_type: str,
+        data: Dict[str, Any],
+        metadata: Dict[str, Any] | None = None,
+        expected_version: int | None = None,
+    ) -> int:
+        """Write a message to a stream."""
+        try:
+            async with connection.cursor() as cursor:
+                await cursor.execute(
+                    WRITE_MESSAGE_SQL,
+                    {
+                        "identifier": str(uuid4()),
+                        "stream_name": stream_name,
+                        "type": message_type,
+                        "data": Jsonb(data, dumps=self.codec.encode),
+                        "metadata": (
+                            Jsonb(metadata, dumps=self.codec.encode)
+                            if metadata
+                            else None
+                        ),
+                        "expected_version": expected_version,
+                    },
+                )
+
+                result = await cursor.fetchone()
+                if result is None:
+                    raise ValueError("No result returned from the database operation.")
+        except DatabaseError as exc:
+            raise _write_error(exc) from exc
+
+        return result[0]
+
+    async def _write_messages(
+        self,
+        connection: AsyncConnection,
+        messages: List[
+            Tuple[str, str, Dict[str, Any], Dict[str, Any] | None, int | None]
+        ],
+    ) -> List[int]:
+        """Write several messages in a single round trip. See `MessageDB._write_messages`."""
+        try:
+            async with connection.cursor() as cursor:
+                await cursor.execute(
+                    WRITE_MESSAGES_SQL,
+                    {
+                        "identifiers": [str(uuid4()) for _ in messages],
+                        "stream_names": [message[0] for message in messages],
+                        "types": [message[1] for message in messages],
+                        "data": [
+                            Jsonb(message[2], dumps=self.codec.encode)
+                            for message in messages
+                        ],
+                        "metadata": [
+                            (
+                                Jsonb(message[3], dumps=self.codec.encode)
+                                if message[3]
+                                else None
+                            )
+                            for message in messages
+                        ],
+                        "expected_versions": [message[4] for message in messages],
+                    },
+                )
+
+                positions = [row[0] for row in await cursor.fetchall()]
+                if len(positions) != len(messages):
+                    raise ValueError("No result returned from the database operation.")
+        except DatabaseError as exc:
+            raise _write_error(exc) from exc
+
+        return positions
+
+    async def write(
+        self,
+        stream_name: str,
+        message_type: str,
+        data: Dict,
+        metadata: Dict | None = None,
+        expected_version: int | None = None,
+    ) -> int:
+        """Write a message to a stream."""
+        conn = await self.connection_pool.get_connection()
+
+        try:
+            async with conn.transaction():
+                position = await self._write(
+                    conn, stream_name, message_type, data, metadata, expected_version
+                )
+        finally:
+            await self.connection_pool.release(conn)
+
+        return position
+
+    async def write_batch(
+        self, stream_name, data, expected_version: int | None = None
+    ) -> int:
+        """Write a batch of messages to a stream in a single round trip.
+
+        See `MessageDB.write_batch` for the `expected_version` semantics.
+        """
+        messages = batch_messages(stream_name, data, expected_version)
+
+        conn = await self.connection_pool.get_connection()
+
+        try:
+            async with conn.transaction():
+                positions = await self._write_messages(conn, messages)
+        finally:
+            await self.connection_pool.release(conn)
+
+        return positions[-1]
+
+    async def stream_version(self, stream_name: str) -> int:
+        """Return the version of a stream, or -1 if the stream has no messages.
+
+        See `MessageDB.stream_version`.
+        """
+        conn = await self.connection_pool.get_connection()
+        try:
+            async with conn.cursor() as cursor:
+                await cursor.execute(STREAM_VERSION_SQL, {"stream_name": stream_name})
+                row = await cursor.fetchone()
+
+            await conn.commit()
+        finally:
+            await self.connection_pool.release(conn)
+
+        return -1 if row is None or row[0] is None else row[0]
+
+    async def read(
+        self,
+        stream_name: str,
+        sql: str | None = None,
+        position: int = 0,
+        no_of_messages: int = 1000,
+        consumer_group_member: int | None = None,
+        consumer_group_size: int | None = None,
+        message_types: List[str] | None = None,
+    ) -> List[Dict[str, Any]]:
+        """Read messages from a stream or category.
+
+        Returns a list of messages from the stream or category starting from the given position.
+        See `MessageDB.read` for *message_types*.
+        """
+        conn = await self.connection_pool.get_connection()
+        try:
+            if not sql:
+                sql = read_sql(
+                    stream_name, consumer_group_member is not None, message_types
+                )
+
+            async with conn.cursor(row_factory=dict_row) as cursor:
+                await cursor.execute(
+                    sql,
+                    read_params(
+                        stream_name,
+                        position,
+                        no_of_messages,
+                        consumer_group_member,
+                        consumer_group_size,
+                        message_types,
+                    ),
+                )
+                raw_messages = await cursor.fetchall()
+
+            await conn.commit()
+        finally:
+            await self.connection_pool.release(conn)
+
+        if message_types is not None:
+            return filtered_batch(raw_messages, self._decode)
+        return [self._decode(message) for message in raw_messages]
+
+    async def read_stream(
+        self,
+        stream_name: str,
+        position: int = 0,
+        no_of_messages: int = 1000,
+        message_types: List[str] | None = None,
+    ) -> List[Dict[str, Any]]:
+        """Read messages from a stream.
+
+        Returns a list of messages from the stream starting from the given position.
+        """
+        validate_stream_name(stream_name)
+
+        return await self.read(
+            stream_name,
+            sql=read_sql(stream_name, message_types=message_types),
+            position=position,
+            no_of_messages=no_of_messages,
+            message_types=message_types,
+        )
+
+    async def read_category(
+        self,
+        category_name: str,
+        position: int = 0,
+        no_of_messages: int = 1000,
+        consumer_group_member: int | None = None,
+        consumer_group_size: int | None = None,
+        message_types: List[str] | None = None,
+    ) -> List[Dict[str, Any]]:
+        """Read messages from a category.
+
+        See `MessageDB.read_category` for the consumer group and filter parameters.
+        """
+        validate_category_name(
+            category_name, consumer_group_member, consumer_group_size
+        )
+
+        return await self.read(
+            category_name,
+            sql=read_sql(
+                category_name, consumer_group_member is not None, message_types
+            ),
+            position=position,
+            no_of_messages=no_of_messages,
+            consumer_group_member=consumer_group_member,
+            consumer_group_size=consumer_group_size,
+            message_types=message_types,
+        )
+
+    async def read_streams(
+        self,
+        stream_names: List[str],
+        position: int | Dict[str, int] = 0,
+        no_of_messages: int = 1000,
+    ) -> Dict[str, List[Dict[str, Any]]]:
+        """Read messages from several streams in a single query.
+
+        See `MessageDB.read_streams`.
+        """
+        stream_names = list(dict.fromkeys(stream_names))
+        params = streams_params(stream_names, position, no_of_messages)
+        messages: Dict[str, List[Dict[str, Any]]] = {
+            stream_name: [] for stream_name in stream_names
+        }
+        if not stream_names:
+            return messages
+
+        conn = await self.connection_pool.get_connection()
+        try:
+            async with conn.cursor(row_factory=dict_row) as cursor:
+                await cursor.execute(STREAMS_MESSAGES_SQL, params)
+                raw_messages = await cursor.fetchall()
+
+            await conn.commit()
+        finally:
+            await self.connection_pool.release(conn)
+
+        for message in raw_messages:
+            messages[message["stream_name"]].append(self._decode(message))
+        return messages
+
+    async def stream_identifiers(self, category_name: str) -> List[str]:
+        """Return all unique aggregate identifiers for a stream category.
+
+        See `MessageDB.stream_identifiers`.
+        """
+        validate_category_name(category_name)
+
+        conn = await self.connection_pool.get_connection()
+        try:
+            async with conn.cursor() as cursor:
+                await cursor.execute(
+                    STREAM_IDENTIFIERS_SQL,
+                    {"category_name": category_name, "pattern": f"{category_name}-%"},
+                )
+                identifiers = [row[0] for row in await cursor.fetchall() if row[0]]
+
+            await conn.commit()
+        finally:
+            await self.connection_pool.release(conn)
+
+        return identifiers
+
+    async def load_entity(self, category_name: str, identifier: str) -> Entity:
+        """Load an entity from its latest snapshot and the messages written after it.
+
+        See `MessageDB.load_entity`.
+        """
+        snapshot = await self.read_last_message(
+            snapshot_stream_name(category_name, identifier)
+        )
+        entity = entity_from_snapshot(f"{category_name}-{identifier}", snapshot)
+
+        position = 0 if entity.snapshot_version is None else entity.snapshot_version + 1
+        while True:
+            messages = await self.read_stream(
+                entity.stream_name,
+                position=position,
+                no_of_messages=LOAD_ENTITY_BATCH_SIZE,
+            )
+            entity.messages.extend(messages)
+            if len(messages) < LOAD_ENTITY_BATCH_SIZE:
+                break
+            position = messages[-1]["position"] + 1
+
+        return entity
+
+    async def write_snapshot(
+        self,
+        entity: Entity,
+        state: Dict[str, Any],
+        version: int | None = None,
+        every: int = 1,
+    ) -> int | None:
+        """Record the state of an entity in its snapshot stream.
+
+        See `MessageDB.write_snapshot`.
+        """
+        if version is None:
+            version = entity.version
+        if not should_snapshot(entity, version, every) or version < 0:
+            return None
+
+        category_name, identifier = entity.stream_name.split("-", 1)
+        position = await self.write(
+            snapshot_stream_name(category_name, identifier),
+            self.SNAPSHOT_MESSAGE_TYPE,
+            state,
+            {"version": version},
+        )
+
+        entity.snapshot = state
+        entity.snapshot_version = version
+        entity.messages = [
+            message for message in entity.messages if message["position"] > version
+        ]
+        return position
+
+    async def read_last_message(self, stream_name: str) -> Dict[str, Any] | None:
+        """Read the last message from a stream."""
+        conn = await self.connection_pool.get_connection()
+        try:
+            async with conn.cursor(row_factory=dict_row) as cursor:
+                await cursor.execute(
+                    LAST_STREAM_MESSAGE_SQL, {"stream_name": stream_name}
+                )
+                message = await cursor.fetchone()
+
+            await conn.commit()
+        finally:
+            await self.connection_pool.release(conn)
+
+        if message:
+            return self._decode(message)
+        return None
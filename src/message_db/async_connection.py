@@ -0,0 +1,104 @@
+from __future__ import annotations
+
+import asyncio
+from typing import Any, Dict
+
+try:
+    from psycopg import AsyncConnection
+    from psycopg_pool import AsyncConnectionPool as _AsyncConnectionPool
+except ImportError as exc:  # pragma: no cover
+    raise ImportError(
+        "The asyncio client requires psycopg 3 and psycopg-pool. "
+        'Install them with `pip install "message-db-py[async]"`.'
+    ) from exc
+
+
+class AsyncConnectionPool:
+    @classmethod
+    def from_url(
+        cls, url: str, max_connections: int = 100, **kwargs: Any
+    ) -> AsyncConnectionPool:
+        """Return an asynchronous Connection Pool configured from the given URL.
+
+        Args:
+            url (str): Postgres-compliant URL connection string
+            max_connections (int): Maximum no. of connections
+            kwargs (str): Keyword arguments to pass to psycopg `connect()`
+
+        Returns:
+            AsyncConnectionPool: A configured connection pool object
+        """
+        return cls(url, max_connections=max_connections, **kwargs)
+
+    def __init__(
+        self,
+        conninfo: str = "",
+        max_connections: int = 100,
+        min_connections: int = 1,
+        pre_ping: bool = False,
+        max_lifetime: float | None = None,
+        max_idle: float | None = None,
+        **kwargs: Any,
+    ) -> None:
+        """Initialize the Connection Pool.
+
+        The underlying pool is opened lazily, on the first checkout, because
+        opening it requires a running event loop.
+
+        *pre_ping*, *max_lifetime* and *max_idle* behave as in `ConnectionPool`.
+        When not set, the lifetime and idle time default to those of psycopg-pool.
+        """
+        if not isinstance(max_connections, int) or max_connections < 0:
+            raise ValueError('"max_connections" must be a positive integer')
+
+        self.max_connections = max_connections
+        self.conninfo = conninfo
+        self.kwargs = kwargs
+
+        options: Dict[str, Any] = {}
+        if pre_ping:
+            options["check"] = _AsyncConnectionPool.check_connection
+        if max_lifetime is not None:
+            options["max_lifetime"] = max_lifetime
+        if max_idle is not None:
+            options["max_idle"] = max_idle
+
+        self._connection_pool = _AsyncConnectionPool(
+            conninfo,
+            kwargs=kwargs,
+            min_size=min(min_connections, max_connections),
+            max_size=max_connections,
+            open=False,
+            **options,
+        )
+        self._opened = False
+        self._open_lock = asyncio.Lock()
+
+    async def open(self) -> None:
+        """Open the pool and wait until its minimum connections are established."""
+        if self._opened:
+            return
+
+        async with self._open_lock:
+            if not self._opened:
+                await self._connection_pool.open(wait=True)
+                self._opened = True
+
+    async def get_connection(self) -> AsyncConnection:
+        """Retrieve a connection from the connection pool, waiting for one to free
+        up if all connections are in use.
+
+        Returns:
+            AsyncConnection: the connection to a PostgreSQL database instance.
+        """
+        await self.open()
+        return await self._connection_pool.getconn()
+
+    async def release(self, connection: AsyncConnection) -> None:
+        """Release a connection back into the pool"""
+        await self._connection_pool.putconn(connection)
+
+    async def closeall(self) -> None:
+        """Close all connections handled by the pool."""
+        await self._connection_pool.close()
+        self._opened = False
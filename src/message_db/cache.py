@@ -0,0 +1,181 @@
+from __future__ import annotations
+
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, List, Tuple
+
+
+class StreamCache:
+    """A bounded, in-process LRU cache of decoded stream prefixes.
+
+    Messages are never modified once written, and stream positions are
+    contiguous from 0, so the messages of a stream up to any position can be
+    cached indefinitely. The cache holds, for each stream, the messages from
+    position 0 up to the last one read, and `MessageDB.read_stream` only asks
+    the database for the messages after them.
+
+    The cache is bounded by the total number of messages it holds. The least
+    recently used streams are evicted first. It is safe to share between threads.
+
+    Cached messages are shared between readers, and must be treated as read-only.
+    """
+
+    def __init__(self, max_messages: int = 100_000) -> None:
+        """Initialize the cache.
+
+        Args:
+            max_messages: Maximum number of messages held across all streams
+
+        Raises:
+            ValueError: If max_messages is not positive
+        """
+        if max_messages < 1:
+            raise ValueError(f"max_messages must be > 0, got {max_messages}")
+
+        self.max_messages = max_messages
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+
+        self._streams: OrderedDict[str, List[Any]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._streams)
+
+    def __contains__(self, stream_name: str) -> bool:
+        return stream_name in self._streams
+
+    def read(
+        self, stream_name: str, position: int, no_of_messages: int
+    ) -> Tuple[List[Any], int]:
+        """Return the cached messages in the requested range, and the number of
+        messages cached for the stream.
+
+        The range is fully cached when as many messages as requested are returned.
+        """
+        with self._lock:
+            messages = self._streams.get(stream_name)
+            if messages is None:
+                self.misses += 1
+                return [], 0
+
+            self._streams.move_to_end(stream_name)
+            self.hits += 1
+            return messages[position : position + no_of_messages], len(messages)
+
+    def extend(self, stream_name: str, position: int, messages: List[Any]) -> None:
+        """Append messages read from *position* to the cached prefix of a stream.
+
+        Messages that are already cached are skipped, and messages that would leave
+        a gap after the cached prefix are ignored, so concurrent readers of the
+        same stream can extend it safely.
+        """
+        with self._lock:
+            cached = self._streams.get(stream_name, [])
+            if position > len(cached):
+                return
+
+            new_messages = messages[len(cached) - position :]
+            if not new_messages:
+                return
+
+            cached.extend(new_messages)
+            self._streams[stream_name] = cached
+            self._streams.move_to_end(stream_name)
+            self.size += len(new_messages)
+
+            while self.size > self.max_messages and self._streams:
+                _, evicted = self._streams.popitem(last=False)
+                self.size -= len(evicted)
+
+    def invalidate(self, stream_name: str) -> None:
+        """Drop the cached messages of a stream."""
+        with self._lock:
+            messages = self._streams.pop(stream_name, None)
+            if messages is not None:
+                self.size -= len(messages)
+
+    def clear(self) -> None:
+        """Drop all cached messages."""
+        with self._lock:
+            self._streams.clear()
+            self.size = 0
+
+
+class VersionCache:
+    """A bounded, in-process cache of stream versions, with a time to live.
+
+    `MessageDB.stream_version` reads versions from the cache, and the client
+    keeps it up to date with the positions returned by its writes, and with the
+    actual version reported when a write fails on a wrong expected version.
+    Writers can then pass the cached version as `expected_version` without
+    reading the stream first: if another writer got in between, the write fails,
+    the cache is corrected, and the command can be retried.
+
+    Versions expire after *ttl* seconds, which bounds how long writes from other
+    clients go unnoticed. The least recently used streams are evicted first. It
+    is safe to share between threads.
+    """
+
+    def __init__(self, max_streams: int = 10_000, ttl: float = 60.0) -> None:
+        """Initialize the cache.
+
+        Args:
+            max_streams: Maximum number of stream versions held
+            ttl: Number of seconds a version stays valid
+
+        Raises:
+            ValueError: If max_streams or ttl is not positive
+        """
+        if max_streams < 1:
+            raise ValueError(f"max_streams must be > 0, got {max_streams}")
+        if ttl <= 0:
+            raise ValueError(f"ttl must be > 0, got {ttl}")
+
+        self.max_streams = max_streams
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+
+        self._versions: OrderedDict[str, Tuple[int, float]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._versions)
+
+    def __contains__(self, stream_name: str) -> bool:
+        return self.get(stream_name) is not None
+
+    def get(self, stream_name: str) -> int | None:
+        """Return the cached version of a stream, or `None` if unknown or expired."""
+        with self._lock:
+            entry = self._versions.get(stream_name)
+            if entry is None or entry[1] <= time.monotonic():
+                self._versions.pop(stream_name, None)
+                self.misses += 1
+                return None
+
+            self._versions.move_to_end(stream_name)
+            self.hits += 1
+            return entry[0]
+
+    def set(self, stream_name: str, version: int) -> None:
+        """Cache the version of a stream."""
+        with self._lock:
+            self._versions[stream_name] = (version, time.monotonic() + self.ttl)
+            self._versions.move_to_end(stream_name)
+
+            while len(self._versions) > self.max_streams:
+                self._versions.popitem(last=False)
+
+    def invalidate(self, stream_name: str) -> None:
+        """Drop the cached version of a stream."""
+        with self._lock:
+            self._versions.pop(stream_name, None)
+
+    def clear(self) -> None:
+        """Drop all cached versions."""
+        with self._lock:
+            self._versions.clear()
@@ -1,21 +1,694 @@
 from __future__ import annotations
 
+import csv
+import io
 import json
-from typing import Any, Dict, List
+import re
+import time
+from itertools import count, islice
+from typing import IO, Any, Dict, Iterable, Iterator, List, Sequence, Tuple, cast
 from uuid import uuid4
 
 from psycopg2 import DatabaseError
 from psycopg2.extensions import connection
 from psycopg2.extras import Json, RealDictCursor
 
+from message_db.cache import StreamCache, VersionCache
+from message_db.codec import Codec, JsonCodec, default_codec
+from message_db.combiner import WriteCombiner
 from message_db.connection import ConnectionPool
+from message_db.export import export as export_messages
+from message_db.instrumentation import Instrumentation, OperationTimer
+from message_db.message import Entity, Message, MessageBatch
+from message_db.prepared import PreparedStatement, execute_prepared
+
+JSON_CODEC = JsonCodec()
+
+# SQL statements shared by the synchronous and asynchronous clients. Both drivers
+# use the `%(name)s` placeholder style, so the statements are driver-agnostic.
+WRITE_MESSAGE_SQL = (
+    "SELECT message_store.write_message(%(identifier)s, %(stream_name)s, %(type)s, "
+    "%(data)s, %(metadata)s, %(expected_version)s);"
+)
+
+WRITE_MESSAGES_SQL = (
+    "SELECT message_store.write_message(m.id, m.stream_name, m.type, "
+    "m.data, m.metadata, m.expected_version) "
+    "FROM unnest(%(identifiers)s::varchar[], %(stream_names)s::varchar[], "
+    "%(types)s::varchar[], %(data)s::jsonb[], %(metadata)s::jsonb[], "
+    "%(expected_versions)s::bigint[]) WITH ORDINALITY "
+    "AS m(id, stream_name, type, data, metadata, expected_version, ordinality);"
+)
+
+# Takes the category locks of a multi-category write up front, in the order of
+# the given stream names. `write_message` takes each lock again, which is a no-op
+# within the transaction.
+LOCK_CATEGORIES_SQL = (
+    "SELECT count(message_store.acquire_lock(s.stream_name)) "
+    "FROM unnest(%(stream_names)s::varchar[]) WITH ORDINALITY "
+    "AS s(stream_name, ordinality);"
+)
+
+ALL_MESSAGES_SQL = """
+    SELECT
+        id::varchar,
+        stream_name::varchar,
+        type::varchar,
+        position::bigint,
+        global_position::bigint,
+        data::varchar,
+        metadata::varchar,
+        time::timestamp
+    FROM
+        messages
+    WHERE
+        global_position > %(position)s
+    ORDER BY global_position
+    LIMIT %(batch_size)s
+"""
+
+# Pages of `$all`, optionally restricted to a category, in global position order.
+# The category condition is served by the `messages_category` index.
+ALL_PAGE_SQL = """
+    SELECT
+        id::varchar,
+        stream_name::varchar,
+        type::varchar,
+        position::bigint,
+        global_position::bigint,
+        data::varchar,
+        metadata::varchar,
+        time::timestamp
+    FROM message_store.messages
+    WHERE global_position > %(position)s{condition}
+    ORDER BY global_position
+    LIMIT %(batch_size)s
+"""
+
+CATEGORY_CONDITION = "\n      AND message_store.category(stream_name) = %(category)s"
+
+# A page, and the global positions missing up to its last message, in the same
+# snapshot. Missing positions belong to transactions that are still in flight,
+# or that rolled back.
+ALL_PAGE_GAPS_SQL = """
+    WITH page AS ({page})
+    SELECT page.*, (
+        SELECT array_agg(positions.previous + 1 ORDER BY positions.global_position)
+        FROM (
+            SELECT
+                global_position,
+                lag(global_position, 1, %(position)s::bigint)
+                    OVER (ORDER BY global_position) AS previous
+            FROM message_store.messages
+            WHERE global_position > %(position)s
+              AND global_position <= (SELECT max(global_position) FROM page)
+        ) AS positions
+        WHERE positions.global_position > positions.previous + 1
+    ) AS gaps
+    FROM page
+    ORDER BY page.global_position
+"""
+
+# Messages read per page when loading an entity
+LOAD_ENTITY_BATCH_SIZE = 1000
+
+# Seconds between two reads while waiting for a gap to be filled
+GAP_POLL_INTERVAL = 0.01
+
+# Seconds between two checks of a replica catching up with a write
+REPLICA_POLL_INTERVAL = 0.01
+
+STREAM_MESSAGES_SQL = (
+    "SELECT * FROM get_stream_messages(%(stream_name)s, %(position)s, %(batch_size)s);"
+)
+
+STREAMS_MESSAGES_SQL = """
+    SELECT m.*
+    FROM unnest(%(stream_names)s::varchar[], %(positions)s::bigint[])
+        WITH ORDINALITY AS s(stream_name, position, ordinality)
+    CROSS JOIN LATERAL get_stream_messages(
+        s.stream_name, s.position, %(batch_size)s::bigint
+    ) AS m
+    ORDER BY s.ordinality, m.position
+"""
+
+LAST_STREAM_MESSAGE_SQL = "SELECT * from get_last_stream_message(%(stream_name)s);"
+
+STREAM_VERSION_SQL = "SELECT stream_version(%(stream_name)s);"
+
+# Bulk imports copy each chunk into a staging table, lock the categories it
+# writes to in a fixed order, as `write_message` does, and assign the stream
+# positions after the current version of each stream in one statement.
+IMPORT_TABLE_SQL = """
+    CREATE TEMPORARY TABLE message_db_import (
+        ordinality bigint NOT NULL,
+        id uuid NOT NULL,
+        stream_name text NOT NULL,
+        type text NOT NULL,
+        data jsonb,
+        metadata jsonb
+    ) ON COMMIT DROP
+"""
+
+IMPORT_COPY_SQL = "COPY message_db_import FROM STDIN WITH (FORMAT csv)"
+
+IMPORT_LOCK_SQL = """
+    SELECT count(message_store.acquire_lock(categories.stream_name))
+    FROM (
+        SELECT min(stream_name) AS stream_name
+        FROM message_db_import
+        GROUP BY message_store.category(stream_name)
+        ORDER BY message_store.category(stream_name)
+    ) AS categories
+"""
+
+IMPORT_MESSAGES_SQL = """
+    WITH versions AS (
+        SELECT
+            streams.stream_name,
+            coalesce(
+                (
+                    SELECT max(m.position)
+                    FROM message_store.messages AS m
+                    WHERE m.stream_name = streams.stream_name
+                ),
+                -1
+            ) AS version
+        FROM (SELECT DISTINCT stream_name FROM message_db_import) AS streams
+    ),
+    inserted AS (
+        INSERT INTO message_store.messages
+            (id, stream_name, type, position, data, metadata)
+        SELECT
+            i.id,
+            i.stream_name,
+            i.type,
+            v.version + row_number() OVER (
+                PARTITION BY i.stream_name ORDER BY i.ordinality
+            ),
+            i.data,
+            i.metadata
+        FROM message_db_import AS i
+        JOIN versions AS v USING (stream_name)
+        ORDER BY i.ordinality
+        RETURNING stream_name, position
+    )
+    SELECT stream_name::varchar, max(position)::bigint
+    FROM inserted
+    GROUP BY stream_name
+"""
+
+# Raised by `write_message` when the expected version does not match
+WRONG_VERSION_PATTERN = re.compile(r"\(Stream: (.+), Stream Version: (-?\d+)\)")
+
+STREAM_IDENTIFIERS_SQL = """
+    SELECT DISTINCT
+        substring(stream_name from position('-' in stream_name) + 1)
+    FROM message_store.messages
+    WHERE message_store.category(stream_name) = %(category_name)s
+      AND stream_name LIKE %(pattern)s
+    ORDER BY 1
+"""
+
+# Loose index scan over the stream names of a category: each step looks up the
+# first stream name after the previous one, so the cost grows with the number
+# of streams returned rather than the number of messages in the category.
+STREAM_NAMES_SQL = """
+    WITH RECURSIVE streams AS (
+        (
+            SELECT stream_name
+            FROM message_store.messages
+            WHERE message_store.category(stream_name) = %(category_name)s
+              AND stream_name > %(after)s
+            ORDER BY stream_name
+            LIMIT 1
+        )
+        UNION ALL
+        SELECT (
+            SELECT m.stream_name
+            FROM message_store.messages AS m
+            WHERE message_store.category(m.stream_name) = %(category_name)s
+              AND m.stream_name > streams.stream_name
+            ORDER BY m.stream_name
+            LIMIT 1
+        )
+        FROM streams
+        WHERE streams.stream_name IS NOT NULL
+    )
+    SELECT stream_name::varchar
+    FROM streams
+    WHERE stream_name IS NOT NULL
+    LIMIT %(limit)s
+"""
+
+
+FILTERED_MESSAGES_SQL = """
+    WITH scanned AS (
+        SELECT
+            id::varchar,
+            stream_name::varchar,
+            type::varchar,
+            position::bigint,
+            global_position::bigint,
+            data::varchar,
+            metadata::varchar,
+            time::timestamp
+        FROM
+            messages
+        WHERE
+            {condition}
+        ORDER BY {position}
+        LIMIT %(batch_size)s
+    )
+    SELECT
+        scanned.*,
+        summary.scanned_count,
+        summary.last_position
+    FROM
+        (
+            SELECT count(*) AS scanned_count, max({position}) AS last_position
+            FROM scanned
+        ) AS summary
+        LEFT JOIN scanned ON scanned.type = ANY(%(message_types)s::varchar[])
+    ORDER BY scanned.{position}
+"""
+
+
+def category_messages_sql(consumer_group: bool = False) -> str:
+    """Return the `get_category_messages` call, optionally with consumer group arguments."""
+    sql = "SELECT * FROM get_category_messages(%(stream_name)s::varchar, %(position)s::bigint, %(batch_size)s::bigint"
+    if consumer_group:
+        sql += (
+            ", NULL, %(consumer_group_member)s::bigint, %(consumer_group_size)s::bigint"
+        )
+    return sql + ");"
+
+
+STREAM_PARAMETER_TYPES = {
+    "stream_name": "varchar",
+    "position": "bigint",
+    "batch_size": "bigint",
+}
+
+# Fixed statements that clients with `prepared_statements` execute by name,
+# keyed by their SQL text. Stream reads are left out: the statement is a single
+# function call, cheap to plan, and `get_stream_messages` plans its own query on
+# every call, so executing it by name was slower in the benchmark.
+PREPARED_STATEMENTS = {
+    statement.sql: statement
+    for statement in [
+        PreparedStatement(
+            "message_db_write_message",
+            WRITE_MESSAGE_SQL,
+            {
+                "identifier": "varchar",
+                "stream_name": "varchar",
+                "type": "varchar",
+                "data": "jsonb",
+                "metadata": "jsonb",
+                "expected_version": "bigint",
+            },
+        ),
+        PreparedStatement(
+            "message_db_all_messages", ALL_MESSAGES_SQL, STREAM_PARAMETER_TYPES
+        ),
+        PreparedStatement(
+            "message_db_category_messages",
+            category_messages_sql(),
+            STREAM_PARAMETER_TYPES,
+        ),
+        PreparedStatement(
+            "message_db_consumer_group_messages",
+            category_messages_sql(consumer_group=True),
+            {
+                **STREAM_PARAMETER_TYPES,
+                "consumer_group_member": "bigint",
+                "consumer_group_size": "bigint",
+            },
+        ),
+        PreparedStatement(
+            "message_db_last_stream_message",
+            LAST_STREAM_MESSAGE_SQL,
+            STREAM_PARAMETER_TYPES,
+        ),
+        PreparedStatement(
+            "message_db_stream_version", STREAM_VERSION_SQL, STREAM_PARAMETER_TYPES
+        ),
+    ]
+}
+
+
+def filtered_messages_sql(stream_name: str, consumer_group: bool = False) -> str:
+    """Return the SQL to read from `$all`, a stream, or a category, keeping only
+    messages of the given types.
+
+    The statement queries the messages table directly, through the same indexes
+    as the Message DB read functions. It scans the next batch of messages, and
+    returns the matching ones along with the number of messages scanned and the
+    position of the last one. When no message matches, a single row with a `NULL`
+    id still carries these figures.
+    """
+    if stream_name == "$all":
+        condition, position = "global_position > %(position)s", "global_position"
+    elif "-" in stream_name:
+        condition = "stream_name = %(stream_name)s AND position >= %(position)s"
+        position = "position"
+    else:
+        condition = (
+            "category(stream_name) = %(stream_name)s "
+            "AND global_position >= %(position)s"
+        )
+        if consumer_group:
+            condition += (
+                " AND MOD(@hash_64(cardinal_id(stream_name)), "
+                "%(consumer_group_size)s) = %(consumer_group_member)s"
+            )
+        position = "global_position"
+
+    return FILTERED_MESSAGES_SQL.format(condition=condition, position=position)
+
+
+def read_sql(
+    stream_name: str,
+    consumer_group: bool = False,
+    message_types: List[str] | None = None,
+) -> str:
+    """Return the default SQL to read from `$all`, a stream, or a category."""
+    if message_types is not None:
+        return filtered_messages_sql(stream_name, consumer_group)
+    if stream_name == "$all":
+        return ALL_MESSAGES_SQL
+    elif "-" in stream_name:
+        return STREAM_MESSAGES_SQL
+    return category_messages_sql(consumer_group)
+
+
+def read_operation(stream_name: str) -> str:
+    """Return the name of a read in instrumentation events."""
+    if stream_name == "$all":
+        return "read_all"
+    if "-" in stream_name:
+        return "read_stream"
+    return "read_category"
+
+
+def all_page_sql(category: bool = False, detect_gaps: bool = False) -> str:
+    """Return the SQL to read a page of `$all`, optionally restricted to a category,
+    and optionally reporting the gaps in global positions."""
+    sql = ALL_PAGE_SQL.format(condition=CATEGORY_CONDITION if category else "")
+    if detect_gaps:
+        sql = ALL_PAGE_GAPS_SQL.format(page=sql)
+    return sql
+
+
+def rows_before_gaps(
+    rows: List[Dict[str, Any]], gaps_seen: Dict[int, float], gap_timeout: float
+) -> Tuple[List[Dict[str, Any]], float]:
+    """Return the rows of a page of `$all` that precede its first unresolved gap,
+    and how long to wait before reading the page again, or 0.
+
+    A missing position below the first row might still be committed in front of
+    it, so the page is read again until the position is filled, or until it has
+    been missing for *gap_timeout* seconds, and is then skipped. *gaps_seen*
+    records when each missing position was first seen, across the reads of a
+    page. Rows after a later gap are dropped without waiting: the next page
+    starts before it.
+    """
+    if not rows or not rows[0]["gaps"]:
+        return rows, 0.0
+
+    first = rows[0]["global_position"]
+    now = time.monotonic()
+    wait = 0.0
+    for gap in rows[0]["gaps"]:
+        if gap < first:
+            remaining = gaps_seen.setdefault(gap, now) + gap_timeout - now
+            wait = max(wait, remaining)
+    if wait > 0:
+        return [], wait
+
+    later_gaps = [gap for gap in rows[0]["gaps"] if gap > first]
+    if later_gaps:
+        rows = [row for row in rows if row["global_position"] < later_gaps[0]]
+    return rows, 0.0
+
+
+def streams_params(
+    stream_names: List[str],
+    position: int | Dict[str, int] = 0,
+    no_of_messages: int = 1000,
+) -> Dict[str, Any]:
+    """Return the query parameters to read several streams at once.
+
+    *position* is either the starting position of every stream, or a dictionary
+    of starting positions by stream name, defaulting to 0.
+    """
+    for stream_name in stream_names:
+        validate_stream_name(stream_name)
+
+    if isinstance(position, dict):
+        positions = [position.get(stream_name, 0) for stream_name in stream_names]
+    else:
+        positions = [position] * len(stream_names)
+
+    return {
+        "stream_names": stream_names,
+        "positions": positions,
+        "batch_size": no_of_messages,
+    }
+
+
+def read_params(
+    stream_name: str,
+    position: int,
+    no_of_messages: int,
+    consumer_group_member: int | None = None,
+    consumer_group_size: int | None = None,
+    message_types: List[str] | None = None,
+) -> Dict[str, Any]:
+    """Return the query parameters shared by all read statements."""
+    params: Dict[str, Any] = {
+        "stream_name": stream_name,
+        "position": position,
+        "batch_size": no_of_messages,
+    }
+    if consumer_group_member is not None:
+        params["consumer_group_member"] = consumer_group_member
+        params["consumer_group_size"] = consumer_group_size
+    if message_types is not None:
+        params["message_types"] = list(message_types)
+    return params
+
+
+def validate_stream_name(stream_name: str) -> None:
+    """Raise a `ValueError` if *stream_name* is not a stream."""
+    if "-" not in stream_name:
+        raise ValueError(f"{stream_name} is not a stream")
+
+
+def validate_category_name(
+    category_name: str,
+    consumer_group_member: int | None = None,
+    consumer_group_size: int | None = None,
+) -> None:
+    """Raise a `ValueError` if *category_name* is not a category, or if the
+    consumer group parameters are invalid."""
+    if "-" in category_name:
+        raise ValueError(f"{category_name} is not a category")
+
+    if (consumer_group_member is None) != (consumer_group_size is None):
+        raise ValueError(
+            "Both consumer_group_member and consumer_group_size must be provided together or both must be None"
+        )
+
+    if consumer_group_member is not None and consumer_group_size is not None:
+        if consumer_group_member < 0:
+            raise ValueError(
+                f"consumer_group_member must be >= 0, got {consumer_group_member}"
+            )
+        if consumer_group_size <= 0:
+            raise ValueError(
+                f"consumer_group_size must be > 0, got {consumer_group_size}"
+            )
+        if consumer_group_member >= consumer_group_size:
+            raise ValueError(
+                f"consumer_group_member ({consumer_group_member}) must be less than consumer_group_size ({consumer_group_size})"
+            )
+
+
+def snapshot_stream_name(category_name: str, identifier: str) -> str:
+    """Return the name of the snapshot stream of an entity.
+
+    Raises:
+        ValueError: If *category_name* is not a category, or *identifier* is empty
+    """
+    validate_category_name(category_name)
+    if not identifier:
+        raise ValueError("Entity identifier must not be empty")
+    return f"{category_name}:snapshot-{identifier}"
+
+
+def snapshot_version(snapshot: Any) -> int | None:
+    """Return the stream position recorded in the metadata of a snapshot message,
+    or `None` if it recorded none."""
+    metadata = snapshot["metadata"]
+    if isinstance(metadata, str):  # The client may use a `RawCodec`
+        metadata = json.loads(metadata)
+    if not isinstance(metadata, dict):
+        return None
+    return metadata.get("version")
+
+
+def entity_from_snapshot(stream_name: str, snapshot: Any) -> Entity:
+    """Return an entity starting from its last snapshot message, if any.
+
+    A snapshot that does not record its version cannot be lined up with the
+    stream, so it is ignored, and the whole stream is replayed.
+    """
+    entity = Entity(stream_name)
+    if snapshot is not None:
+        version = snapshot_version(snapshot)
+        if version is not None:
+            entity.snapshot = snapshot["data"]
+            entity.snapshot_version = version
+    return entity
+
+
+def should_snapshot(entity: Entity, version: int, every: int) -> bool:
+    """Return whether at least *every* messages were written since the last snapshot."""
+    if every < 1:
+        raise ValueError(f"every must be > 0, got {every}")
+    last_version = -1 if entity.snapshot_version is None else entity.snapshot_version
+    return version - last_version >= every
+
+
+def lock_order(stream_names: Iterable[str]) -> List[str]:
+    """Return a stream name per category of *stream_names*, sorted by category.
+
+    Writes that take their category locks in this order cannot deadlock with
+    each other, whatever the order of their messages.
+    """
+    streams: Dict[str, str] = {}
+    for stream_name in stream_names:
+        streams.setdefault(stream_name.split("-", 1)[0], stream_name)
+    return [streams[category] for category in sorted(streams)]
+
+
+def batch_messages(
+    stream_name: str, data: List[Tuple], expected_version: int | None = None
+) -> List[Tuple[str, str, Dict[str, Any], Dict[str, Any] | None, int | None]]:
+    """Expand `write_batch` records into rows for a multi-message write.
+
+    The first message expects *expected_version*, and each subsequent message
+    expects the position of the message before it.
+    """
+    if not data:
+        raise ValueError("No messages to write")
+
+    return [
+        (
+            stream_name,
+            record[0],
+            record[1],
+            record[2] if len(record) > 2 else None,
+            None if expected_version is None else expected_version + index,
+        )
+        for index, record in enumerate(data)
+    ]
+
+
+def import_csv(messages: List[Tuple], codec: Codec = JSON_CODEC) -> io.StringIO:
+    """Return a chunk of `bulk_import` records as CSV rows of the staging table.
+
+    Each record is a ``(stream_name, message_type, data, metadata)`` tuple, where
+    metadata is optional.
+    """
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    for ordinality, record in enumerate(messages):
+        stream_name, message_type, data = record[0], record[1], record[2]
+        metadata = record[3] if len(record) > 3 else None
+        validate_stream_name(stream_name)
+        writer.writerow(
+            (
+                ordinality,
+                uuid4(),
+                stream_name,
+                message_type,
+                codec.encode(data),
+                # An unquoted empty field is read as NULL
+                codec.encode(metadata) if metadata else None,
+            )
+        )
+
+    buffer.seek(0)
+    return buffer
+
+
+def decode_message(row: Dict[str, Any], codec: Codec = JSON_CODEC) -> Dict[str, Any]:
+    """Convert a database row into a message dictionary with decoded JSON fields."""
+    message = dict(row)
+    message["data"] = codec.decode(message["data"])
+    message["metadata"] = (
+        codec.decode(message["metadata"]) if message["metadata"] else None
+    )
+    return message
+
+
+def message_row(row: Dict[str, Any]) -> Dict[str, Any]:
+    """Drop the scan summary columns from a row returned by a filtered read."""
+    return {field: row[field] for field in Message.FIELDS}
+
+
+def filtered_batch(rows: Sequence[Dict[str, Any]], decode: Any) -> MessageBatch:
+    """Build a `MessageBatch` from the rows returned by a filtered read."""
+    if not rows:
+        return MessageBatch()
+
+    return MessageBatch(
+        [decode(message_row(row)) for row in rows if row["id"] is not None],
+        rows[0]["scanned_count"],
+        rows[0]["last_position"],
+    )
+
+
+def version_from_error(exc: Exception) -> Tuple[str, int] | None:
+    """Return the stream name and actual version reported by a write that failed
+    on a wrong expected version, or `None` for other errors."""
+    match = WRONG_VERSION_PATTERN.search(str(exc))
+    if match is None:
+        return None
+    return match.group(1), int(match.group(2))
+
+
+def _write_error(exc: DatabaseError) -> ValueError:
+    """Translate a database error raised by `write_message` into a `ValueError`."""
+    return ValueError(
+        f"{getattr(exc, 'pgcode')}-{getattr(exc, 'pgerror').splitlines()[0]}"
+    )
 
 
 class MessageDB:
     """This class provides a Python interface to all MessageDB commands."""
 
+    SNAPSHOT_MESSAGE_TYPE = "SNAPSHOT"
+
     @classmethod
-    def from_url(cls, url: str, **kwargs: Any) -> MessageDB:
+    def from_url(
+        cls,
+        url: str,
+        codec: Codec | None = None,
+        lazy_decoding: bool = False,
+        stream_cache: StreamCache | None = None,
+        version_cache: VersionCache | None = None,
+        combine_writes: bool = False,
+        prepared_statements: bool = False,
+        instrumentation: Instrumentation | None = None,
+        read_urls: List[str] | None = None,
+        read_your_writes: float | None = None,
+        replica_wait_timeout: float | None = None,
+        **kwargs: Any,
+    ) -> MessageDB:
         """Returns a MessageDB client object configured from the given URL.
 
         The general form of a connection string is:
@@ -26,12 +699,46 @@ class MessageDB:
 
         Args:
             url (str): Postgres-compliant URL connection string
+            codec (Codec): Codec for message data and metadata, see `MessageDB.__init__`
+            lazy_decoding (bool): Return `Message` records, see `MessageDB.__init__`
+            stream_cache (StreamCache): Cache for `read_stream`, see `MessageDB.__init__`
+            version_cache (VersionCache): Cache for `stream_version`, see `MessageDB.__init__`
+            combine_writes (bool): Combine concurrent writes, see `MessageDB.__init__`
+            prepared_statements (bool): Execute the hot statements by name, see
+                `MessageDB.__init__`
+            instrumentation (Instrumentation): Receives the timings of the client
+                and its connection pool
+            read_urls (List[str]): URLs of read replicas, each given a pool created
+                with the same keyword arguments, see `MessageDB.__init__`
+            read_your_writes (float): Window of consistent stream reads after a
+                write, see `MessageDB.__init__`
+            replica_wait_timeout (float): Wait for a replica to catch up, see
+                `MessageDB.__init__`
+            kwargs: Keyword arguments to pass to `ConnectionPool.from_url()`
 
         Returns:
             MessageDB: MessageDB client object
         """
-        connection_pool = ConnectionPool.from_url(url, **kwargs)
-        return cls(connection_pool=connection_pool)
+        connection_pool = ConnectionPool.from_url(
+            url, instrumentation=instrumentation, **kwargs
+        )
+        read_pools = [
+            ConnectionPool.from_url(read_url, instrumentation=instrumentation, **kwargs)
+            for read_url in read_urls or []
+        ]
+        return cls(
+            connection_pool=connection_pool,
+            codec=codec,
+            lazy_decoding=lazy_decoding,
+            stream_cache=stream_cache,
+            version_cache=version_cache,
+            combine_writes=combine_writes,
+            prepared_statements=prepared_statements,
+            instrumentation=instrumentation,
+            read_pools=read_pools,
+            read_your_writes=read_your_writes,
+            replica_wait_timeout=replica_wait_timeout,
+        )
 
     def __init__(
         self,
@@ -41,12 +748,163 @@ class MessageDB:
         host: str = "localhost",
         port: int = 5432,
         connection_pool: ConnectionPool | None = None,
+        codec: Codec | None = None,
+        lazy_decoding: bool = False,
+        stream_cache: StreamCache | None = None,
+        version_cache: VersionCache | None = None,
+        combine_writes: bool = False,
+        prepared_statements: bool = False,
+        instrumentation: Instrumentation | None = None,
+        read_pools: List[ConnectionPool] | None = None,
+        read_your_writes: float | None = None,
+        replica_wait_timeout: float | None = None,
     ) -> None:
+        """Initialize the client.
+
+        Args:
+            connection_pool: Pool to draw connections from; created from the
+                connection arguments if not provided
+            codec: Codec that encodes and decodes message data and metadata.
+                Defaults to `JsonCodec`; pass `OrjsonCodec` or `MsgspecCodec`
+                for speed. Use `RawCodec` to skip decoding altogether.
+            lazy_decoding: Return messages as `Message` records, which decode
+                `data` and `metadata` on first access, instead of dictionaries.
+            stream_cache: Cache of stream prefixes for `read_stream`. Messages
+                already read are served from memory, and only the messages
+                after them are read from the database.
+            version_cache: Cache of stream versions for `stream_version`, kept up
+                to date by the writes made through this client.
+            combine_writes: Write concurrent `write` calls in shared transactions,
+                with a `WriteCombiner`. Assign `write_combiner` to tune it.
+            prepared_statements: Prepare the statements that write a message, read
+                a category or `$all`, and read a stream's last message or version,
+                once per pooled connection, and execute them by name.
+                Postgres then skips parsing and planning them on every call.
+            instrumentation: Receives the timings of writes and reads, split by
+                phase, and expected version conflicts. It is also given to the
+                connection pool created by the client.
+            read_pools: Pools of streaming replicas. Reads of streams, categories
+                and `$all`, stream identifiers and exports are sent to them in
+                turn. Writes and `stream_version`, which guards writes, stay on
+                *connection_pool*.
+            read_your_writes: Number of seconds after a write through this client
+                during which reads of the written stream must see it. They are
+                sent to *connection_pool*, unless *replica_wait_timeout* is set.
+            replica_wait_timeout: Wait up to this number of seconds for a replica
+                to catch up with the writes of the *read_your_writes* window,
+                before falling back to *connection_pool*.
+
+        Raises:
+            ValueError: If read_your_writes is not positive, or
+                replica_wait_timeout is negative
+        """
+        if read_your_writes is not None and read_your_writes <= 0:
+            raise ValueError(f"read_your_writes must be > 0, got {read_your_writes}")
+        if replica_wait_timeout is not None and replica_wait_timeout < 0:
+            raise ValueError(
+                f"replica_wait_timeout must be >= 0, got {replica_wait_timeout}"
+            )
+
         if not connection_pool:
             connection_pool = ConnectionPool(
-                dbname=dbname, user=user, password=password, host=host, port=port
+                dbname=dbname,
+                user=user,
+                password=password,
+                host=host,
+                port=port,
+                instrumentation=instrumentation,
             )
         self.connection_pool = connection_pool
+        self.codec = codec or default_codec()
+        self.lazy_decoding = lazy_decoding
+        self.stream_cache = stream_cache
+        self.version_cache = version_cache
+        self.write_combiner = WriteCombiner(self) if combine_writes else None
+        self.prepared_statements = prepared_statements
+        self.instrumentation = instrumentation
+        self.read_pools = read_pools or []
+        self.replica_wait_timeout = replica_wait_timeout
+        # The positions written by this client, kept for the read-your-writes window
+        self.recent_writes = (
+            VersionCache(ttl=read_your_writes)
+            if self.read_pools and read_your_writes is not None
+            else None
+        )
+        self._read_pool_counter = count()
+
+    def _timer(self, operation: str) -> OperationTimer | None:
+        """Start timing an operation, if the client is instrumented."""
+        if self.instrumentation is None:
+            return None
+        return OperationTimer(self.instrumentation, operation)
+
+    def _read_pool(self, *stream_names: str) -> ConnectionPool:
+        """Return the pool to read from: the next replica, or the primary when the
+        replica may miss recent writes of this client to the given streams."""
+        if not self.read_pools:
+            return self.connection_pool
+
+        pool = self.read_pools[next(self._read_pool_counter) % len(self.read_pools)]
+        if self.recent_writes is None:
+            return pool
+
+        versions = []
+        for stream_name in stream_names:
+            version = self.recent_writes.get(stream_name)
+            if version is not None:
+                versions.append((stream_name, version))
+        if not versions:
+            return pool
+
+        if self.replica_wait_timeout is None or not self._wait_for_replica(
+            pool, versions, self.replica_wait_timeout
+        ):
+            return self.connection_pool
+        return pool
+
+    def _wait_for_replica(
+        self, pool: ConnectionPool, versions: List[Tuple[str, int]], timeout: float
+    ) -> bool:
+        """Wait until the streams of a replica reach the given versions.
+
+        Returns:
+            bool: Whether the replica caught up within *timeout* seconds
+        """
+        deadline = time.monotonic() + timeout
+        conn = pool.get_connection()
+        try:
+            with conn.cursor() as cursor:
+                for stream_name, version in versions:
+                    while True:
+                        self._execute(
+                            cursor, STREAM_VERSION_SQL, {"stream_name": stream_name}
+                        )
+                        row = cursor.fetchone()
+                        conn.commit()
+                        if row is not None and row[0] is not None and row[0] >= version:
+                            break
+
+                        remaining = deadline - time.monotonic()
+                        if remaining <= 0:
+                            return False
+                        time.sleep(min(REPLICA_POLL_INTERVAL, remaining))
+        finally:
+            pool.release(conn)
+        return True
+
+    def _execute(self, cursor: Any, sql: str, params: Dict[str, Any]) -> None:
+        """Execute a statement, by name if it is prepared on the connection."""
+        statement = PREPARED_STATEMENTS.get(sql) if self.prepared_statements else None
+        if statement is None:
+            cursor.execute(sql, params)
+        else:
+            execute_prepared(cursor, statement, params)
+
+    def _decode(self, row: Dict[str, Any]) -> Any:
+        """Turn a row into a `Message` when decoding lazily, or a dictionary otherwise."""
+        if self.lazy_decoding:
+            return Message.from_row(row, self.codec)
+        return decode_message(row, self.codec)
 
     def _write(
         self,
@@ -60,17 +918,19 @@ class MessageDB:
         """Write a message to a stream."""
         try:
             with connection.cursor(cursor_factory=RealDictCursor) as cursor:
-                cursor.execute(
-                    (
-                        "SELECT message_store.write_message(%(identifier)s, %(stream_name)s, %(type)s, "
-                        "%(data)s, %(metadata)s, %(expected_version)s);"
-                    ),
+                self._execute(
+                    cursor,
+                    WRITE_MESSAGE_SQL,
                     {
                         "identifier": str(uuid4()),
                         "stream_name": stream_name,
                         "type": message_type,
-                        "data": Json(data),
-                        "metadata": Json(metadata) if metadata else None,
+                        "data": Json(data, dumps=self.codec.encode),
+                        "metadata": (
+                            Json(metadata, dumps=self.codec.encode)
+                            if metadata
+                            else None
+                        ),
                         "expected_version": expected_version,
                     },
                 )
@@ -79,12 +939,62 @@ class MessageDB:
                 if result is None:
                     raise ValueError("No result returned from the database operation.")
         except DatabaseError as exc:
-            raise ValueError(
-                f"{getattr(exc, 'pgcode')}-{getattr(exc, 'pgerror').splitlines()[0]}"
-            ) from exc
+            raise _write_error(exc) from exc
 
         return result["write_message"]
 
+    def _write_messages(
+        self,
+        connection: connection,
+        messages: List[
+            Tuple[str, str, Dict[str, Any], Dict[str, Any] | None, int | None]
+        ],
+    ) -> List[int]:
+        """Write several messages with a single `write_message` call per row.
+
+        Each message is a tuple of ``(stream_name, message_type, data, metadata,
+        expected_version)``. The rows are shipped as arrays and unnested server-side,
+        so the batch costs one round trip regardless of its size. Messages are
+        written in the order given, and their positions are returned in that order.
+
+        When the messages span several categories, their category locks are taken
+        first, in a fixed order, so that concurrent batches do not deadlock.
+        """
+        locks = lock_order(message[0] for message in messages)
+        try:
+            with connection.cursor() as cursor:
+                if len(locks) > 1:
+                    cursor.execute(LOCK_CATEGORIES_SQL, {"stream_names": locks})
+                cursor.execute(
+                    WRITE_MESSAGES_SQL,
+                    {
+                        "identifiers": [str(uuid4()) for _ in messages],
+                        "stream_names": [message[0] for message in messages],
+                        "types": [message[1] for message in messages],
+                        "data": [
+                            Json(message[2], dumps=self.codec.encode)
+                            for message in messages
+                        ],
+                        "metadata": [
+                            (
+                                Json(message[3], dumps=self.codec.encode)
+                                if message[3]
+                                else None
+                            )
+                            for message in messages
+                        ],
+                        "expected_versions": [message[4] for message in messages],
+                    },
+                )
+
+                positions = [row[0] for row in cursor.fetchall()]
+                if len(positions) != len(messages):
+                    raise ValueError("No result returned from the database operation.")
+        except DatabaseError as exc:
+            raise _write_error(exc) from exc
+
+        return positions
+
     def write(
         self,
         stream_name: str,
@@ -93,42 +1003,214 @@ class MessageDB:
         metadata: Dict | None = None,
         expected_version: int | None = None,
     ) -> int:
-        """Write a message to a stream."""
-        conn = self.connection_pool.get_connection()
+        """Write a message to a stream.
+
+        With a write combiner, the message is written along with the messages of
+        concurrent `write` calls, in a single transaction.
+        """
+        timer = self._timer("write")
+        try:
+            if self.write_combiner is not None:
+                position = self.write_combiner.write(
+                    stream_name, message_type, data, metadata, expected_version
+                )
+                if timer:
+                    timer.phase("combine")
+            else:
+                position = self._write_uncombined(
+                    timer, stream_name, message_type, data, metadata, expected_version
+                )
+        except ValueError as exc:
+            self._correct_version(exc)
+            raise
 
+        self._record_write(stream_name, position)
+        if timer:
+            timer.finish()
+        return position
+
+    def _write_uncombined(
+        self,
+        timer: OperationTimer | None,
+        stream_name: str,
+        message_type: str,
+        data: Dict,
+        metadata: Dict | None,
+        expected_version: int | None,
+    ) -> int:
+        """Write a message in its own transaction."""
+        conn = self.connection_pool.get_connection()
+        if timer:
+            timer.phase("checkout")
         try:
             with conn:
                 position = self._write(
                     conn, stream_name, message_type, data, metadata, expected_version
                 )
+                if timer:
+                    timer.phase("execute")
+            if timer:
+                timer.phase("commit")
         finally:
             self.connection_pool.release(conn)
-
         return position
 
+    def _record_write(self, stream_name: str, position: int) -> None:
+        """Remember the new version of a stream that was written to."""
+        if self.version_cache is not None:
+            self.version_cache.set(stream_name, position)
+        if self.recent_writes is not None:
+            self.recent_writes.set(stream_name, position)
+
     def write_batch(
         self, stream_name, data, expected_version: int | None = None
     ) -> int:
-        """Write a batch of messages to a stream."""
+        """Write a batch of messages to a stream.
+
+        The whole batch is sent to the database in a single round trip and written
+        in one transaction. If ``expected_version`` is provided, it applies to the
+        first message, and each subsequent message expects the position of the
+        message before it.
+        """
+        messages = batch_messages(stream_name, data, expected_version)
+
+        timer = self._timer("write_batch")
         conn = self.connection_pool.get_connection()
+        if timer:
+            timer.phase("checkout")
 
         try:
             with conn:
-                for record in data:
-                    position = self._write(
-                        conn,
-                        stream_name,
-                        record[0],
-                        record[1],
-                        metadata=record[2] if len(record) > 2 else None,
-                        expected_version=expected_version,
-                    )
+                positions = self._write_messages(conn, messages)
+                if timer:
+                    timer.phase("execute")
+            if timer:
+                timer.phase("commit")
+        except ValueError as exc:
+            self._correct_version(exc)
+            raise
+        finally:
+            self.connection_pool.release(conn)
+
+        self._record_write(stream_name, positions[-1])
+        if timer:
+            timer.finish()
+        return positions[-1]
+
+    def bulk_import(self, messages: Iterable[Tuple], chunk_size: int = 10_000) -> int:
+        """Import a large number of messages, such as historical events.
+
+        Messages are read from *messages* in chunks of *chunk_size*, so any
+        iterable or generator can be imported in bounded memory. Each chunk is
+        loaded with ``COPY`` into a staging table, and written in one set-based
+        statement that assigns stream positions after the current version of each
+        stream, in the order the messages are given. Expected versions are not
+        checked.
+
+        Each chunk is written in its own transaction, on a single connection. If
+        a chunk fails, the chunks before it remain written.
+
+        Args:
+            messages: ``(stream_name, message_type, data, metadata)`` tuples, where
+                metadata is optional
+            chunk_size: Number of messages written per transaction
+
+        Returns:
+            int: The number of messages imported
+
+        Raises:
+            ValueError: If a stream name is not a stream, chunk_size is not
+                positive, or a chunk could not be written
+        """
+        if chunk_size < 1:
+            raise ValueError(f"chunk_size must be > 0, got {chunk_size}")
+
+        iterator = iter(messages)
+        imported = 0
 
-                    expected_version = position
+        conn = self.connection_pool.get_connection()
+        try:
+            while True:
+                chunk = list(islice(iterator, chunk_size))
+                if not chunk:
+                    break
+
+                rows = import_csv(chunk, self.codec)
+                try:
+                    with conn:
+                        with conn.cursor() as cursor:
+                            cursor.execute(IMPORT_TABLE_SQL)
+                            cursor.copy_expert(IMPORT_COPY_SQL, rows)
+                            cursor.execute(IMPORT_LOCK_SQL)
+                            cursor.execute(IMPORT_MESSAGES_SQL)
+                            versions = cursor.fetchall()
+                except DatabaseError as exc:
+                    raise _write_error(exc) from exc
+
+                imported += len(chunk)
+                for stream_name, version in versions:
+                    self._record_write(stream_name, version)
         finally:
             self.connection_pool.release(conn)
 
-        return position
+        return imported
+
+    def _correct_version(self, exc: ValueError) -> None:
+        """Cache the actual stream version reported by a wrong expected version
+        error, and report the conflict."""
+        if self.version_cache is None and self.instrumentation is None:
+            return
+
+        version = version_from_error(exc)
+        if version is None:
+            return
+        if self.version_cache is not None:
+            self.version_cache.set(*version)
+        if self.instrumentation is not None:
+            self.instrumentation.version_conflict(*version)
+
+    def stream_version(self, stream_name: str) -> int:
+        """Return the version of a stream: the position of its last message.
+
+        With a version cache, the version is read from the cache when known, and
+        cached otherwise. It may then be stale when other clients write to the
+        stream, in which case a write expecting it fails and corrects the cache.
+
+        Args:
+            stream_name: The name of the stream
+
+        Returns:
+            The version of the stream, or -1 if the stream has no messages. It can be
+            passed as `expected_version` to the next write.
+        """
+        if self.version_cache is not None:
+            version = self.version_cache.get(stream_name)
+            if version is not None:
+                return version
+
+        timer = self._timer("stream_version")
+        conn = self.connection_pool.get_connection()
+        try:
+            if timer:
+                timer.phase("checkout")
+            with conn.cursor() as cursor:
+                self._execute(cursor, STREAM_VERSION_SQL, {"stream_name": stream_name})
+                if timer:
+                    timer.phase("execute")
+                row = cursor.fetchone()
+
+            conn.commit()
+            if timer:
+                timer.phase("fetch")
+        finally:
+            self.connection_pool.release(conn)
+
+        version = -1 if row is None or row[0] is None else row[0]
+        if self.version_cache is not None:
+            self.version_cache.set(stream_name, version)
+        if timer:
+            timer.finish()
+        return version
 
     def read(
         self,
@@ -138,89 +1220,121 @@ class MessageDB:
         no_of_messages: int = 1000,
         consumer_group_member: int | None = None,
         consumer_group_size: int | None = None,
+        message_types: List[str] | None = None,
     ) -> List[Dict[str, Any]]:
         """Read messages from a stream or category.
 
         Returns a list of messages from the stream or category starting from the given position.
+
+        With *message_types*, only messages of these types are returned, filtered by
+        the database, and the result is a `MessageBatch` that reports the last
+        position scanned.
         """
-        conn = self.connection_pool.get_connection()
+        timer = self._timer(read_operation(stream_name))
+        pool = self._read_pool(*([stream_name] if "-" in stream_name else []))
+        conn = pool.get_connection()
         try:
+            if timer:
+                timer.phase("checkout")
             cursor = conn.cursor(cursor_factory=RealDictCursor)
 
             if not sql:
-                if stream_name == "$all":
-                    sql = """
-                        SELECT
-                            id::varchar,
-                            stream_name::varchar,
-                            type::varchar,
-                            position::bigint,
-                            global_position::bigint,
-                            data::varchar,
-                            metadata::varchar,
-                            time::timestamp
-                        FROM
-                            messages
-                        WHERE
-                            global_position > %(position)s
-                        LIMIT %(batch_size)s
-                    """
-                elif "-" in stream_name:
-                    sql = "SELECT * FROM get_stream_messages(%(stream_name)s, %(position)s, %(batch_size)s);"
-                else:
-                    sql = "SELECT * FROM get_category_messages(%(stream_name)s::varchar, %(position)s::bigint, %(batch_size)s::bigint"
-                    if consumer_group_member is not None:
-                        sql += ", NULL, %(consumer_group_member)s::bigint, %(consumer_group_size)s::bigint"
-                    sql += ");"
-
-            params = {
-                "stream_name": stream_name,
-                "position": position,
-                "batch_size": no_of_messages,
-            }
-            if consumer_group_member is not None:
-                params["consumer_group_member"] = consumer_group_member
-                params["consumer_group_size"] = consumer_group_size
+                sql = read_sql(
+                    stream_name, consumer_group_member is not None, message_types
+                )
 
-            cursor.execute(sql, params)
+            self._execute(
+                cursor,
+                sql,
+                read_params(
+                    stream_name,
+                    position,
+                    no_of_messages,
+                    consumer_group_member,
+                    consumer_group_size,
+                    message_types,
+                ),
+            )
+            if timer:
+                timer.phase("execute")
             raw_messages = cursor.fetchall()
 
             conn.commit()
             cursor.close()
+            if timer:
+                timer.phase("fetch")
         finally:
-            self.connection_pool.release(conn)
-
-        messages = []
-        for message in raw_messages:
-            processed_message = dict(
-                message
-            )  # Convert each RealDictRow to a dictionary
-            processed_message["data"] = json.loads(processed_message["data"])
-            processed_message["metadata"] = (
-                json.loads(processed_message["metadata"])
-                if processed_message["metadata"]
-                else None
-            )
-            messages.append(processed_message)
+            pool.release(conn)
 
+        messages: List[Dict[str, Any]]
+        if message_types is not None:
+            messages = filtered_batch(raw_messages, self._decode)
+        else:
+            messages = [self._decode(message) for message in raw_messages]
+        if timer:
+            timer.phase("decode")
+            timer.finish(raw_messages)
         return messages
 
     def read_stream(
-        self, stream_name: str, position: int = 0, no_of_messages: int = 1000
+        self,
+        stream_name: str,
+        position: int = 0,
+        no_of_messages: int = 1000,
+        message_types: List[str] | None = None,
     ) -> List[Dict[str, Any]]:
         """Read messages from a stream.
 
         Returns a list of messages from the stream starting from the given position.
+        See `read` for *message_types*.
+
+        With a stream cache, unfiltered reads are served from the cached prefix of
+        the stream, and only the messages after it are read from the database.
         """
-        if "-" not in stream_name:
-            raise ValueError(f"{stream_name} is not a stream")
+        validate_stream_name(stream_name)
 
-        sql = "SELECT * FROM get_stream_messages(%(stream_name)s, %(position)s, %(batch_size)s);"
+        if self.stream_cache is not None and message_types is None:
+            return self._read_stream_cached(
+                self.stream_cache, stream_name, position, no_of_messages
+            )
 
         return self.read(
-            stream_name, sql=sql, position=position, no_of_messages=no_of_messages
+            stream_name,
+            sql=read_sql(stream_name, message_types=message_types),
+            position=position,
+            no_of_messages=no_of_messages,
+            message_types=message_types,
         )
 
+    def _read_stream_cached(
+        self,
+        stream_cache: StreamCache,
+        stream_name: str,
+        position: int,
+        no_of_messages: int,
+    ) -> List[Dict[str, Any]]:
+        messages, cached = stream_cache.read(stream_name, position, no_of_messages)
+        if len(messages) == no_of_messages:
+            return messages
+
+        if position > cached:
+            # The cache only holds contiguous prefixes
+            return self.read(
+                stream_name,
+                sql=STREAM_MESSAGES_SQL,
+                position=position,
+                no_of_messages=no_of_messages,
+            )
+
+        tail = self.read(
+            stream_name,
+            sql=STREAM_MESSAGES_SQL,
+            position=cached,
+            no_of_messages=position + no_of_messages - cached,
+        )
+        stream_cache.extend(stream_name, cached, tail)
+        return messages + tail
+
     def read_category(
         self,
         category_name: str,
@@ -228,6 +1342,7 @@ class MessageDB:
         no_of_messages: int = 1000,
         consumer_group_member: int | None = None,
         consumer_group_size: int | None = None,
+        message_types: List[str] | None = None,
     ) -> List[Dict[str, Any]]:
         """Read messages from a category.
 
@@ -241,6 +1356,7 @@ class MessageDB:
             no_of_messages: Maximum number of messages to retrieve
             consumer_group_member: Zero-based consumer identifier within the group
             consumer_group_size: Total number of consumers in the group
+            message_types: Only return messages of these types, see `read`
 
         Returns:
             List of message dictionaries
@@ -248,43 +1364,349 @@ class MessageDB:
         Raises:
             ValueError: If category_name contains hyphen or consumer group parameters are invalid
         """
-        if "-" in category_name:
-            raise ValueError(f"{category_name} is not a category")
-
-        # Validate consumer group parameters
-        if (consumer_group_member is None) != (consumer_group_size is None):
-            raise ValueError(
-                "Both consumer_group_member and consumer_group_size must be provided together or both must be None"
-            )
-
-        if consumer_group_member is not None and consumer_group_size is not None:
-            if consumer_group_member < 0:
-                raise ValueError(
-                    f"consumer_group_member must be >= 0, got {consumer_group_member}"
-                )
-            if consumer_group_size <= 0:
-                raise ValueError(
-                    f"consumer_group_size must be > 0, got {consumer_group_size}"
-                )
-            if consumer_group_member >= consumer_group_size:
-                raise ValueError(
-                    f"consumer_group_member ({consumer_group_member}) must be less than consumer_group_size ({consumer_group_size})"
-                )
-
-        sql = "SELECT * FROM get_category_messages(%(stream_name)s::varchar, %(position)s::bigint, %(batch_size)s::bigint"
-        if consumer_group_member is not None:
-            sql += ", NULL, %(consumer_group_member)s::bigint, %(consumer_group_size)s::bigint"
-        sql += ");"
+        validate_category_name(
+            category_name, consumer_group_member, consumer_group_size
+        )
 
         return self.read(
             category_name,
-            sql=sql,
+            sql=read_sql(
+                category_name, consumer_group_member is not None, message_types
+            ),
             position=position,
             no_of_messages=no_of_messages,
             consumer_group_member=consumer_group_member,
             consumer_group_size=consumer_group_size,
+            message_types=message_types,
         )
 
+    def read_streams(
+        self,
+        stream_names: List[str],
+        position: int | Dict[str, int] = 0,
+        no_of_messages: int = 1000,
+    ) -> Dict[str, List[Dict[str, Any]]]:
+        """Read messages from several streams in a single query.
+
+        Each stream is read with `get_stream_messages`, all within one statement,
+        so loading many aggregates costs one connection checkout and one round
+        trip instead of one per stream.
+
+        Args:
+            stream_names: The streams to read
+            position: Starting position of every stream, or a dictionary of
+                starting positions by stream name (missing streams start at 0)
+            no_of_messages: Maximum number of messages to retrieve per stream
+
+        Returns:
+            Dictionary of messages by stream name, in the order of *stream_names*.
+            Streams without messages map to an empty list.
+
+        Raises:
+            ValueError: If any of the stream names is not a stream
+        """
+        stream_names = list(dict.fromkeys(stream_names))
+        params = streams_params(stream_names, position, no_of_messages)
+        messages: Dict[str, List[Dict[str, Any]]] = {
+            stream_name: [] for stream_name in stream_names
+        }
+        if not stream_names:
+            return messages
+
+        timer = self._timer("read_streams")
+        pool = self._read_pool(*stream_names)
+        conn = pool.get_connection()
+        try:
+            if timer:
+                timer.phase("checkout")
+            with conn.cursor(cursor_factory=RealDictCursor) as cursor:
+                cursor.execute(STREAMS_MESSAGES_SQL, params)
+                if timer:
+                    timer.phase("execute")
+                raw_messages = cursor.fetchall()
+
+            conn.commit()
+            if timer:
+                timer.phase("fetch")
+        finally:
+            pool.release(conn)
+
+        for message in raw_messages:
+            messages[message["stream_name"]].append(self._decode(message))
+        if timer:
+            timer.phase("decode")
+            timer.finish(raw_messages)
+        return messages
+
+    def _iter(
+        self,
+        stream_name: str,
+        sql: str,
+        position: int,
+        batch_size: int,
+        itersize: int,
+        consumer_group_member: int | None = None,
+        consumer_group_size: int | None = None,
+        message_types: List[str] | None = None,
+    ) -> Iterator[Dict[str, Any]]:
+        """Yield messages page by page through a server-side cursor.
+
+        Each page of up to *batch_size* messages is streamed from a named cursor,
+        *itersize* rows per network fetch, and decoded one message at a time. The
+        next page starts after the last message scanned, until a short page signals
+        the end. The connection is held until the iterator is exhausted or closed.
+
+        With *message_types*, pages are filtered by the database, and the next page
+        starts after the last message scanned, whether it matched or not.
+        """
+        if stream_name == "$all":
+            position_key, offset = "global_position", 0
+        elif "-" in stream_name:
+            position_key, offset = "position", 1
+        else:
+            position_key, offset = "global_position", 1
+
+        pool = self._read_pool(*([stream_name] if "-" in stream_name else []))
+        conn = pool.get_connection()
+        try:
+            while True:
+                scanned = 0
+                last_position = None
+                with conn.cursor(
+                    name=f"message_db_{uuid4().hex}", cursor_factory=RealDictCursor
+                ) as cursor:
+                    cursor.itersize = itersize
+                    cursor.execute(
+                        sql,
+                        read_params(
+                            stream_name,
+                            position,
+                            batch_size,
+                            consumer_group_member,
+                            consumer_group_size,
+                            message_types,
+                        ),
+                    )
+
+                    for row in cursor:
+                        if message_types is not None:
+                            scanned = row["scanned_count"]
+                            last_position = row["last_position"]
+                            if row["id"] is None:
+                                continue
+                            yield self._decode(message_row(row))
+                        else:
+                            scanned += 1
+                            last_position = row[position_key]
+                            yield self._decode(row)
+
+                conn.commit()
+
+                if last_position is not None:
+                    position = last_position + offset
+                if scanned < batch_size:
+                    break
+        finally:
+            pool.release(conn)
+
+    def iter_read(
+        self,
+        stream_name: str,
+        position: int = 0,
+        batch_size: int = 1000,
+        itersize: int = 100,
+        message_types: List[str] | None = None,
+    ) -> Iterator[Dict[str, Any]]:
+        """Iterate over all messages in a stream, a category, or `$all`.
+
+        Unlike `read`, which returns at most one batch, the iterator pages
+        transparently until the end and keeps only *itersize* rows in memory.
+
+        Args:
+            stream_name: The stream, category, or `$all` to read from
+            position: Starting position for reading messages
+            batch_size: Number of messages requested from the database per page
+            itersize: Number of rows fetched from the server-side cursor at a time
+            message_types: Only yield messages of these types, filtered by the database
+
+        Returns:
+            Iterator of message dictionaries
+        """
+        return self._iter(
+            stream_name,
+            read_sql(stream_name, message_types=message_types),
+            position,
+            batch_size,
+            itersize,
+            message_types=message_types,
+        )
+
+    def iter_category(
+        self,
+        category_name: str,
+        position: int = 0,
+        batch_size: int = 1000,
+        itersize: int = 100,
+        consumer_group_member: int | None = None,
+        consumer_group_size: int | None = None,
+        message_types: List[str] | None = None,
+    ) -> Iterator[Dict[str, Any]]:
+        """Iterate over all messages in a category.
+
+        See `iter_read` for paging and filtering, and `read_category` for consumer groups.
+
+        Raises:
+            ValueError: If category_name contains hyphen or consumer group parameters are invalid
+        """
+        validate_category_name(
+            category_name, consumer_group_member, consumer_group_size
+        )
+
+        return self._iter(
+            category_name,
+            read_sql(category_name, consumer_group_member is not None, message_types),
+            position,
+            batch_size,
+            itersize,
+            consumer_group_member,
+            consumer_group_size,
+            message_types,
+        )
+
+    def iter_all(
+        self,
+        position: int = 0,
+        batch_size: int = 1000,
+        itersize: int = 100,
+        message_types: List[str] | None = None,
+        category: str | None = None,
+        gap_timeout: float | None = None,
+    ) -> Iterator[Dict[str, Any]]:
+        """Iterate over all messages in the store, in global position order.
+
+        *position* is exclusive: iteration starts after that global position.
+
+        With *category* or *gap_timeout*, messages are read page by page with
+        `read_all`, and the iteration ends when a page comes back empty.
+        """
+        if category is None and gap_timeout is None:
+            return self.iter_read("$all", position, batch_size, itersize, message_types)
+        if message_types is not None:
+            raise ValueError(
+                "message_types cannot be combined with category or gap_timeout"
+            )
+        return self._iter_all(position, batch_size, category, gap_timeout)
+
+    def _iter_all(
+        self,
+        position: int,
+        batch_size: int,
+        category: str | None,
+        gap_timeout: float | None,
+    ) -> Iterator[Dict[str, Any]]:
+        while True:
+            messages = self.read_all(position, batch_size, category, gap_timeout)
+            if not messages:
+                break
+
+            yield from messages
+            position = messages[-1]["global_position"]
+
+    def read_all(
+        self,
+        position: int = 0,
+        no_of_messages: int = 1000,
+        category: str | None = None,
+        gap_timeout: float | None = None,
+    ) -> List[Dict[str, Any]]:
+        """Read messages from `$all`, in global position order.
+
+        Pages are read with the primary key, or the category index, after
+        *position*, so paging with the global position of the last message read
+        costs the same however far into the store it is.
+
+        Global positions are assigned when messages are inserted, but become
+        visible when their transaction commits, so a message can appear after
+        messages with greater positions. With *gap_timeout*, a read stops before a
+        missing position, so that no message is skipped. When positions before the
+        first message read are missing, the read waits up to *gap_timeout* seconds
+        for each of them to be committed, and then skips it, as the transaction
+        that held it is assumed to have rolled back. With *category*, this
+        includes the positions of messages of other categories.
+
+        Args:
+            position: Global position after which messages are read
+            no_of_messages: Maximum number of messages to read
+            category: Only read messages of the streams in this category
+            gap_timeout: Seconds to wait for a missing position before skipping
+                it. By default, gaps are not detected.
+
+        Returns:
+            List[Dict]: The messages, in global position order
+
+        Raises:
+            ValueError: If *category* is not a category name, or *gap_timeout* is
+                negative
+        """
+        if category is not None:
+            validate_category_name(category)
+        if gap_timeout is not None and gap_timeout < 0:
+            raise ValueError(f"gap_timeout must be >= 0, got {gap_timeout}")
+
+        sql = all_page_sql(category is not None, gap_timeout is not None)
+        params = {
+            "position": position,
+            "batch_size": no_of_messages,
+            "category": category,
+        }
+
+        timer = self._timer("read_all")
+        pool = self._read_pool()
+        conn = pool.get_connection()
+        try:
+            if timer:
+                timer.phase("checkout")
+            rows = self._read_all_rows(conn, sql, params, gap_timeout, timer)
+        finally:
+            pool.release(conn)
+
+        if gap_timeout is not None:
+            for row in rows:
+                del row["gaps"]
+        messages = [self._decode(row) for row in rows]
+        if timer:
+            timer.phase("decode")
+            timer.finish(rows)
+        return messages
+
+    def _read_all_rows(
+        self,
+        conn: connection,
+        sql: str,
+        params: Dict[str, Any],
+        gap_timeout: float | None,
+        timer: OperationTimer | None,
+    ) -> List[Dict[str, Any]]:
+        """Read a page of `$all`, again until its gaps are resolved."""
+        # When each missing position was first seen, to time its gap out
+        gaps_seen: Dict[int, float] = {}
+        while True:
+            with conn.cursor(cursor_factory=RealDictCursor) as cursor:
+                cursor.execute(sql, params)
+                if timer:
+                    timer.phase("execute")
+                rows = cast(List[Dict[str, Any]], cursor.fetchall())
+            conn.commit()
+            if timer:
+                timer.phase("fetch")
+
+            if gap_timeout is None:
+                return rows
+            rows, wait = rows_before_gaps(rows, gaps_seen, gap_timeout)
+            if not wait:
+                return rows
+            time.sleep(min(GAP_POLL_INTERVAL, wait))
+
     def stream_identifiers(self, category_name: str) -> List[str]:
         """Return all unique aggregate identifiers for a stream category.
 
@@ -293,6 +1715,10 @@ class MessageDB:
         ``{category}-{identifier}``; snapshot streams use
         ``{category}:snapshot-{identifier}``.
 
+        The whole list is built by the database in one query. On large stores,
+        install the index from `message_db.migrations.install_stream_name_index`,
+        and prefer `iter_stream_identifiers` to enumerate identifiers page by page.
+
         Args:
             category_name: The stream category (must not contain a hyphen).
 
@@ -302,57 +1728,237 @@ class MessageDB:
         Raises:
             ValueError: If *category_name* contains a hyphen.
         """
-        if "-" in category_name:
-            raise ValueError(f"{category_name} is not a category")
+        validate_category_name(category_name)
 
-        conn = self.connection_pool.get_connection()
+        pool = self._read_pool()
+        conn = pool.get_connection()
         try:
             cursor = conn.cursor()
 
             cursor.execute(
-                """
-                SELECT DISTINCT
-                    substring(stream_name from position('-' in stream_name) + 1)
-                FROM message_store.messages
-                WHERE stream_name LIKE %(pattern)s
-                  AND stream_name NOT LIKE %(snapshot_pattern)s
-                ORDER BY 1
-                """,
-                {
-                    "pattern": f"{category_name}-%",
-                    "snapshot_pattern": f"{category_name}:snapshot-%",
-                },
+                STREAM_IDENTIFIERS_SQL,
+                {"category_name": category_name, "pattern": f"{category_name}-%"},
             )
             identifiers = [row[0] for row in cursor.fetchall() if row[0]]
 
             conn.commit()
             cursor.close()
         finally:
-            self.connection_pool.release(conn)
+            pool.release(conn)
 
         return identifiers
 
+    def iter_stream_identifiers(
+        self,
+        category_name: str,
+        after: str | None = None,
+        limit: int | None = None,
+        batch_size: int = 1000,
+    ) -> Iterator[str]:
+        """Iterate over the unique aggregate identifiers of a stream category.
+
+        Identifiers are yielded in stream name order, *batch_size* at a time, each
+        page starting after the last stream name of the previous one. Snapshot and
+        other ``{category}:...`` streams are excluded, as in `stream_identifiers`.
+
+        Each page is a short loose index scan when the index from
+        `message_db.migrations.install_stream_name_index` is installed, so callers
+        can enumerate aggregates incrementally, or resume from a known identifier.
+
+        Args:
+            category_name: The stream category (must not contain a hyphen)
+            after: Only yield identifiers after this one
+            limit: Maximum number of identifiers to yield
+            batch_size: Number of identifiers requested from the database per page
+
+        Returns:
+            Iterator of aggregate identifiers
+
+        Raises:
+            ValueError: If *category_name* contains a hyphen, or *batch_size* is not positive.
+        """
+        validate_category_name(category_name)
+        if batch_size < 1:
+            raise ValueError(f"batch_size must be > 0, got {batch_size}")
+
+        return self._iter_stream_identifiers(category_name, after, limit, batch_size)
+
+    def _iter_stream_identifiers(
+        self, category_name: str, after: str | None, limit: int | None, batch_size: int
+    ) -> Iterator[str]:
+        prefix = f"{category_name}-"
+        # Every stream name of the category sorts after the bare "{category}-"
+        last_stream_name = prefix if after is None else prefix + after
+        remaining = limit
+        pool = self._read_pool()
+
+        while remaining is None or remaining > 0:
+            page_size = batch_size if remaining is None else min(batch_size, remaining)
+
+            conn = pool.get_connection()
+            try:
+                with conn.cursor() as cursor:
+                    cursor.execute(
+                        STREAM_NAMES_SQL,
+                        {
+                            "category_name": category_name,
+                            "after": last_stream_name,
+                            "limit": page_size,
+                        },
+                    )
+                    stream_names = [row[0] for row in cursor.fetchall()]
+
+                conn.commit()
+            finally:
+                pool.release(conn)
+
+            for stream_name in stream_names:
+                yield stream_name[len(prefix) :]
+
+            if remaining is not None:
+                remaining -= len(stream_names)
+            if len(stream_names) < page_size:
+                break
+            last_stream_name = stream_names[-1]
+
+    def load_entity(self, category_name: str, identifier: str) -> Entity:
+        """Load an entity from its latest snapshot and the messages written after it.
+
+        The snapshot is the last message of the ``{category}:snapshot-{identifier}``
+        stream, written by `write_snapshot`. Only the messages of the entity stream
+        after the position recorded by the snapshot are read, page by page with
+        `read_stream`, so long-lived entities do not replay their whole history.
+        Without a snapshot, or when it does not record its version, the whole
+        stream is read.
+
+        Args:
+            category_name: The category of the entity (must not contain a hyphen)
+            identifier: The identifier of the entity
+
+        Returns:
+            Entity: The snapshot state and version, and the messages after it
+
+        Raises:
+            ValueError: If *category_name* is not a category, or *identifier* is empty
+        """
+        snapshot = self.read_last_message(
+            snapshot_stream_name(category_name, identifier)
+        )
+        entity = entity_from_snapshot(f"{category_name}-{identifier}", snapshot)
+
+        position = 0 if entity.snapshot_version is None else entity.snapshot_version + 1
+        while True:
+            messages = self.read_stream(
+                entity.stream_name,
+                position=position,
+                no_of_messages=LOAD_ENTITY_BATCH_SIZE,
+            )
+            entity.messages.extend(messages)
+            if len(messages) < LOAD_ENTITY_BATCH_SIZE:
+                break
+            position = messages[-1]["position"] + 1
+
+        return entity
+
+    def write_snapshot(
+        self,
+        entity: Entity,
+        state: Dict[str, Any],
+        version: int | None = None,
+        every: int = 1,
+    ) -> int | None:
+        """Record the state of an entity in its snapshot stream.
+
+        The snapshot is only written when at least *every* messages were written
+        to the entity stream since the previous snapshot, so that callers can try
+        to snapshot after every load and let the policy decide.
+
+        Args:
+            entity: The entity, as returned by `load_entity`
+            state: The state of the entity, after applying the messages up to *version*
+            version: The stream position *state* covers, defaults to `entity.version`
+            every: Minimum number of messages between two snapshots
+
+        Returns:
+            The position of the snapshot message, or `None` if no snapshot was due
+
+        Raises:
+            ValueError: If *every* is not positive
+        """
+        if version is None:
+            version = entity.version
+        if not should_snapshot(entity, version, every) or version < 0:
+            return None
+
+        category_name, identifier = entity.stream_name.split("-", 1)
+        position = self.write(
+            snapshot_stream_name(category_name, identifier),
+            self.SNAPSHOT_MESSAGE_TYPE,
+            state,
+            {"version": version},
+        )
+
+        entity.snapshot = state
+        entity.snapshot_version = version
+        entity.messages = [
+            message for message in entity.messages if message["position"] > version
+        ]
+        return position
+
+    def export(
+        self,
+        stream_name: str,
+        output: IO[bytes],
+        format: str = "ndjson",
+        after: int = 0,
+        until: int | None = None,
+    ) -> int:
+        """Export the messages of `$all`, a stream, or a category to a binary file.
+
+        Messages are streamed with ``COPY`` straight into the file, in NDJSON,
+        Parquet or Arrow format, see `message_db.export.export`.
+
+        Returns:
+            int: The global position of the last message exported, to pass as
+            *after* to resume the export later
+        """
+        pool = self._read_pool()
+        conn = pool.get_connection()
+        try:
+            return export_messages(conn, stream_name, output, format, after, until)
+        finally:
+            pool.release(conn)
+
     def read_last_message(self, stream_name: str) -> Dict[str, Any] | None:
         """Read the last message from a stream."""
-        conn = self.connection_pool.get_connection()
+        timer = self._timer("read_last_message")
+        pool = self._read_pool(stream_name)
+        conn = pool.get_connection()
         try:
+            if timer:
+                timer.phase("checkout")
             cursor = conn.cursor(cursor_factory=RealDictCursor)
 
-            cursor.execute(
-                "SELECT * from get_last_stream_message(%(stream_name)s);",
-                {"stream_name": stream_name},
-            )
+            self._execute(cursor, LAST_STREAM_MESSAGE_SQL, {"stream_name": stream_name})
+            if timer:
+                timer.phase("execute")
 
             message = cursor.fetchone()
 
             conn.commit()
             cursor.close()
+            if timer:
+                timer.phase("fetch")
         finally:
-            self.connection_pool.release(conn)
+            pool.release(conn)
 
-        if message:
-            message["data"] = json.loads(message["data"])
-            message["metadata"] = (
-                json.loads(message["metadata"]) if message["metadata"] else None
-            )
-        return message
+        if not message:
+            if timer:
+                timer.finish()
+            return message
+
+        decoded = self._decode(message)
+        if timer:
+            timer.phase("decode")
+            timer.finish([message])
+        return decoded
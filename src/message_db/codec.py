@@ -0,0 +1,104 @@
+from __future__ import annotations
+
+import json
+from abc import ABC, abstractmethod
+from typing import Any
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover
+    orjson = None  # type: ignore[assignment]
+
+try:
+    import msgspec  # type: ignore[import-not-found]
+except ImportError:  # pragma: no cover
+    msgspec = None  # type: ignore[assignment]
+
+
+class Codec(ABC):
+    """Encode and decode the JSON `data` and `metadata` of messages.
+
+    Message DB stores both as `jsonb` and returns them as text, so a codec turns
+    Python values into JSON text on write, and JSON text back into Python values
+    on read.
+    """
+
+    @abstractmethod
+    def encode(self, value: Any) -> str:
+        """Return the JSON text for *value*."""
+
+    @abstractmethod
+    def decode(self, value: str) -> Any:
+        """Return the Python value for the JSON text *value*."""
+
+
+class JsonCodec(Codec):
+    """Codec based on the standard library `json` module."""
+
+    def encode(self, value: Any) -> str:
+        return json.dumps(value)
+
+    def decode(self, value: str) -> Any:
+        return json.loads(value)
+
+
+class OrjsonCodec(Codec):
+    """Codec based on `orjson`, several times faster than `json`.
+
+    Non-string dictionary keys are converted to strings, as `json` does. Unlike
+    `json`, `orjson` rejects integers that do not fit in 64 bits.
+    """
+
+    def __init__(self) -> None:
+        if orjson is None:
+            raise ImportError("OrjsonCodec requires the `orjson` package")
+
+    def encode(self, value: Any) -> str:
+        return orjson.dumps(value, option=orjson.OPT_NON_STR_KEYS).decode("utf-8")
+
+    def decode(self, value: str) -> Any:
+        return orjson.loads(value)
+
+
+class MsgspecCodec(Codec):
+    """Codec based on `msgspec`, several times faster than `json`.
+
+    Unlike `json`, `msgspec` rejects integers that do not fit in 64 bits.
+    """
+
+    def __init__(self) -> None:
+        if msgspec is None:
+            raise ImportError("MsgspecCodec requires the `msgspec` package")
+
+    def encode(self, value: Any) -> str:
+        return msgspec.json.encode(value).decode("utf-8")
+
+    def decode(self, value: str) -> Any:
+        return msgspec.json.decode(value)
+
+
+class RawCodec(Codec):
+    """Pass-through codec for consumers that do not need decoded messages.
+
+    Reads return `data` and `metadata` as JSON text, as stored. Writes accept
+    JSON text (or bytes) as is, and encode any other value with `json`. This
+    suits forwarders and archivers that only move messages around.
+    """
+
+    def encode(self, value: Any) -> str:
+        if isinstance(value, bytes):
+            return value.decode("utf-8")
+        if isinstance(value, str):
+            return value
+        return json.dumps(value)
+
+    def decode(self, value: str) -> Any:
+        return value
+
+
+def default_codec() -> Codec:
+    """Return the codec used when none is given: `JsonCodec`.
+
+    The faster codecs encode some values differently, so they are opt-in.
+    """
+    return JsonCodec()
@@ -0,0 +1,172 @@
+from __future__ import annotations
+
+import threading
+from typing import TYPE_CHECKING, Any, Dict, List, Tuple
+
+if TYPE_CHECKING:  # pragma: no cover
+    from message_db.client import MessageDB
+
+
+class _PendingWrite:
+    """A write waiting in the combiner queue, and its outcome."""
+
+    __slots__ = ("message", "done", "leader", "position", "error")
+
+    def __init__(
+        self,
+        message: Tuple[str, str, Dict[str, Any], Dict[str, Any] | None, int | None],
+    ) -> None:
+        self.message = message
+        self.done = threading.Event()
+        self.leader = False
+        self.position: int | None = None
+        self.error: BaseException | None = None
+
+
+class WriteCombiner:
+    """Combine concurrent single-message writes into one transaction.
+
+    The first caller to arrive becomes the leader: it waits up to *max_delay*
+    seconds for other callers to queue their writes, then writes up to
+    *max_batch_size* messages in a single round trip and transaction, on one
+    connection. Each caller then receives its own position. Callers that arrive
+    during a flush are written by the next leader, chosen among them, so no
+    caller flushes for others indefinitely.
+
+    If the combined write fails, for instance because one of the messages has a
+    wrong expected version, the batch is rolled back and its messages are written
+    again one by one, each in its own transaction. Only the callers whose writes
+    fail receive an error.
+
+    Messages written to the same stream within a batch are written in the order
+    the calls were made, as if they had been written one after the other. The
+    category locks of a batch are taken in a fixed order, so that the batches of
+    several combining clients do not deadlock.
+    """
+
+    def __init__(
+        self, client: MessageDB, max_delay: float = 0.0005, max_batch_size: int = 100
+    ) -> None:
+        """Initialize the combiner.
+
+        Args:
+            client: The client whose connections and encoding are used
+            max_delay: Seconds the leader waits for other writes before flushing
+            max_batch_size: Maximum number of messages written in one transaction
+
+        Raises:
+            ValueError: If max_delay is negative or max_batch_size is not positive
+        """
+        if max_delay < 0:
+            raise ValueError(f"max_delay must be >= 0, got {max_delay}")
+        if max_batch_size < 1:
+            raise ValueError(f"max_batch_size must be > 0, got {max_batch_size}")
+
+        self.client = client
+        self.max_delay = max_delay
+        self.max_batch_size = max_batch_size
+
+        self._queue: List[_PendingWrite] = []
+        self._leader: _PendingWrite | None = None
+        self._lock = threading.Lock()
+        self._batch_full = threading.Event()
+
+    def write(
+        self,
+        stream_name: str,
+        message_type: str,
+        data: Dict[str, Any],
+        metadata: Dict[str, Any] | None = None,
+        expected_version: int | None = None,
+    ) -> int:
+        """Queue a message, wait for its batch to be written, and return its position.
+
+        Raises:
+            ValueError: If the message could not be written, as `MessageDB.write` does
+        """
+        pending = _PendingWrite(
+            (stream_name, message_type, data, metadata, expected_version)
+        )
+
+        with self._lock:
+            self._queue.append(pending)
+            if self._leader is None:
+                self._leader = pending
+                pending.leader = True
+            elif len(self._queue) >= self.max_batch_size:
+                self._batch_full.set()
+
+        if pending.leader:
+            # Give concurrent callers a chance to join the batch
+            if self.max_delay > 0:
+                self._batch_full.wait(self.max_delay)
+            self._lead()
+        else:
+            pending.done.wait()
+            if pending.leader:
+                # Promoted by the previous leader: the wait already happened
+                self._lead()
+
+        if pending.error is not None:
+            raise pending.error
+        assert pending.position is not None
+        return pending.position
+
+    def _lead(self) -> None:
+        """Flush the next batch, which starts with the leader, and hand over."""
+        with self._lock:
+            batch = self._queue[: self.max_batch_size]
+            del self._queue[: self.max_batch_size]
+            self._batch_full.clear()
+
+        try:
+            self._flush(batch)
+        finally:
+            # Set even if the flush failed unexpectedly, so no caller waits forever
+            for pending in batch:
+                if pending.position is None and pending.error is None:
+                    pending.error = RuntimeError("Write was not attempted")
+                if not pending.leader:
+                    pending.done.set()
+
+            with self._lock:
+                if self._queue:
+                    self._leader = self._queue[0]
+                    self._leader.leader = True
+                    self._leader.done.set()
+                else:
+                    self._leader = None
+
+    def _flush(self, batch: List[_PendingWrite]) -> None:
+        client = self.client
+        try:
+            conn = client.connection_pool.get_connection()
+        except Exception as exc:
+            for pending in batch:
+                pending.error = exc
+            return
+
+        try:
+            with conn:
+                positions = client._write_messages(
+                    conn, [pending.message for pending in batch]
+                )
+            for pending, position in zip(batch, positions):
+                pending.position = position
+        except Exception as exc:
+            if len(batch) == 1:
+                batch[0].error = exc
+            else:
+                self._write_one_by_one(conn, batch)
+        finally:
+            client.connection_pool.release(conn)
+
+    def _write_one_by_one(self, conn: Any, batch: List[_PendingWrite]) -> None:
+        """Write the messages of a batch that failed in their own transactions, to
+        isolate the failing writes."""
+        for pending in batch:
+            try:
+                with conn:
+                    pending.position = self.client._write(conn, *pending.message)
+            except Exception as exc:
+                pending.error = exc
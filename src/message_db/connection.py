@@ -1,12 +1,70 @@
 from __future__ import annotations
 
-from typing import Any
+import threading
+import time
+from collections import deque
+from typing import TYPE_CHECKING, Any, Callable, Deque, Dict, List, Tuple
+from weakref import WeakKeyDictionary
 
-from psycopg2.extensions import connection
-from psycopg2.pool import ThreadedConnectionPool
+import psycopg2
+from psycopg2.extensions import TRANSACTION_STATUS_UNKNOWN, connection
+from psycopg2.pool import PoolError, ThreadedConnectionPool
+
+if TYPE_CHECKING:  # pragma: no cover
+    from message_db.instrumentation import Instrumentation
+
+
+class PoolTimeout(PoolError):
+    """No connection became available within the acquire timeout."""
+
+
+class _ThreadedConnectionPool(ThreadedConnectionPool):
+    """A psycopg2 `ThreadedConnectionPool` whose idle connections can be inspected
+    and replaced.
+
+    psycopg2 keeps the connections in private attributes, which are only accessed
+    here, under the pool lock.
+    """
+
+    _lock: threading.Lock
+    _pool: List[connection]
+    _used: Dict[Any, connection]
+
+    def idle_connections(self) -> List[connection]:
+        """Return the connections that are not checked out."""
+        with self._lock:
+            return list(self._pool)
+
+    def usage(self) -> Tuple[int, int]:
+        """Return the number of connections checked out, and idle."""
+        with self._lock:
+            return len(self._used), len(self._pool)
+
+    def take_idle(self, predicate: Callable[[connection], bool]) -> List[connection]:
+        """Remove the idle connections matching *predicate* from the pool, and
+        return them."""
+        with self._lock:
+            if self.closed:
+                return []
+            taken = [conn for conn in self._pool if predicate(conn)]
+            for conn in taken:
+                self._pool.remove(conn)
+        return taken
+
+    def add_idle(self, conn: connection) -> bool:
+        """Add a new connection to the idle connections, unless the pool is closed
+        or already holds `minconn` idle connections."""
+        with self._lock:
+            if self.closed or len(self._pool) >= self.minconn:
+                return False
+            self._pool.append(conn)
+        return True
 
 
 class ConnectionPool:
+    # Minimum number of seconds between two automatic `prune` runs
+    PRUNE_INTERVAL = 1.0
+
     @classmethod
     def from_url(
         cls, *args: str, max_connections: int = 100, **kwargs: Any
@@ -16,40 +74,330 @@ class ConnectionPool:
         Args:
             max_connections (int): Maximum no. of connections
             args (str): Arguments to pass to psycopg2 `connect()`
-            kwargs (str): Keyword arguments to pass to psycopg2 `connect()`
+            kwargs (str): Keyword arguments to pass to `ConnectionPool()`, or to
+                psycopg2 `connect()`
 
         Returns:
             ConnectionPool: A configured connection pool object
         """
         return cls(*args, max_connections=max_connections, **kwargs)
 
-    def __init__(self, *args: str, max_connections: int = 100, **kwargs: Any) -> None:
-        """Initialize the Connection Pool"""
+    def __init__(
+        self,
+        *args: str,
+        max_connections: int = 100,
+        min_connections: int = 1,
+        pre_ping: bool = False,
+        max_lifetime: float | None = None,
+        max_idle: float | None = None,
+        acquire_timeout: float | None = None,
+        instrumentation: Instrumentation | None = None,
+        **kwargs: Any,
+    ) -> None:
+        """Initialize the Connection Pool
+
+        Args:
+            max_connections: Maximum no. of connections
+            min_connections: No. of connections opened upfront, and kept open
+                while idle. Connections released beyond it are closed.
+            pre_ping: Check that a connection is alive with a round trip before
+                handing it out, and replace it otherwise
+            max_lifetime: Seconds after which a connection is closed and replaced
+            max_idle: Seconds after which an unused connection is closed and replaced
+            acquire_timeout: Seconds to wait for a connection when all are in use.
+                Waiting callers are served in arrival order. By default, checking
+                out from an exhausted pool fails immediately.
+            instrumentation: Receives the time spent checking out each connection
+            args (str): Arguments to pass to psycopg2 `connect()`
+            kwargs (str): Keyword arguments to pass to psycopg2 `connect()`
+        """
         if not isinstance(max_connections, int) or max_connections < 0:
             raise ValueError('"max_connections" must be a positive integer')
+        if not isinstance(min_connections, int) or min_connections < 0:
+            raise ValueError('"min_connections" must be a positive integer')
+        if min_connections > max_connections:
+            raise ValueError(
+                '"min_connections" must not be greater than "max_connections"'
+            )
+        for name, value in [("max_lifetime", max_lifetime), ("max_idle", max_idle)]:
+            if value is not None and value <= 0:
+                raise ValueError(f'"{name}" must be a positive number of seconds')
+        if acquire_timeout is not None and acquire_timeout < 0:
+            raise ValueError('"acquire_timeout" must not be negative')
 
         self.max_connections = max_connections
+        self.min_connections = min_connections
+        self.pre_ping = pre_ping
+        self.max_lifetime = max_lifetime
+        self.max_idle = max_idle
+        self.acquire_timeout = acquire_timeout
+        self.instrumentation = instrumentation
         self.args = args
         self.kwargs = kwargs
 
-        # Minimum connections start at 1
-        min_connections = 1
+        # Creation and last release times of the connections, for recycling
+        self._created: WeakKeyDictionary[connection, float] = WeakKeyDictionary()
+        self._released: WeakKeyDictionary[connection, float] = WeakKeyDictionary()
+        self._last_prune = time.monotonic()
+        self._lock = threading.Lock()
 
-        self._connection_pool = ThreadedConnectionPool(
-            min_connections, self.max_connections, *self.args, **self.kwargs
+        # Callers waiting for a connection, in arrival order, and statistics
+        self._waiters: Deque[threading.Event] = deque()
+        self._waiters_lock = threading.Lock()
+        self._releases = 0
+        self._acquired = 0
+        self._waited = 0
+        self._wait_time = 0.0
+        self._max_wait_time = 0.0
+        self._timeouts = 0
+
+        # The pool opens `min_connections` connections upfront
+        self._connection_pool = _ThreadedConnectionPool(
+            self.min_connections, self.max_connections, *self.args, **self.kwargs
         )
+        for conn in self._connection_pool.idle_connections():
+            self._created[conn] = self._last_prune
+
+    def _expired(self, connection: connection, now: float) -> bool:
+        """Return whether a connection is closed, or exceeded its lifetime or idle time."""
+        if connection.closed:
+            return True
+
+        with self._lock:
+            created = self._created.setdefault(connection, now)
+            released = self._released.get(connection, created)
+
+        if self.max_lifetime is not None and now - created >= self.max_lifetime:
+            return True
+        if self.max_idle is not None and now - released >= self.max_idle:
+            return True
+        return False
+
+    def _alive(self, connection: connection) -> bool:
+        """Return whether a connection can still be used."""
+        if connection.info.transaction_status == TRANSACTION_STATUS_UNKNOWN:
+            return False
+        if not self.pre_ping:
+            return True
+
+        try:
+            with connection.cursor() as cursor:
+                cursor.execute("SELECT 1")
+            connection.rollback()
+        except psycopg2.Error:
+            return False
+        return True
 
     def get_connection(self) -> connection:
         """Retrieve a connection from the connection pool
 
+        Closed, broken or expired connections are discarded, and replaced with a
+        new connection. With an acquire timeout, waits for a connection to be
+        released when all connections are in use.
+
         Returns:
             connection: the connection to a PostgreSQL database instance.
+
+        Raises:
+            PoolError: If all connections are in use, and no acquire timeout is set
+            PoolTimeout: If no connection was released within the acquire timeout
+        """
+        if self.instrumentation is None:
+            return self._get_connection()
+
+        started = time.perf_counter()
+        conn = self._get_connection()
+        self.instrumentation.connection_acquired(self, time.perf_counter() - started)
+        return conn
+
+    def _get_connection(self) -> connection:
+        if self.acquire_timeout is None:
+            conn = self._checkout()
+            with self._waiters_lock:
+                self._acquired += 1
+            return conn
+
+        return self._acquire(self.acquire_timeout)
+
+    def _checkout(self) -> connection:
+        while True:
+            conn = self._connection_pool.getconn()
+            if not self._expired(conn, time.monotonic()) and self._alive(conn):
+                return conn
+
+            self._connection_pool.putconn(conn, close=True)
+            with self._lock:
+                self._created.pop(conn, None)
+                self._released.pop(conn, None)
+
+    def _acquire(self, timeout: float) -> connection:
+        """Check out a connection, queueing behind earlier callers while the pool
+        is exhausted."""
+        started = time.monotonic()
+        deadline = started + timeout
+        waiter = threading.Event()
+        woken = False
+
+        with self._waiters_lock:
+            # Do not overtake callers that are already waiting
+            queued = bool(self._waiters)
+            if queued:
+                self._waiters.append(waiter)
+
+        while True:
+            if not queued:
+                with self._waiters_lock:
+                    releases = self._releases
+                conn = self._try_checkout()
+                if conn is not None:
+                    self._record_acquisition(woken, time.monotonic() - started)
+                    return conn
+
+                queued = self._queue_waiter(waiter, releases, woken)
+                if not queued:
+                    continue  # A connection was released meanwhile
+
+            remaining = deadline - time.monotonic()
+            if remaining <= 0 or not waiter.wait(remaining):
+                self._abandon_wait(waiter)
+                raise PoolTimeout(
+                    f"Timed out after {timeout}s waiting for a connection"
+                )
+
+            queued = False
+            woken = True
+
+    def _try_checkout(self) -> connection | None:
+        """Check out a connection, or return None if the pool is exhausted."""
+        try:
+            return self._checkout()
+        except PoolError as exc:
+            if str(exc) != "connection pool exhausted":
+                raise
+        return None
+
+    def _queue_waiter(
+        self, waiter: threading.Event, releases: int, woken: bool
+    ) -> bool:
+        """Queue a caller that found the pool exhausted, unless a connection was
+        released since it looked. A caller that was already woken once keeps its
+        turn at the front of the queue.
+
+        Returns:
+            bool: Whether the caller was queued
         """
-        return self._connection_pool.getconn()
+        with self._waiters_lock:
+            if self._releases != releases:
+                return False
+            waiter.clear()
+            if woken:
+                self._waiters.appendleft(waiter)
+            else:
+                self._waiters.append(waiter)
+        return True
+
+    def _abandon_wait(self, waiter: threading.Event) -> None:
+        """Leave the queue after a timeout."""
+        with self._waiters_lock:
+            if waiter in self._waiters:
+                self._waiters.remove(waiter)
+            elif waiter.is_set():
+                # Woken just as the wait ended: pass the turn on
+                self._notify_waiter()
+            self._timeouts += 1
+
+    def _record_acquisition(self, waited: bool, wait_time: float) -> None:
+        with self._waiters_lock:
+            self._acquired += 1
+            if waited:
+                self._waited += 1
+                self._wait_time += wait_time
+                self._max_wait_time = max(self._max_wait_time, wait_time)
+
+    def _notify_waiter(self) -> None:
+        """Wake the longest waiting caller. Must hold the waiters lock."""
+        self._releases += 1
+        if self._waiters:
+            self._waiters.popleft().set()
 
     def release(self, connection: connection, close: bool = False) -> None:
-        """Release a connection back into the pool"""
+        """Release a connection back into the pool
+
+        Connections that exceeded their lifetime are closed instead.
+        """
+        now = time.monotonic()
+        if connection is not None and not close:
+            close = self._expired(connection, now)
+
         self._connection_pool.putconn(connection, close=close)
+        if connection is not None:
+            with self._lock:
+                self._released[connection] = now
+        with self._waiters_lock:
+            self._notify_waiter()
+
+        if (self.max_lifetime is not None or self.max_idle is not None) and (
+            now - self._last_prune >= self.PRUNE_INTERVAL
+        ):
+            self.prune()
+
+    def prune(self) -> int:
+        """Replace the idle connections that are closed, or exceeded their lifetime
+        or idle time, so that the pool stays warm.
+
+        Called automatically on release when a lifetime or an idle time is set.
+
+        Returns:
+            int: The number of connections replaced
+        """
+        now = time.monotonic()
+        self._last_prune = now
+
+        pool = self._connection_pool
+        expired = pool.take_idle(lambda conn: self._expired(conn, now))
+        for conn in expired:
+            conn.close()
+
+        replaced = 0
+        for _ in expired:
+            if pool.closed or pool.usage()[1] >= self.min_connections:
+                break
+            try:
+                conn = psycopg2.connect(*self.args, **self.kwargs)
+            except psycopg2.Error:
+                break
+
+            with self._lock:
+                self._created[conn] = time.monotonic()
+            if not pool.add_idle(conn):
+                conn.close()
+                break
+            replaced += 1
+
+        return replaced
+
+    def stats(self) -> Dict[str, Any]:
+        """Return the pool size and usage statistics.
+
+        Returns:
+            Dict: ``in_use`` and ``idle`` connections, callers ``waiting`` for a
+            connection, and since the pool was created: connections ``acquired``,
+            acquisitions that ``waited``, their total and maximum ``wait_time`` and
+            ``max_wait_time`` in seconds, and ``timeouts``.
+        """
+        in_use, idle = self._connection_pool.usage()
+        with self._waiters_lock:
+            return {
+                "max_connections": self.max_connections,
+                "in_use": in_use,
+                "idle": idle,
+                "waiting": len(self._waiters),
+                "acquired": self._acquired,
+                "waited": self._waited,
+                "wait_time": self._wait_time,
+                "max_wait_time": self._max_wait_time,
+                "timeouts": self._timeouts,
+            }
 
     def closeall(self) -> None:
         """Close all connections handled by the pool."""
@@ -0,0 +1,301 @@
+"""Export a stream, a category or `$all` to NDJSON, Parquet or Arrow files.
+
+Messages are streamed out of Postgres with ``COPY (SELECT ...) TO STDOUT`` and
+written to the file as they arrive, without building a Python object per
+message. Parquet and Arrow exports require the `pyarrow` package.
+
+The module is also a command line tool::
+
+    python -m message_db.export postgresql://message_store@localhost/message_store \\
+        account account.ndjson --resume
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import sys
+import tempfile
+from typing import IO, Any, Dict, List, Tuple
+
+import psycopg2
+from psycopg2.extensions import ISOLATION_LEVEL_REPEATABLE_READ, connection
+
+from message_db.message import Message
+
+FORMATS = ("ndjson", "parquet", "arrow")
+
+# Exported files are spooled to disk beyond this size before being converted
+SPOOL_SIZE = 64 * 1024 * 1024
+
+EXPORT_SELECT_SQL = """
+    SELECT {columns}
+    FROM message_store.messages
+    WHERE {condition}
+      AND global_position > %(after)s
+      AND global_position <= %(until)s
+    ORDER BY global_position
+"""
+
+LAST_POSITION_SQL = """
+    SELECT max(global_position)
+    FROM message_store.messages
+    WHERE {condition}
+      AND global_position > %(after)s
+      AND global_position <= coalesce(%(until)s, 9223372036854775807)
+"""
+
+# One JSON object per message, with the fields in the order of `Message.FIELDS`
+NDJSON_COLUMNS = "json_build_object({})::text".format(
+    ", ".join(f"'{field}', {field}" for field in Message.FIELDS)
+)
+
+# JSON text never contains raw control characters, so quoting and delimiting
+# CSV with them copies each object as is, one per line
+NDJSON_COPY_SQL = (
+    "COPY ({query}) TO STDOUT WITH (FORMAT csv, QUOTE E'\\x01', DELIMITER E'\\x02')"
+)
+
+TABLE_COLUMNS = (
+    "id::varchar, stream_name::varchar, type::varchar, position, global_position, "
+    "data::varchar, metadata::varchar, time"
+)
+
+TABLE_COPY_SQL = "COPY ({query}) TO STDOUT WITH (FORMAT csv)"
+
+
+def _condition(stream_name: str) -> Tuple[str, Dict[str, Any]]:
+    """Return the filter on the messages of `$all`, a stream, or a category."""
+    if stream_name == "$all":
+        return "TRUE", {}
+    if "-" in stream_name:
+        return "stream_name = %(stream_name)s", {"stream_name": stream_name}
+    return "message_store.category(stream_name) = %(stream_name)s", {
+        "stream_name": stream_name
+    }
+
+
+def _import_pyarrow(format: str) -> Any:
+    """Return the `pyarrow` module, imported on first use: it is slow to import,
+    and only Parquet and Arrow exports need it."""
+    try:
+        import pyarrow  # type: ignore[import-untyped,import-not-found]
+        import pyarrow.csv  # type: ignore[import-untyped,import-not-found]
+        import pyarrow.ipc  # type: ignore[import-untyped,import-not-found]
+        import pyarrow.parquet  # type: ignore[import-untyped,import-not-found]
+    except ImportError:  # pragma: no cover
+        raise ImportError(
+            f"Exporting to {format} requires the `pyarrow` package"
+        ) from None
+    return pyarrow
+
+
+def _table_schema(pyarrow: Any) -> Any:
+    return pyarrow.schema(
+        [
+            ("id", pyarrow.string()),
+            ("stream_name", pyarrow.string()),
+            ("type", pyarrow.string()),
+            ("position", pyarrow.int64()),
+            ("global_position", pyarrow.int64()),
+            ("data", pyarrow.string()),
+            ("metadata", pyarrow.string()),
+            ("time", pyarrow.timestamp("us")),
+        ]
+    )
+
+
+def _write_table(rows: IO[bytes], output: IO[bytes], format: str) -> None:
+    """Convert the CSV rows copied out of Postgres to a Parquet or Arrow file."""
+    pyarrow = _import_pyarrow(format)
+    schema = _table_schema(pyarrow)
+    if format == "parquet":
+        writer: Any = pyarrow.parquet.ParquetWriter(output, schema)
+    else:
+        writer = pyarrow.ipc.new_file(output, schema)
+
+    with writer:
+        if rows.seek(0, os.SEEK_END) == 0:
+            return  # No messages: the file only holds the schema
+
+        rows.seek(0)
+        reader = pyarrow.csv.open_csv(
+            rows,
+            read_options=pyarrow.csv.ReadOptions(column_names=schema.names),
+            convert_options=pyarrow.csv.ConvertOptions(
+                column_types=schema,
+                # COPY writes NULL unquoted, and empty strings quoted
+                strings_can_be_null=True,
+                quoted_strings_can_be_null=False,
+            ),
+        )
+        for batch in reader:
+            writer.write_batch(batch)
+
+
+def export(
+    connection: connection,
+    stream_name: str,
+    output: IO[bytes],
+    format: str = "ndjson",
+    after: int = 0,
+    until: int | None = None,
+) -> int:
+    """Export the messages of `$all`, a stream, or a category to a binary file.
+
+    Messages are exported in global position order, from after *after* up to
+    *until*. The export reads a consistent snapshot, and returns the global
+    position of the last message exported, which can be passed as *after* to
+    export the messages written since.
+
+    NDJSON exports write one JSON object per line, with the message fields;
+    `data` and `metadata` are nested objects. Parquet and Arrow exports keep
+    `data` and `metadata` as JSON text columns.
+
+    Args:
+        connection: The connection to export with, outside of a transaction
+        stream_name: `$all`, a stream name, or a category name
+        output: The binary file to write to
+        format: `ndjson`, `parquet` or `arrow`
+        after: Global position after which messages are exported
+        until: Global position of the last message to export, if any
+
+    Returns:
+        int: The global position of the last message exported, or *after* if there
+        were no messages to export
+
+    Raises:
+        ValueError: If the format is unknown
+        ImportError: If the format requires `pyarrow`, and it is not installed
+    """
+    if format not in FORMATS:
+        raise ValueError(f"Unknown export format {format!r}, expected one of {FORMATS}")
+    if format != "ndjson":
+        _import_pyarrow(format)
+
+    condition, params = _condition(stream_name)
+    params.update(after=after, until=until)
+
+    isolation_level = connection.isolation_level
+    connection.set_session(isolation_level=ISOLATION_LEVEL_REPEATABLE_READ)
+    try:
+        with connection:
+            with connection.cursor() as cursor:
+                # Bound the export, so that messages written meanwhile are left
+                # for the next export
+                cursor.execute(LAST_POSITION_SQL.format(condition=condition), params)
+                row = cursor.fetchone()
+                last_position = row[0] if row is not None else None
+                if last_position is None:
+                    last_position = after
+                params["until"] = last_position
+
+                if format == "ndjson":
+                    query = EXPORT_SELECT_SQL.format(
+                        columns=NDJSON_COLUMNS, condition=condition
+                    )
+                    cursor.copy_expert(
+                        NDJSON_COPY_SQL.format(
+                            query=cursor.mogrify(query, params).decode()
+                        ),
+                        output,
+                    )
+                else:
+                    query = EXPORT_SELECT_SQL.format(
+                        columns=TABLE_COLUMNS, condition=condition
+                    )
+                    with tempfile.SpooledTemporaryFile(SPOOL_SIZE) as rows:
+                        cursor.copy_expert(
+                            TABLE_COPY_SQL.format(
+                                query=cursor.mogrify(query, params).decode()
+                            ),
+                            rows,
+                        )
+                        _write_table(rows, output, format)
+    finally:
+        connection.set_session(
+            isolation_level="DEFAULT" if isolation_level is None else isolation_level
+        )
+
+    return last_position
+
+
+def last_exported_position(path: str) -> int | None:
+    """Return the global position of the last message in an NDJSON export, or
+    `None` if the file is empty."""
+    with open(path, "rb") as file:
+        end = file.seek(0, os.SEEK_END)
+        block_size = 64 * 1024
+        start = end
+        lines: List[bytes] = []
+        # Read backwards until the last non-empty line is complete
+        while start > 0:
+            start = max(0, start - block_size)
+            file.seek(start)
+            lines = file.read(end - start).rstrip(b"\n").split(b"\n")
+            if len(lines) > 1 or start == 0:
+                break
+
+    if not lines or not lines[-1]:
+        return None
+    return json.loads(lines[-1])["global_position"]
+
+
+def main(argv: List[str] | None = None) -> None:
+    """Export messages from the command line."""
+    parser = argparse.ArgumentParser(
+        prog="message-db-export",
+        description="Export $all, a stream, or a category to a file.",
+    )
+    parser.add_argument("url", help="Postgres URL of the message store")
+    parser.add_argument("stream_name", help="$all, a stream name, or a category")
+    parser.add_argument("output", help="File to export to")
+    parser.add_argument(
+        "--format",
+        choices=FORMATS,
+        help="Export format, guessed from the file extension by default",
+    )
+    parser.add_argument(
+        "--after", type=int, default=0, help="Export messages after this position"
+    )
+    parser.add_argument(
+        "--until", type=int, help="Export messages up to this global position"
+    )
+    parser.add_argument(
+        "--resume",
+        action="store_true",
+        help="Append to an NDJSON file the messages after its last one",
+    )
+    args = parser.parse_args(argv)
+
+    format = args.format
+    if format is None:
+        extension = os.path.splitext(args.output)[1].lstrip(".").lower()
+        format = {"jsonl": "ndjson", "feather": "arrow"}.get(extension, extension)
+        if format not in FORMATS:
+            parser.error("cannot guess the format from the file name, use --format")
+
+    after = args.after
+    mode = "wb"
+    if args.resume:
+        if format != "ndjson":
+            parser.error("--resume is only supported for NDJSON exports")
+        if os.path.exists(args.output):
+            after = max(after, last_exported_position(args.output) or 0)
+            mode = "ab"
+
+    conn = psycopg2.connect(args.url)
+    try:
+        with open(args.output, mode) as output:
+            last_position = export(
+                conn, args.stream_name, output, format, after, args.until
+            )
+    finally:
+        conn.close()
+
+    print(last_position, file=sys.stdout)
+
+
+if __name__ == "__main__":  # pragma: no cover
+    main()
@@ -0,0 +1,210 @@
+"""Instrumentation hooks for the client and the connection pool.
+
+Pass an `Instrumentation` to `MessageDB` or `ConnectionPool` to receive the
+timings of their operations. Without one, the hot paths only pay for a `None`
+check. Subclass `Instrumentation` to forward the events to any metrics or
+tracing system, or use `PrometheusInstrumentation`, which requires the
+`prometheus_client` package.
+"""
+
+from __future__ import annotations
+
+import time
+from functools import partial
+from typing import TYPE_CHECKING, Any, Dict, Sequence
+
+if TYPE_CHECKING:  # pragma: no cover
+    from message_db.connection import ConnectionPool
+
+
+class OperationMetrics:
+    """The timings of one client operation, split by phase.
+
+    Phases are measured in seconds, in the order they ran:
+
+    - ``checkout``: waiting for a connection from the pool
+    - ``execute``: running the statement, including the transfer of its rows
+    - ``fetch``: turning the rows into Python objects
+    - ``commit``: committing the transaction of a write
+    - ``decode``: decoding message data and metadata
+    - ``combine``: waiting for a combined write, see `WriteCombiner`
+
+    `rows` is the number of rows returned, and `bytes_decoded` the length of the
+    JSON text of their data and metadata.
+    """
+
+    __slots__ = ("operation", "duration", "phases", "rows", "bytes_decoded")
+
+    def __init__(
+        self,
+        operation: str,
+        duration: float,
+        phases: Dict[str, float],
+        rows: int = 0,
+        bytes_decoded: int = 0,
+    ) -> None:
+        self.operation = operation
+        self.duration = duration
+        self.phases = phases
+        self.rows = rows
+        self.bytes_decoded = bytes_decoded
+
+    def __repr__(self) -> str:
+        return (
+            f"OperationMetrics(operation={self.operation!r}, "
+            f"duration={self.duration!r}, rows={self.rows!r})"
+        )
+
+
+class Instrumentation:
+    """Receive the events of a client and its connection pool.
+
+    All methods do nothing by default; override the ones you need. They are
+    called synchronously, from the thread that ran the operation, so they should
+    return quickly.
+    """
+
+    def operation_completed(self, metrics: OperationMetrics) -> None:
+        """Called after a client operation succeeded."""
+
+    def version_conflict(self, stream_name: str, actual_version: int) -> None:
+        """Called when a write failed because of a wrong expected version."""
+
+    def connection_acquired(self, pool: ConnectionPool, wait_time: float) -> None:
+        """Called after a connection was checked out of a pool, with the seconds
+        spent waiting for it, opening it, or checking it."""
+
+
+class OperationTimer:
+    """Measure the phases of an operation, and report them when it completes."""
+
+    __slots__ = ("instrumentation", "operation", "started", "last", "phases")
+
+    def __init__(self, instrumentation: Instrumentation, operation: str) -> None:
+        self.instrumentation = instrumentation
+        self.operation = operation
+        self.started = self.last = time.perf_counter()
+        self.phases: Dict[str, float] = {}
+
+    def phase(self, name: str) -> None:
+        """End the current phase, which started when the previous one ended."""
+        now = time.perf_counter()
+        self.phases[name] = self.phases.get(name, 0.0) + now - self.last
+        self.last = now
+
+    def finish(self, rows: Sequence[Any] = ()) -> None:
+        """Report the operation, with the rows it returned."""
+        bytes_decoded = 0
+        for row in rows:
+            bytes_decoded += len(row["data"] or "") + len(row["metadata"] or "")
+
+        self.instrumentation.operation_completed(
+            OperationMetrics(
+                self.operation,
+                self.last - self.started,
+                self.phases,
+                len(rows),
+                bytes_decoded,
+            )
+        )
+
+
+def _pool_stat(pool: ConnectionPool, name: str) -> float:
+    return pool.stats()[name]
+
+
+class PrometheusInstrumentation(Instrumentation):
+    """Export the client and pool events as Prometheus metrics.
+
+    Metrics, prefixed with *namespace*:
+
+    - ``operation_seconds{operation, phase}``: histogram of phase durations
+    - ``rows_total{operation}`` and ``decoded_bytes_total{operation}``
+    - ``pool_wait_seconds``: histogram of connection checkout times
+    - ``version_conflicts_total``: writes with a wrong expected version
+    - ``pool_connections{pool, state}``: connections ``in_use`` or ``idle``, and
+      callers ``waiting``, of the pools passed to `track_pool`, read at scrape time
+    """
+
+    def __init__(self, registry: Any = None, namespace: str = "message_db") -> None:
+        """Create the metrics.
+
+        Args:
+            registry: The registry to register the metrics with, by default the
+                global `prometheus_client.REGISTRY`
+            namespace: Prefix of the metric names
+
+        Raises:
+            ImportError: If `prometheus_client` is not installed
+        """
+        # Imported here, as it is slow to import and instrumentation is opt-in
+        try:
+            import prometheus_client  # type: ignore[import-not-found]
+        except ImportError:  # pragma: no cover
+            raise ImportError(
+                "PrometheusInstrumentation requires the `prometheus_client` package"
+            ) from None
+
+        if registry is None:
+            registry = prometheus_client.REGISTRY
+        self.operation_seconds = prometheus_client.Histogram(
+            "operation_seconds",
+            "Duration of the phases of client operations",
+            ["operation", "phase"],
+            namespace=namespace,
+            registry=registry,
+        )
+        self.rows = prometheus_client.Counter(
+            "rows",
+            "Rows returned by client operations",
+            ["operation"],
+            namespace=namespace,
+            registry=registry,
+        )
+        self.decoded_bytes = prometheus_client.Counter(
+            "decoded_bytes",
+            "Length of the message data and metadata returned",
+            ["operation"],
+            namespace=namespace,
+            registry=registry,
+        )
+        self.pool_wait_seconds = prometheus_client.Histogram(
+            "pool_wait_seconds",
+            "Time spent checking out a connection",
+            namespace=namespace,
+            registry=registry,
+        )
+        self.version_conflicts = prometheus_client.Counter(
+            "version_conflicts",
+            "Writes that failed on a wrong expected version",
+            namespace=namespace,
+            registry=registry,
+        )
+        self.pool_connections = prometheus_client.Gauge(
+            "pool_connections",
+            "Connections in use and idle, and callers waiting, per pool",
+            ["pool", "state"],
+            namespace=namespace,
+            registry=registry,
+        )
+
+    def track_pool(self, pool: ConnectionPool, name: str = "default") -> None:
+        """Report the connections of a pool, read from `ConnectionPool.stats`."""
+        for state in ("in_use", "idle", "waiting"):
+            self.pool_connections.labels(pool=name, state=state).set_function(
+                partial(_pool_stat, pool, state)
+            )
+
+    def operation_completed(self, metrics: OperationMetrics) -> None:
+        for phase, duration in metrics.phases.items():
+            self.operation_seconds.labels(metrics.operation, phase).observe(duration)
+        if metrics.rows:
+            self.rows.labels(metrics.operation).inc(metrics.rows)
+        if metrics.bytes_decoded:
+            self.decoded_bytes.labels(metrics.operation).inc(metrics.bytes_decoded)
+
+    def version_conflict(self, stream_name: str, actual_version: int) -> None:
+        self.version_conflicts.inc()
+
+    def connection_acquired(self, pool: ConnectionPool, wait_time: float) -> None:
+        self.pool_wait_seconds.observe(wait_time)
@@ -0,0 +1,180 @@
+from __future__ import annotations
+
+from datetime import datetime
+from typing import Any, Dict, Iterable, List
+
+from message_db.codec import Codec
+
+_UNDECODED = object()
+
+
+class Message:
+    """A compact, read-only message record that decodes its JSON fields lazily.
+
+    `data` and `metadata` are kept as the JSON text returned by the database and
+    only decoded, with the client's codec, the first time they are accessed. The
+    decoded value is cached. Consumers that filter messages on `type` or positions
+    never pay for decoding the messages they skip.
+
+    Fields are accessed as attributes (``message.data``). Item access
+    (``message["data"]``) is also supported, so code written against message
+    dictionaries keeps working.
+    """
+
+    __slots__ = (
+        "id",
+        "stream_name",
+        "type",
+        "position",
+        "global_position",
+        "time",
+        "_raw_data",
+        "_raw_metadata",
+        "_data",
+        "_metadata",
+        "_codec",
+    )
+
+    FIELDS = (
+        "id",
+        "stream_name",
+        "type",
+        "position",
+        "global_position",
+        "data",
+        "metadata",
+        "time",
+    )
+
+    def __init__(
+        self,
+        id: str,
+        stream_name: str,
+        type: str,
+        position: int,
+        global_position: int,
+        data: str | None,
+        metadata: str | None,
+        time: datetime,
+        codec: Codec,
+    ) -> None:
+        self.id = id
+        self.stream_name = stream_name
+        self.type = type
+        self.position = position
+        self.global_position = global_position
+        self.time = time
+        self._raw_data = data
+        self._raw_metadata = metadata
+        self._data: Any = _UNDECODED
+        self._metadata: Any = _UNDECODED
+        self._codec = codec
+
+    @classmethod
+    def from_row(cls, row: Dict[str, Any], codec: Codec) -> Message:
+        """Build a message from a database row with the standard message columns."""
+        return cls(
+            row["id"],
+            row["stream_name"],
+            row["type"],
+            row["position"],
+            row["global_position"],
+            row["data"],
+            row["metadata"],
+            row["time"],
+            codec,
+        )
+
+    @property
+    def data(self) -> Any:
+        """The decoded message data."""
+        if self._data is _UNDECODED:
+            self._data = self._codec.decode(self._raw_data) if self._raw_data else None
+        return self._data
+
+    @property
+    def metadata(self) -> Any:
+        """The decoded message metadata, or `None`."""
+        if self._metadata is _UNDECODED:
+            self._metadata = (
+                self._codec.decode(self._raw_metadata) if self._raw_metadata else None
+            )
+        return self._metadata
+
+    def __getitem__(self, key: str) -> Any:
+        if key not in self.FIELDS:
+            raise KeyError(key)
+        return getattr(self, key)
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Return the message as a dictionary, decoding its JSON fields."""
+        return {field: getattr(self, field) for field in self.FIELDS}
+
+    def __repr__(self) -> str:
+        return (
+            f"Message(stream_name={self.stream_name!r}, type={self.type!r}, "
+            f"position={self.position!r}, global_position={self.global_position!r})"
+        )
+
+
+class MessageBatch(list):
+    """The messages returned by a read filtered on message types.
+
+    Besides the matching messages, a batch reports how many messages the read
+    scanned, and the position of the last one: its `position` for stream reads,
+    its `global_position` otherwise. Readers continue after `last_position` to
+    skip filtered-out messages without scanning them again. `last_position` is
+    `None` when the read scanned nothing.
+    """
+
+    def __init__(
+        self,
+        messages: Iterable[Any] = (),
+        scanned: int = 0,
+        last_position: int | None = None,
+    ) -> None:
+        super().__init__(messages)
+        self.scanned = scanned
+        self.last_position = last_position
+
+
+class Entity:
+    """An entity stream, loaded from its latest snapshot and the messages after it.
+
+    `snapshot` is the state recorded by the latest snapshot, or `None` without a
+    snapshot. `snapshot_version` is the stream position the snapshot covers, and
+    `messages` are the messages written to the stream after that position.
+    """
+
+    __slots__ = ("stream_name", "snapshot", "snapshot_version", "messages")
+
+    def __init__(
+        self,
+        stream_name: str,
+        snapshot: Any = None,
+        snapshot_version: int | None = None,
+        messages: List[Any] | None = None,
+    ) -> None:
+        self.stream_name = stream_name
+        self.snapshot = snapshot
+        self.snapshot_version = snapshot_version
+        self.messages = messages if messages is not None else []
+
+    @property
+    def version(self) -> int:
+        """The position of the last message in the stream, or -1 if it is empty.
+
+        The version can be used as the `expected_version` of the next write.
+        """
+        if self.messages:
+            return self.messages[-1]["position"]
+        if self.snapshot_version is not None:
+            return self.snapshot_version
+        return -1
+
+    def __repr__(self) -> str:
+        return (
+            f"Entity(stream_name={self.stream_name!r}, "
+            f"snapshot_version={self.snapshot_version!r}, "
+            f"messages={len(self.messages)})"
+        )
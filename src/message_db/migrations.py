@@ -0,0 +1,172 @@
+"""Optional, opt-in database migrations for features beyond the core Message DB schema.
+
+Message DB restricts the `message_store` role to its public interface, so these
+helpers must be run with a connection that owns the `message_store` schema, like
+the administrative role used to install Message DB.
+"""
+
+from __future__ import annotations
+
+from psycopg2.extensions import connection, quote_ident
+
+NOTIFICATION_CHANNEL = "message_store_messages"
+
+INSTALL_NOTIFICATIONS_SQL = f"""
+    CREATE OR REPLACE FUNCTION message_store.notify_message_written()
+    RETURNS trigger AS $$
+    BEGIN
+        PERFORM pg_notify('{NOTIFICATION_CHANNEL}', NEW.stream_name);
+        RETURN NULL;
+    END;
+    $$ LANGUAGE plpgsql;
+
+    DROP TRIGGER IF EXISTS messages_notify ON message_store.messages;
+
+    CREATE TRIGGER messages_notify
+        AFTER INSERT ON message_store.messages
+        FOR EACH ROW EXECUTE FUNCTION message_store.notify_message_written();
+"""
+
+UNINSTALL_NOTIFICATIONS_SQL = """
+    DROP TRIGGER IF EXISTS messages_notify ON message_store.messages;
+    DROP FUNCTION IF EXISTS message_store.notify_message_written();
+"""
+
+STREAM_NAME_INDEX = "messages_category_stream_name"
+
+INSTALL_STREAM_NAME_INDEX_SQL = """
+    CREATE INDEX {concurrently} IF NOT EXISTS {index}
+    ON message_store.messages (message_store.category(stream_name), stream_name);
+"""
+
+UNINSTALL_STREAM_NAME_INDEX_SQL = """
+    DROP INDEX {concurrently} IF EXISTS message_store.{index};
+"""
+
+INSTALL_CONSUMER_GROUP_LEASES_SQL = """
+    CREATE TABLE IF NOT EXISTS message_store.consumer_groups (
+        group_name text PRIMARY KEY,
+        generation bigint NOT NULL DEFAULT 0,
+        active boolean NOT NULL DEFAULT false,
+        handover_position bigint
+    );
+
+    CREATE TABLE IF NOT EXISTS message_store.consumer_group_members (
+        group_name text NOT NULL
+            REFERENCES message_store.consumer_groups ON DELETE CASCADE,
+        member_id text NOT NULL,
+        expires_at timestamptz NOT NULL,
+        generation bigint,
+        member_index integer,
+        position bigint,
+        PRIMARY KEY (group_name, member_id)
+    );
+
+    GRANT SELECT, INSERT, UPDATE, DELETE
+        ON message_store.consumer_groups, message_store.consumer_group_members
+        TO {role};
+"""
+
+UNINSTALL_CONSUMER_GROUP_LEASES_SQL = """
+    DROP TABLE IF EXISTS message_store.consumer_group_members;
+    DROP TABLE IF EXISTS message_store.consumer_groups;
+"""
+
+
+def _execute(connection: connection, sql: str) -> None:
+    with connection.cursor() as cursor:
+        cursor.execute(sql)
+    connection.commit()
+
+
+def _execute_autocommit(connection: connection, sql: str) -> None:
+    """Execute a statement that cannot run inside a transaction block."""
+    autocommit = connection.autocommit
+    connection.autocommit = True
+    try:
+        with connection.cursor() as cursor:
+            cursor.execute(sql)
+    finally:
+        connection.autocommit = autocommit
+
+
+def install_notifications(connection: connection) -> None:
+    """Install a trigger that announces every written message with `NOTIFY`.
+
+    The notification is sent on the `message_store_messages` channel when the
+    writing transaction commits, with the stream name as payload. Postgres folds
+    identical notifications raised in one transaction, so a batch written to one
+    stream produces a single notification.
+
+    Args:
+        connection: A psycopg2 connection with privileges on `message_store.messages`
+    """
+    _execute(connection, INSTALL_NOTIFICATIONS_SQL)
+
+
+def uninstall_notifications(connection: connection) -> None:
+    """Remove the trigger installed by `install_notifications`."""
+    _execute(connection, UNINSTALL_NOTIFICATIONS_SQL)
+
+
+def install_stream_name_index(
+    connection: connection, concurrently: bool = True
+) -> None:
+    """Index stream names by category.
+
+    With the index, `MessageDB.stream_identifiers` and
+    `MessageDB.iter_stream_identifiers` read the stream names of a category from
+    the index instead of scanning the messages of the category, and the iterator
+    skips from one stream to the next in a few index lookups.
+
+    Args:
+        connection: A psycopg2 connection with privileges on `message_store.messages`,
+            and no transaction in progress
+        concurrently: Build the index without locking out writes. This takes
+            longer, and cannot run inside a transaction.
+    """
+    sql = INSTALL_STREAM_NAME_INDEX_SQL.format(
+        concurrently="CONCURRENTLY" if concurrently else "", index=STREAM_NAME_INDEX
+    )
+    if concurrently:
+        _execute_autocommit(connection, sql)
+    else:
+        _execute(connection, sql)
+
+
+def uninstall_stream_name_index(
+    connection: connection, concurrently: bool = True
+) -> None:
+    """Remove the index installed by `install_stream_name_index`."""
+    sql = UNINSTALL_STREAM_NAME_INDEX_SQL.format(
+        concurrently="CONCURRENTLY" if concurrently else "", index=STREAM_NAME_INDEX
+    )
+    if concurrently:
+        _execute_autocommit(connection, sql)
+    else:
+        _execute(connection, sql)
+
+
+def install_consumer_group_leases(
+    connection: connection, role: str = "message_store"
+) -> None:
+    """Create the tables of the consumer group leases, see `ConsumerGroupLease`.
+
+    `message_store.consumer_groups` holds the generation of each group, and
+    `message_store.consumer_group_members` the lease, member index and position
+    of each of its members.
+
+    Args:
+        connection: A psycopg2 connection that owns the `message_store` schema
+        role: The role the clients connect with, granted access to the tables
+    """
+    _execute(
+        connection,
+        INSTALL_CONSUMER_GROUP_LEASES_SQL.format(role=quote_ident(role, connection)),
+    )
+
+
+def uninstall_consumer_group_leases(connection: connection) -> None:
+    """Remove the tables installed by `install_consumer_group_leases`, and the
+    positions they hold."""
+    _execute(connection, UNINSTALL_CONSUMER_GROUP_LEASES_SQL)
@@ -0,0 +1,174 @@
+from __future__ import annotations
+
+import hashlib
+import select
+import threading
+from collections import defaultdict
+from typing import Any, Dict, List, Tuple
+
+import psycopg2
+from psycopg2.extensions import ISOLATION_LEVEL_AUTOCOMMIT, connection
+
+from message_db.migrations import NOTIFICATION_CHANNEL
+
+
+def hash_64(value: str) -> int:
+    """Python equivalent of Message DB's `hash_64` function.
+
+    The hash is the first 64 bits of the MD5 digest, as a signed integer.
+    """
+    hash_value = int(hashlib.md5(value.encode("utf-8")).hexdigest()[:16], 16)
+    if hash_value >= 1 << 63:
+        hash_value -= 1 << 64
+    return hash_value
+
+
+def consumer_group_member(stream_name: str, consumer_group_size: int) -> int:
+    """Return the consumer group member that `get_category_messages` assigns a stream to."""
+    cardinal_id = stream_name.split("-", 1)[1].split("+", 1)[0]
+    return abs(hash_64(cardinal_id)) % consumer_group_size
+
+
+class NotificationListener:
+    """Wake up category consumers when messages are written to their category.
+
+    The listener holds a dedicated connection that `LISTEN`s on the channel fed by
+    the trigger from `message_db.migrations.install_notifications`. A background
+    thread dispatches each notification to the events registered for the stream's
+    category, and for consumer groups, only to the member the stream belongs to.
+
+    Consumers should keep polling with a timeout, so that they still make progress
+    while the listener is disconnected or a notification is missed.
+    """
+
+    @classmethod
+    def from_url(cls, url: str, **kwargs: Any) -> NotificationListener:
+        """Return a listener connected with the given URL.
+
+        Args:
+            url (str): Postgres-compliant URL connection string
+
+        Returns:
+            NotificationListener: A listener, not yet started
+        """
+        return cls(url, **kwargs)
+
+    def __init__(
+        self, *args: str, reconnect_interval: float = 1.0, **kwargs: Any
+    ) -> None:
+        """Initialize the listener.
+
+        Args:
+            reconnect_interval (float): Seconds to wait before reconnecting after an error
+            args (str): Arguments to pass to psycopg2 `connect()`
+            kwargs (str): Keyword arguments to pass to psycopg2 `connect()`
+        """
+        self.args = args
+        self.kwargs = kwargs
+        self.reconnect_interval = reconnect_interval
+
+        self._connection: connection | None = None
+        self._thread: threading.Thread | None = None
+        self._stop_event = threading.Event()
+        self._lock = threading.Lock()
+        self._events: Dict[
+            str, List[Tuple[threading.Event, int | None, int | None]]
+        ] = defaultdict(list)
+
+    def subscribe(
+        self,
+        category_name: str,
+        consumer_group_member: int | None = None,
+        consumer_group_size: int | None = None,
+    ) -> threading.Event:
+        """Return an event that is set whenever a message is written to the category.
+
+        With consumer group parameters, the event is only set for messages written
+        to streams that belong to the given member. The caller clears the event
+        before reading, so that no notification goes unnoticed.
+        """
+        event = threading.Event()
+        with self._lock:
+            self._events[category_name].append(
+                (event, consumer_group_member, consumer_group_size)
+            )
+        return event
+
+    def unsubscribe(self, category_name: str, event: threading.Event) -> None:
+        """Stop setting an event returned by `subscribe`."""
+        with self._lock:
+            self._events[category_name] = [
+                entry for entry in self._events[category_name] if entry[0] is not event
+            ]
+
+    def notify(self, stream_name: str) -> None:
+        """Set the events of the consumers of *stream_name*."""
+        category_name = stream_name.split("-", 1)[0]
+        with self._lock:
+            entries = list(self._events.get(category_name, ()))
+
+        for event, member, size in entries:
+            if (
+                member is None
+                or size is None
+                or "-" not in stream_name
+                or consumer_group_member(stream_name, size) == member
+            ):
+                event.set()
+
+    def _wake_all(self) -> None:
+        with self._lock:
+            events = [
+                entry[0] for entries in self._events.values() for entry in entries
+            ]
+        for event in events:
+            event.set()
+
+    def _connect(self) -> connection:
+        conn = psycopg2.connect(*self.args, **self.kwargs)
+        conn.set_isolation_level(ISOLATION_LEVEL_AUTOCOMMIT)
+        with conn.cursor() as cursor:
+            cursor.execute(f'LISTEN "{NOTIFICATION_CHANNEL}";')
+        return conn
+
+    def _close(self) -> None:
+        if self._connection is not None and not self._connection.closed:
+            self._connection.close()
+        self._connection = None
+
+    def _listen(self) -> None:
+        while not self._stop_event.is_set():
+            try:
+                if self._connection is None:
+                    self._connection = self._connect()
+                    # Notifications sent while disconnected are lost
+                    self._wake_all()
+
+                if select.select([self._connection], [], [], 0.5)[0]:
+                    self._connection.poll()
+                    while self._connection.notifies:
+                        self.notify(self._connection.notifies.pop(0).payload)
+            except (psycopg2.Error, OSError):
+                self._close()
+                self._stop_event.wait(self.reconnect_interval)
+
+        self._close()
+
+    def start(self) -> None:
+        """Connect and start dispatching notifications in a background thread."""
+        if self._thread is not None and self._thread.is_alive():
+            return
+
+        self._stop_event.clear()
+        self._connection = self._connect()
+        self._thread = threading.Thread(
+            target=self._listen, name="message-db-listener", daemon=True
+        )
+        self._thread.start()
+
+    def stop(self) -> None:
+        """Stop the background thread and close the connection."""
+        self._stop_event.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
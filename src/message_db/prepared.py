@@ -0,0 +1,90 @@
+from __future__ import annotations
+
+import re
+import threading
+from typing import Any, Dict, List, Set, Tuple
+from weakref import WeakKeyDictionary
+
+from psycopg2 import errors
+from psycopg2.extensions import connection, cursor
+
+PLACEHOLDER_PATTERN = re.compile(r"%\((\w+)\)s")
+
+# Names of the statements prepared on each connection, shared by all clients,
+# since prepared statements belong to the database session
+_prepared: WeakKeyDictionary[connection, Set[str]] = WeakKeyDictionary()
+_lock = threading.Lock()
+
+
+class PreparedStatement:
+    """A fixed SQL statement, prepared once per connection and executed by name.
+
+    The statement is written with the named placeholders used throughout the
+    client. It is turned into a ``PREPARE`` statement with positional parameters
+    of the given types, and an ``EXECUTE`` statement that passes the named
+    parameters in the same order.
+    """
+
+    def __init__(self, name: str, sql: str, types: Dict[str, str]) -> None:
+        """Initialize the statement.
+
+        Args:
+            name: Name of the prepared statement, unique within the session
+            sql: The statement, with `%(name)s` placeholders
+            types: Postgres type of each placeholder
+        """
+        parameters: List[str] = []
+        for parameter in PLACEHOLDER_PATTERN.findall(sql):
+            if parameter not in parameters:
+                parameters.append(parameter)
+
+        def positional(match: re.Match) -> str:
+            return f"${parameters.index(match.group(1)) + 1}"
+
+        self.name = name
+        self.sql = sql
+        self.parameters: Tuple[str, ...] = tuple(parameters)
+        self.prepare_sql = "PREPARE {} ({}) AS {}".format(
+            name,
+            ", ".join(types[parameter] for parameter in parameters),
+            PLACEHOLDER_PATTERN.sub(positional, sql).strip().rstrip(";"),
+        )
+        self.execute_sql = "EXECUTE {} ({})".format(
+            name, ", ".join(f"%({parameter})s" for parameter in parameters)
+        )
+
+    def __repr__(self) -> str:
+        return f"PreparedStatement(name={self.name!r})"
+
+
+def execute_prepared(
+    cursor: cursor, statement: PreparedStatement, params: Dict[str, Any]
+) -> None:
+    """Execute a statement by name, preparing it first on a new connection.
+
+    The first execution on a connection sends the ``PREPARE`` and ``EXECUTE``
+    statements together, in a single round trip. If the session lost the
+    statement, for instance after a ``DEALLOCATE`` or a ``DISCARD ALL``, it is
+    prepared again.
+    """
+    conn = cursor.connection
+    with _lock:
+        prepared = _prepared.setdefault(conn, set())
+        is_prepared = statement.name in prepared
+
+    if is_prepared:
+        try:
+            cursor.execute(statement.execute_sql, params)
+            return
+        except errors.InvalidSqlStatementName:
+            conn.rollback()
+            with _lock:
+                # Other statements may still exist: each is prepared again if
+                # its own execution fails
+                prepared.discard(statement.name)
+
+    # The statement stays prepared even if the execution fails and the
+    # transaction is rolled back
+    with _lock:
+        prepared.add(statement.name)
+    cursor.execute(f"{statement.prepare_sql}; {statement.execute_sql}", params)
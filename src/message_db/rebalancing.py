@@ -0,0 +1,499 @@
+"""Consumer groups whose members join and leave at run time.
+
+A fixed consumer group needs every member to be started with the same
+`consumer_group_size` and a distinct `consumer_group_member`. Here, members hold
+leases on the group instead, stored in the tables installed by
+`message_db.migrations.install_consumer_group_leases`, and receive their index
+and the group size from the database.
+
+Each change of membership starts a new *generation* of the group. The members of
+the previous generation stop processing and hand their position over; once all
+live members have acknowledged the change, and the leases of those that
+disappeared have expired, the new generation is activated, with new indexes and
+a start position that none of the previous members had yet gone past. No two
+members ever process the same stream at the same time, and no message is
+skipped. Messages a member processed past the handed over position are
+delivered again after the rebalance, so handlers must be idempotent, as they
+already must be for a `Subscription` that restarts.
+"""
+
+from __future__ import annotations
+
+import time
+from typing import Any, Callable, Dict, Tuple, cast
+from uuid import uuid4
+
+from psycopg2.extensions import cursor
+
+from message_db.client import MessageDB
+from message_db.connection import ConnectionPool
+from message_db.subscription import Subscription
+
+ENSURE_GROUP_SQL = """
+    INSERT INTO message_store.consumer_groups (group_name)
+    VALUES (%(group_name)s)
+    ON CONFLICT DO NOTHING
+"""
+
+# Every change of membership locks the group row first, so they are serialized
+LOCK_GROUP_SQL = """
+    SELECT generation, active
+    FROM message_store.consumer_groups
+    WHERE group_name = %(group_name)s
+    FOR UPDATE
+"""
+
+EXPIRE_MEMBERS_SQL = """
+    WITH expired AS (
+        DELETE FROM message_store.consumer_group_members
+        WHERE group_name = %(group_name)s
+          AND expires_at < now()
+        RETURNING position
+    )
+    SELECT count(*), min(position) FROM expired
+"""
+
+RENEW_LEASE_SQL = """
+    INSERT INTO message_store.consumer_group_members
+        (group_name, member_id, expires_at)
+    VALUES (
+        %(group_name)s,
+        %(member_id)s,
+        now() + %(lease_duration)s * interval '1 second'
+    )
+    ON CONFLICT (group_name, member_id)
+    DO UPDATE SET expires_at = EXCLUDED.expires_at
+    RETURNING generation
+"""
+
+START_GENERATION_SQL = """
+    UPDATE message_store.consumer_groups
+    SET generation = generation + 1,
+        active = false,
+        handover_position = least(handover_position, %(position)s)
+    WHERE group_name = %(group_name)s
+    RETURNING generation
+"""
+
+ACKNOWLEDGE_SQL = """
+    UPDATE message_store.consumer_group_members
+    SET generation = %(generation)s,
+        member_index = NULL,
+        position = coalesce(%(position)s, position)
+    WHERE group_name = %(group_name)s
+      AND member_id = %(member_id)s
+"""
+
+UNACKNOWLEDGED_SQL = """
+    SELECT count(*)
+    FROM message_store.consumer_group_members
+    WHERE group_name = %(group_name)s
+      AND generation IS DISTINCT FROM %(generation)s
+"""
+
+# The new generation starts at the lowest position handed over, by the live
+# members and by those that left or expired since the last activation
+ACTIVATE_SQL = """
+    WITH start AS (
+        SELECT coalesce(
+            least(
+                g.handover_position,
+                (
+                    SELECT min(position)
+                    FROM message_store.consumer_group_members
+                    WHERE group_name = %(group_name)s
+                )
+            ),
+            0
+        ) AS position
+        FROM message_store.consumer_groups g
+        WHERE g.group_name = %(group_name)s
+    ),
+    ranked AS (
+        SELECT member_id, row_number() OVER (ORDER BY member_id) - 1 AS member_index
+        FROM message_store.consumer_group_members
+        WHERE group_name = %(group_name)s
+    )
+    UPDATE message_store.consumer_group_members m
+    SET member_index = ranked.member_index,
+        position = start.position
+    FROM ranked, start
+    WHERE m.group_name = %(group_name)s
+      AND m.member_id = ranked.member_id;
+
+    UPDATE message_store.consumer_groups
+    SET active = true,
+        handover_position = NULL
+    WHERE group_name = %(group_name)s;
+"""
+
+ASSIGNMENT_SQL = """
+    UPDATE message_store.consumer_group_members
+    SET position = coalesce(%(position)s, position)
+    WHERE group_name = %(group_name)s
+      AND member_id = %(member_id)s
+      AND generation = %(generation)s
+    RETURNING member_index, position, (
+        SELECT count(*)
+        FROM message_store.consumer_group_members
+        WHERE group_name = %(group_name)s
+    )
+"""
+
+RECORD_POSITION_SQL = """
+    UPDATE message_store.consumer_group_members
+    SET position = %(position)s
+    WHERE group_name = %(group_name)s
+      AND member_id = %(member_id)s
+      AND generation = %(generation)s
+"""
+
+LEAVE_SQL = """
+    WITH departed AS (
+        DELETE FROM message_store.consumer_group_members
+        WHERE group_name = %(group_name)s
+          AND member_id = %(member_id)s
+        RETURNING position
+    )
+    UPDATE message_store.consumer_groups
+    SET generation = generation + 1,
+        active = false,
+        handover_position = least(
+            handover_position,
+            coalesce(%(position)s, (SELECT position FROM departed))
+        )
+    WHERE group_name = %(group_name)s
+"""
+
+
+def _fetchone(cur: cursor) -> Tuple[Any, ...]:
+    """Return the row of a statement that always returns one."""
+    return cast(Tuple[Any, ...], cur.fetchone())
+
+
+class Assignment:
+    """The share of a consumer group member in the current generation.
+
+    The member reads the category with *member* and *size* as
+    `consumer_group_member` and `consumer_group_size`, after global *position*.
+    """
+
+    __slots__ = ("generation", "member", "size", "position")
+
+    def __init__(self, generation: int, member: int, size: int, position: int) -> None:
+        self.generation = generation
+        self.member = member
+        self.size = size
+        self.position = position
+
+    def __repr__(self) -> str:
+        return (
+            f"Assignment(generation={self.generation!r}, member={self.member!r}, "
+            f"size={self.size!r}, position={self.position!r})"
+        )
+
+
+class ConsumerGroupLease:
+    """The membership of one consumer in a consumer group, held with a lease.
+
+    The member calls `heartbeat` more often than every *lease_duration* seconds
+    to keep its lease, and to learn its `Assignment`. A member whose lease
+    expired is removed from the group by the next heartbeat of any member, and
+    its last recorded position is handed over to the next generation.
+
+    A member must stop processing as soon as `heartbeat` returns `None`, or its
+    lease expires locally, see `expired`: the other members may then be assigned
+    its streams.
+    """
+
+    def __init__(
+        self,
+        connection_pool: ConnectionPool,
+        group_name: str,
+        member_id: str | None = None,
+        lease_duration: float = 10.0,
+    ) -> None:
+        """Initialize the lease.
+
+        Args:
+            connection_pool: The pool to coordinate with
+            group_name: Name of the consumer group, shared by its members
+            member_id: Unique name of the member, random by default. Members are
+                assigned their index in the order of their names.
+            lease_duration: Seconds after the last heartbeat when the member is
+                considered gone
+
+        Raises:
+            ValueError: If lease_duration is not positive
+        """
+        if lease_duration <= 0:
+            raise ValueError(f"lease_duration must be > 0, got {lease_duration}")
+
+        self.connection_pool = connection_pool
+        self.group_name = group_name
+        self.member_id = member_id or uuid4().hex
+        self.lease_duration = lease_duration
+
+        self.assignment: Assignment | None = None
+        self.expires = 0.0
+
+    def _transaction(self, operation: Callable[[cursor], Any]) -> Any:
+        conn = self.connection_pool.get_connection()
+        try:
+            with conn:
+                with conn.cursor() as cur:
+                    return operation(cur)
+        finally:
+            self.connection_pool.release(conn)
+
+    def _params(self, **params: Any) -> Dict[str, Any]:
+        params.update(group_name=self.group_name, member_id=self.member_id)
+        return params
+
+    def expired(self) -> bool:
+        """Whether the lease may have expired since the last heartbeat.
+
+        The local deadline is measured from before the heartbeat was sent, so
+        it always passes before the lease expires in the database.
+        """
+        return time.monotonic() >= self.expires
+
+    def heartbeat(self, position: int | None = None) -> Assignment | None:
+        """Renew the lease, take part in a rebalance, and return the assignment.
+
+        Args:
+            position: The global position of the last message processed under
+                the current assignment, if the member holds one
+
+        Returns:
+            Assignment: The member's share of the current generation, or `None`
+            while the group is rebalancing
+        """
+        started = time.monotonic()
+        self.assignment = self._transaction(lambda cur: self._heartbeat(cur, position))
+        self.expires = started + self.lease_duration
+        return self.assignment
+
+    def _heartbeat(self, cur: cursor, position: int | None) -> Assignment | None:
+        cur.execute(ENSURE_GROUP_SQL, self._params())
+        cur.execute(LOCK_GROUP_SQL, self._params())
+        generation, active = _fetchone(cur)
+
+        cur.execute(EXPIRE_MEMBERS_SQL, self._params())
+        expired, expired_position = _fetchone(cur)
+
+        cur.execute(RENEW_LEASE_SQL, self._params(lease_duration=self.lease_duration))
+        (member_generation,) = _fetchone(cur)
+
+        if expired or member_generation is None:
+            # A member joined or disappeared
+            cur.execute(START_GENERATION_SQL, self._params(position=expired_position))
+            (generation,) = _fetchone(cur)
+            active = False
+
+        if not active:
+            cur.execute(
+                ACKNOWLEDGE_SQL,
+                self._params(generation=generation, position=position),
+            )
+            cur.execute(UNACKNOWLEDGED_SQL, self._params(generation=generation))
+            (unacknowledged,) = _fetchone(cur)
+            if unacknowledged:
+                return None
+            cur.execute(ACTIVATE_SQL, self._params())
+            position = None  # Handed over, every member starts at the same position
+
+        cur.execute(
+            ASSIGNMENT_SQL, self._params(generation=generation, position=position)
+        )
+        row = cur.fetchone()
+        if row is None:  # pragma: no cover
+            return None
+        member, start_position, size = row
+        return Assignment(generation, member, size, start_position)
+
+    def record_position(self, position: int) -> bool:
+        """Record the position of the member within its assignment.
+
+        Returns:
+            bool: Whether the position was recorded; `False` if the member no
+            longer belongs to the generation of its assignment
+        """
+        if self.assignment is None:
+            return False
+
+        generation = self.assignment.generation
+
+        def record(cur: cursor) -> int:
+            cur.execute(
+                RECORD_POSITION_SQL,
+                self._params(position=position, generation=generation),
+            )
+            return cur.rowcount
+
+        if self._transaction(record):
+            return True
+        self.assignment = None
+        return False
+
+    def leave(self, position: int | None = None) -> None:
+        """Leave the group, and hand the position over to the next generation.
+
+        Args:
+            position: The global position of the last message processed under
+                the current assignment, if the member holds one
+        """
+
+        def leave(cur: cursor) -> None:
+            cur.execute(ENSURE_GROUP_SQL, self._params())
+            cur.execute(LOCK_GROUP_SQL, self._params())
+            cur.execute(LEAVE_SQL, self._params(position=position))
+
+        self._transaction(leave)
+        self.assignment = None
+        self.expires = 0.0
+
+
+class _Reassigned(Exception):
+    """Raised by a handler call to abandon a batch after a rebalance."""
+
+
+class RebalancingSubscription(Subscription):
+    """A `Subscription` whose consumer group membership is held with a lease.
+
+    Members of the group share the category and subscriber id, and can be
+    started and stopped at any time: each change of membership rebalances the
+    streams of the category over the live members. Positions are recorded in
+    the lease tables instead of a position stream.
+
+    The lease is renewed every *heartbeat_interval* seconds, between two
+    handler calls, so *lease_duration* must be longer than the slowest handler
+    call. Members waiting for the group to rebalance check in every
+    *poll_interval*.
+    """
+
+    def __init__(
+        self,
+        client: MessageDB,
+        category_name: str,
+        handler: Callable[[Dict[str, Any]], Any],
+        subscriber_id: str,
+        member_id: str | None = None,
+        lease_duration: float = 10.0,
+        heartbeat_interval: float | None = None,
+        **kwargs: Any,
+    ) -> None:
+        """Initialize the RebalancingSubscription.
+
+        Args:
+            client: The MessageDB client to read from and coordinate with
+            category_name: The category to subscribe to (must not contain hyphen)
+            handler: Callable invoked with each message, in order
+            subscriber_id: Name of the consumer group
+            member_id: Unique name of this member, random by default
+            lease_duration: Seconds without heartbeat after which the member is
+                removed from the group
+            heartbeat_interval: Seconds between heartbeats, a third of
+                *lease_duration* by default
+            kwargs: Keyword arguments to pass to `Subscription`
+
+        Raises:
+            ValueError: If category_name contains hyphen, or the heartbeat
+                interval is not shorter than the lease
+        """
+        for option in ("consumer_group_member", "consumer_group_size"):
+            if option in kwargs:
+                raise ValueError(f"{option} is assigned by the consumer group")
+        if heartbeat_interval is None:
+            heartbeat_interval = lease_duration / 3
+        if not 0 < heartbeat_interval < lease_duration:
+            raise ValueError(
+                f"heartbeat_interval must be > 0 and < lease_duration, "
+                f"got {heartbeat_interval}"
+            )
+
+        super().__init__(client, category_name, self._handle, subscriber_id, **kwargs)
+        self.message_handler = handler
+        self.heartbeat_interval = heartbeat_interval
+        self.lease = ConsumerGroupLease(
+            client.connection_pool,
+            f"{category_name}:{subscriber_id}",
+            member_id,
+            lease_duration,
+        )
+        self._next_heartbeat = 0.0
+
+    @property
+    def assignment(self) -> Assignment | None:
+        """The share of the category this member currently processes."""
+        if self.lease.expired():
+            return None
+        return self.lease.assignment
+
+    def heartbeat(self) -> Assignment | None:
+        """Renew the lease, and switch to the new assignment after a rebalance."""
+        previous = self.assignment
+        assignment = self.lease.heartbeat(
+            self.position if previous is not None else None
+        )
+        self._next_heartbeat = time.monotonic() + self.heartbeat_interval
+
+        if assignment is None:
+            self.consumer_group_member = self.consumer_group_size = None
+            self._unrecorded_messages = 0
+        elif previous is None or assignment.generation != previous.generation:
+            self.consumer_group_member = assignment.member
+            self.consumer_group_size = assignment.size
+            self.position = assignment.position
+            self._unrecorded_messages = 0
+        return assignment
+
+    def _handle(self, message: Dict[str, Any]) -> None:
+        if time.monotonic() >= self._next_heartbeat:
+            previous = self.assignment
+            assignment = self.heartbeat()
+            if (
+                assignment is None
+                or previous is None
+                or assignment.generation != previous.generation
+            ):
+                # The rest of the batch may belong to another member now
+                raise _Reassigned()
+        self.message_handler(message)
+
+    def load_position(self) -> int:
+        """The position is handed over by the group; nothing to load."""
+        self._unrecorded_messages = 0
+        return self.position
+
+    def record_position(self) -> None:
+        """Record the current position in the lease of the member."""
+        if self.assignment is not None:
+            if not self.lease.record_position(self.position):
+                self.consumer_group_member = self.consumer_group_size = None
+        self._unrecorded_messages = 0
+
+    def poll(self) -> int:
+        """Renew the lease when due, then process the next batch of the assignment.
+
+        Returns:
+            Number of messages processed
+        """
+        if self.assignment is None or time.monotonic() >= self._next_heartbeat:
+            self.heartbeat()
+        if self.assignment is None:
+            self.poll_interval = self.min_poll_interval
+            return 0
+
+        try:
+            return super().poll()
+        except _Reassigned:
+            self.poll_interval = 0.0
+            return 0
+
+    def start(self) -> None:
+        """Process messages until `stop` is called, then leave the group."""
+        try:
+            super().start()
+        finally:
+            self.lease.leave(self.position if self.assignment is not None else None)
@@ -0,0 +1,222 @@
+from __future__ import annotations
+
+import json
+import threading
+from typing import Any, Callable, Dict, List
+
+from message_db.client import MessageDB, validate_category_name
+from message_db.message import MessageBatch
+from message_db.notifications import NotificationListener
+
+
+class Subscription:
+    """Continuously read a category and dispatch its messages to a handler.
+
+    The subscription reads the category from the last processed global position,
+    calls the handler for every message, and periodically records its position
+    in a position stream, ``{category}:position-{subscriber_id}``, so a restarted
+    consumer resumes where it left off.
+
+    Polling adapts to the load: a full batch is followed immediately by the next
+    read, a partial batch by a wait of *poll_interval*, and every empty read
+    multiplies the wait by *backoff_multiplier*, up to *max_poll_interval*. Idle
+    consumers stop hammering the database, while busy ones keep low latency.
+
+    With a `NotificationListener`, the wait ends as soon as a message is written to
+    the subscribed streams, and the poll interval only serves as a fallback for
+    missed notifications.
+
+    With *message_types*, only messages of these types reach the handler. The
+    filter runs in the database, and the position still advances past the
+    messages it skips.
+    """
+
+    POSITION_MESSAGE_TYPE = "Recorded"
+
+    def __init__(
+        self,
+        client: MessageDB,
+        category_name: str,
+        handler: Callable[[Dict[str, Any]], Any],
+        subscriber_id: str,
+        batch_size: int = 1000,
+        position_update_interval: int = 100,
+        consumer_group_member: int | None = None,
+        consumer_group_size: int | None = None,
+        poll_interval: float = 0.1,
+        max_poll_interval: float = 5.0,
+        backoff_multiplier: float = 2.0,
+        listener: NotificationListener | None = None,
+        message_types: List[str] | None = None,
+    ) -> None:
+        """Initialize the Subscription.
+
+        Args:
+            client: The MessageDB client to read from and record positions with
+            category_name: The category to subscribe to (must not contain hyphen)
+            handler: Callable invoked with each message, in order
+            subscriber_id: Unique name of the consumer, used in the position stream
+            batch_size: Maximum number of messages to read per poll
+            position_update_interval: Number of processed messages between position writes
+            consumer_group_member: Zero-based consumer identifier within the group
+            consumer_group_size: Total number of consumers in the group
+            poll_interval: Wait after a partial batch, in seconds
+            max_poll_interval: Upper bound for the wait when idle, in seconds
+            backoff_multiplier: Factor applied to the wait after each empty read
+            listener: Optional notification listener that ends waits early
+            message_types: Only dispatch messages of these types
+
+        Raises:
+            ValueError: If category_name contains hyphen or consumer group parameters are invalid
+        """
+        validate_category_name(
+            category_name, consumer_group_member, consumer_group_size
+        )
+        if position_update_interval < 1:
+            raise ValueError(
+                f"position_update_interval must be > 0, got {position_update_interval}"
+            )
+
+        self.client = client
+        self.category_name = category_name
+        self.handler = handler
+        self.subscriber_id = subscriber_id
+        self.batch_size = batch_size
+        self.position_update_interval = position_update_interval
+        self.consumer_group_member = consumer_group_member
+        self.consumer_group_size = consumer_group_size
+        self.min_poll_interval = poll_interval
+        self.max_poll_interval = max_poll_interval
+        self.backoff_multiplier = backoff_multiplier
+        self.listener = listener
+        self.message_types = message_types
+
+        self.poll_interval = poll_interval
+        self.position = 0
+        self._unrecorded_messages = 0
+        self._stop_event = threading.Event()
+        self._wakeup: threading.Event | None = None
+
+    @property
+    def position_stream_name(self) -> str:
+        """Name of the stream where this subscriber records its position.
+
+        Consumer group members each track their own position.
+        """
+        identifier = self.subscriber_id
+        if self.consumer_group_member is not None:
+            identifier = f"{identifier}-{self.consumer_group_member}"
+        return f"{self.category_name}:position-{identifier}"
+
+    def load_position(self) -> int:
+        """Load the last recorded position from the position stream."""
+        message = self.client.read_last_message(self.position_stream_name)
+        if message is None:
+            self.position = 0
+        else:
+            data = message["data"]
+            if isinstance(data, str):  # The client may use a `RawCodec`
+                data = json.loads(data)
+            self.position = data["position"]
+        self._unrecorded_messages = 0
+        return self.position
+
+    def record_position(self) -> None:
+        """Write the current position to the position stream."""
+        self.client.write(
+            self.position_stream_name,
+            self.POSITION_MESSAGE_TYPE,
+            {"position": self.position},
+        )
+        self._unrecorded_messages = 0
+
+    def poll(self) -> int:
+        """Read the next batch, dispatch it to the handler, and adjust the poll interval.
+
+        Returns:
+            Number of messages processed
+        """
+        messages = self.client.read_category(
+            self.category_name,
+            position=self.position + 1,
+            no_of_messages=self.batch_size,
+            consumer_group_member=self.consumer_group_member,
+            consumer_group_size=self.consumer_group_size,
+            message_types=self.message_types,
+        )
+
+        for message in messages:
+            self.handler(message)
+
+            self.position = message["global_position"]
+            self._unrecorded_messages += 1
+            if self._unrecorded_messages >= self.position_update_interval:
+                self.record_position()
+
+        scanned = len(messages)
+        if isinstance(messages, MessageBatch) and messages.last_position is not None:
+            # Skip past the messages filtered out after the last dispatched one
+            self._unrecorded_messages += messages.scanned - len(messages)
+            self.position = messages.last_position
+            scanned = messages.scanned
+
+        if scanned >= self.batch_size:
+            self.poll_interval = 0.0
+        elif scanned:
+            self.poll_interval = self.min_poll_interval
+        else:
+            self.poll_interval = min(
+                max(self.poll_interval, self.min_poll_interval)
+                * self.backoff_multiplier,
+                self.max_poll_interval,
+            )
+
+        return len(messages)
+
+    def wait(self) -> None:
+        """Wait for the current poll interval, or until the subscription is stopped.
+
+        With a listener, the wait also ends when a new message is announced.
+        """
+        if self.poll_interval <= 0:
+            return
+
+        if self._wakeup is None:
+            self._stop_event.wait(self.poll_interval)
+        else:
+            self._wakeup.wait(self.poll_interval)
+            self._wakeup.clear()
+
+    def start(self) -> None:
+        """Process messages until `stop` is called.
+
+        The position is loaded before the first read and recorded on the way out,
+        including when the handler raises.
+        """
+        self._stop_event.clear()
+        self.load_position()
+
+        if self.listener is not None:
+            self._wakeup = self.listener.subscribe(
+                self.category_name,
+                self.consumer_group_member,
+                self.consumer_group_size,
+            )
+
+        try:
+            while not self._stop_event.is_set():
+                self.poll()
+                self.wait()
+        finally:
+            if self.listener is not None and self._wakeup is not None:
+                self.listener.unsubscribe(self.category_name, self._wakeup)
+                self._wakeup = None
+
+            if self._unrecorded_messages:
+                self.record_position()
+
+    def stop(self) -> None:
+        """Ask a running subscription to stop after the current batch."""
+        self._stop_event.set()
+        if self._wakeup is not None:
+            self._wakeup.set()
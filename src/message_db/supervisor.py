@@ -0,0 +1,268 @@
+"""Run the members of a consumer group as worker processes.
+
+A `ConsumerSupervisor` scales a category across cores: it starts one process per
+consumer group member, each with its own client, connection pool and position
+stream, restarts the workers that exit unexpectedly, and stops them all in an
+orderly way, so that each records its position before exiting.
+"""
+
+from __future__ import annotations
+
+import multiprocessing
+import os
+import signal
+import threading
+import time
+from multiprocessing.connection import wait
+from typing import Any, Callable, Dict
+
+from message_db.client import MessageDB, validate_category_name
+from message_db.subscription import Subscription
+
+
+def _stop_when_set(stop_event: Any, subscription: Subscription) -> None:
+    stop_event.wait()
+    subscription.stop()
+
+
+def _run_worker(
+    url: str,
+    client_options: Dict[str, Any],
+    category_name: str,
+    handler: Callable[[Dict[str, Any]], Any],
+    subscriber_id: str,
+    consumer_group_member: int,
+    consumer_group_size: int,
+    subscription_options: Dict[str, Any],
+    stop_event: Any,
+) -> None:
+    """Entry point of a worker process: run one member of the consumer group
+    until its stop event is set."""
+    # The supervisor coordinates the shutdown: a Ctrl-C sent to the process
+    # group must not interrupt the workers before they record their position
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    # Only the watcher thread waits on the event, so setting it from the signal
+    # handler cannot deadlock the main thread
+    signal.signal(signal.SIGTERM, lambda signum, frame: stop_event.set())
+
+    client = MessageDB.from_url(url, **client_options)
+    try:
+        subscription = Subscription(
+            client,
+            category_name,
+            handler,
+            subscriber_id,
+            consumer_group_member=consumer_group_member,
+            consumer_group_size=consumer_group_size,
+            **subscription_options,
+        )
+        threading.Thread(
+            target=_stop_when_set, args=(stop_event, subscription), daemon=True
+        ).start()
+        subscription.start()
+    finally:
+        client.connection_pool.closeall()
+
+
+class ConsumerSupervisor:
+    """Start a worker process per member of a consumer group, and keep them running.
+
+    Each worker creates its own `MessageDB` client from *url* and runs a
+    `Subscription` to the category as member *i* of a group of *processes*, so
+    it reads its share of the streams and records its own position. Handlers
+    that are CPU-bound run in parallel, on as many cores as there are workers.
+
+    A worker that exits while the supervisor is running is restarted after
+    *restart_delay* seconds, doubled on each consecutive crash up to
+    *max_restart_delay*. The restarted worker resumes from the last position its
+    member recorded. A worker that stays up for *max_restart_delay* seconds
+    resets its delay.
+
+    Workers are started with the ``spawn`` method by default, so *handler* must
+    be picklable, such as a function defined at the top level of a module.
+    """
+
+    def __init__(
+        self,
+        url: str,
+        category_name: str,
+        handler: Callable[[Dict[str, Any]], Any],
+        subscriber_id: str,
+        processes: int | None = None,
+        client_options: Dict[str, Any] | None = None,
+        restart_delay: float = 1.0,
+        max_restart_delay: float = 30.0,
+        shutdown_timeout: float = 10.0,
+        start_method: str = "spawn",
+        **subscription_options: Any,
+    ) -> None:
+        """Initialize the ConsumerSupervisor.
+
+        Args:
+            url: Postgres URL each worker creates its client with
+            category_name: The category to subscribe to (must not contain hyphen)
+            handler: Callable invoked with each message, in the worker processes
+            subscriber_id: Unique name of the consumer group, used in the position streams
+            processes: Number of workers and size of the group, by default the
+                number of CPUs
+            client_options: Keyword arguments to pass to `MessageDB.from_url()`
+            restart_delay: Wait before restarting a worker that exited, in seconds
+            max_restart_delay: Upper bound for the wait after consecutive crashes
+            shutdown_timeout: Time given to the workers to stop before they are
+                terminated, in seconds
+            start_method: The `multiprocessing` start method of the workers
+            subscription_options: Keyword arguments to pass to `Subscription`
+
+        Raises:
+            ValueError: If category_name contains hyphen, or a parameter is invalid
+        """
+        if processes is None:
+            processes = os.cpu_count() or 1
+        if processes < 1:
+            raise ValueError(f"processes must be > 0, got {processes}")
+        validate_category_name(category_name, 0, processes)
+        if restart_delay < 0:
+            raise ValueError(f"restart_delay must be >= 0, got {restart_delay}")
+        if shutdown_timeout < 0:
+            raise ValueError(f"shutdown_timeout must be >= 0, got {shutdown_timeout}")
+        for option in ("consumer_group_member", "consumer_group_size"):
+            if option in subscription_options:
+                raise ValueError(f"{option} is assigned by the supervisor")
+
+        self.url = url
+        self.category_name = category_name
+        self.handler = handler
+        self.subscriber_id = subscriber_id
+        self.processes = processes
+        self.client_options = client_options or {}
+        self.restart_delay = restart_delay
+        self.max_restart_delay = max(max_restart_delay, restart_delay)
+        self.shutdown_timeout = shutdown_timeout
+        self.subscription_options = subscription_options
+
+        self.context: Any = multiprocessing.get_context(start_method)
+        self.workers: Dict[int, Any] = {}
+        self.restarts: Dict[int, int] = {}
+        self._stop_events: Dict[int, Any] = {}
+        self._started_at: Dict[int, float] = {}
+        self._crashes: Dict[int, int] = {}
+        self._pending: Dict[int, float] = {}
+        self._stop_requested = False
+
+    def _start_worker(self, member: int) -> None:
+        stop_event = self.context.Event()
+        process = self.context.Process(
+            target=_run_worker,
+            args=(
+                self.url,
+                self.client_options,
+                self.category_name,
+                self.handler,
+                self.subscriber_id,
+                member,
+                self.processes,
+                self.subscription_options,
+                stop_event,
+            ),
+            name=f"{self.category_name}:{self.subscriber_id}-{member}",
+            daemon=True,
+        )
+        process.start()
+        self.workers[member] = process
+        self._stop_events[member] = stop_event
+        self._started_at[member] = time.monotonic()
+
+    def _worker_exited(self, member: int) -> None:
+        """Schedule the restart of a worker that exited on its own."""
+        process = self.workers.pop(member)
+        process.join()
+        process.close()
+        del self._stop_events[member]
+
+        if time.monotonic() - self._started_at[member] >= self.max_restart_delay:
+            self._crashes[member] = 0
+        crashes = self._crashes.get(member, 0)
+        self._crashes[member] = crashes + 1
+        delay = min(self.restart_delay * 2**crashes, self.max_restart_delay)
+        self._pending[member] = time.monotonic() + delay
+
+    def start(self) -> None:
+        """Start the workers that are not running, without waiting."""
+        self._stop_requested = False
+        for member in range(self.processes):
+            if member not in self.workers:
+                self._start_worker(member)
+
+    def run(self, monitor_interval: float = 0.5) -> None:
+        """Start the workers, and supervise them until `stop` is called.
+
+        Called from the main thread, `SIGINT` and `SIGTERM` also stop the workers.
+
+        Args:
+            monitor_interval: Upper bound for the time to notice a stop request,
+                in seconds
+        """
+        handlers: Dict[signal.Signals, Any] = {}
+        if threading.current_thread() is threading.main_thread():
+            for signum in (signal.SIGINT, signal.SIGTERM):
+                handlers[signum] = signal.signal(
+                    signum, lambda signum, frame: self.stop()
+                )
+
+        try:
+            self.start()
+            while not self._stop_requested:
+                timeout = monitor_interval
+                if self._pending:
+                    timeout = min(
+                        timeout,
+                        max(0.0, min(self._pending.values()) - time.monotonic()),
+                    )
+
+                sentinels = {
+                    process.sentinel: member for member, process in self.workers.items()
+                }
+                for sentinel in wait(list(sentinels), timeout):
+                    if not self._stop_requested:
+                        self._worker_exited(sentinels[sentinel])
+
+                now = time.monotonic()
+                for member, restart_at in list(self._pending.items()):
+                    if restart_at <= now and not self._stop_requested:
+                        del self._pending[member]
+                        self.restarts[member] = self.restarts.get(member, 0) + 1
+                        self._start_worker(member)
+        finally:
+            self.shutdown()
+            for signum, handler in handlers.items():
+                signal.signal(signum, handler)
+
+    def stop(self) -> None:
+        """Ask `run` to stop the workers and return."""
+        self._stop_requested = True
+
+    def shutdown(self) -> None:
+        """Stop the workers, and wait for them to exit.
+
+        Each worker finishes its current batch and records its position. Workers
+        still running after *shutdown_timeout* seconds are terminated.
+        """
+        self._pending.clear()
+        for stop_event in self._stop_events.values():
+            stop_event.set()
+
+        deadline = time.monotonic() + self.shutdown_timeout
+        for process in self.workers.values():
+            process.join(max(0.0, deadline - time.monotonic()))
+
+        for process in self.workers.values():
+            if process.is_alive():
+                process.terminate()
+                process.join(1.0)
+                if process.is_alive():
+                    process.kill()
+                    process.join()
+            process.close()
+
+        self.workers.clear()
+        self._stop_events.clear()
@@ -0,0 +1,240 @@
+import asyncio
+
+import pytest
+
+pytest.importorskip("psycopg")
+pytest.importorskip("psycopg_pool")
+
+from message_db.async_client import AsyncMessageDB  # noqa: E402
+from message_db.async_connection import AsyncConnectionPool  # noqa: E402
+
+CONNECT_URL = "postgresql://message_store@localhost:5432/message_store"
+
+
+def run(scenario):
+    """Run *scenario* with a fresh client, closing its pool afterwards."""
+
+    async def runner():
+        client = AsyncMessageDB.from_url(CONNECT_URL, max_connections=5)
+        try:
+            return await scenario(client)
+        finally:
+            await client.connection_pool.closeall()
+
+    return asyncio.run(runner())
+
+
+class TestAsyncClientConstruction:
+    def test_client_construction_from_url(self):
+        store = AsyncMessageDB.from_url(CONNECT_URL)
+
+        assert isinstance(store, AsyncMessageDB)
+        assert isinstance(store.connection_pool, AsyncConnectionPool)
+
+    def test_client_construction_from_args(self):
+        store = AsyncMessageDB()
+
+        assert isinstance(store.connection_pool, AsyncConnectionPool)
+
+    def test_error_on_invalid_max_connections(self):
+        with pytest.raises(ValueError):
+            AsyncConnectionPool(CONNECT_URL, max_connections=-1)
+
+
+class TestAsyncWrite:
+    def test_write_returns_position(self):
+        async def scenario(client):
+            first = await client.write("testStream-123", "Event1", {"foo": "bar"})
+            second = await client.write(
+                "testStream-123", "Event1", {"foo": "bar"}, {"trace_id": "baz"}
+            )
+            return first, second, await client.read("testStream-123")
+
+        first, second, messages = run(scenario)
+
+        assert (first, second) == (0, 1)
+        assert messages[1]["data"] == {"foo": "bar"}
+        assert messages[1]["metadata"] == {"trace_id": "baz"}
+
+    def test_write_fails_on_expected_version_mismatch(self):
+        async def scenario(client):
+            await client.write("testStream-123", "Event1", {"foo": "bar"})
+            await client.write(
+                "testStream-123", "Event1", {"foo": "bar"}, expected_version=1
+            )
+
+        with pytest.raises(ValueError) as exc:
+            run(scenario)
+
+        assert (
+            exc.value.args[0]
+            == "P0001-ERROR:  Wrong expected version: 1 (Stream: testStream-123, Stream Version: 0)"
+        )
+
+    def test_write_batch(self):
+        async def scenario(client):
+            position = await client.write_batch(
+                "testStream-123",
+                [("Event1", {"foo": 1}), ("Event2", {"foo": 2}, {"trace_id": "t"})],
+                expected_version=-1,
+            )
+            return position, await client.read_stream("testStream-123")
+
+        position, messages = run(scenario)
+
+        assert position == 1
+        assert [message["type"] for message in messages] == ["Event1", "Event2"]
+        assert messages[0]["metadata"] is None
+        assert messages[1]["metadata"] == {"trace_id": "t"}
+
+    def test_concurrent_writes_share_the_pool(self):
+        async def scenario(client):
+            await asyncio.gather(
+                *(
+                    client.write("concurrentStream-123", "Event", {"index": index})
+                    for index in range(50)
+                )
+            )
+            return await client.read("concurrentStream-123")
+
+        assert len(run(scenario)) == 50
+
+
+class TestAsyncRead:
+    def test_read_category(self):
+        async def scenario(client):
+            for index in range(3):
+                await client.write(f"testStream-{index}", "Event1", {"index": index})
+            return await client.read_category("testStream")
+
+        messages = run(scenario)
+
+        assert [message["data"] for message in messages] == [
+            {"index": 0},
+            {"index": 1},
+            {"index": 2},
+        ]
+
+    def test_read_category_with_consumer_group(self):
+        async def scenario(client):
+            for index in range(10):
+                await client.write(f"testStream-{index}", "Event1", {"index": index})
+            return [
+                await client.read_category(
+                    "testStream", consumer_group_member=member, consumer_group_size=2
+                )
+                for member in range(2)
+            ]
+
+        messages_0, messages_1 = run(scenario)
+
+        assert len(messages_0) + len(messages_1) == 10
+
+    def test_read_category_validates_name(self):
+        async def scenario(client):
+            await client.read_category("testStream-123")
+
+        with pytest.raises(ValueError) as exc:
+            run(scenario)
+
+        assert exc.value.args[0] == "testStream-123 is not a category"
+
+    def test_read_stream_validates_name(self):
+        async def scenario(client):
+            await client.read_stream("testStream")
+
+        with pytest.raises(ValueError) as exc:
+            run(scenario)
+
+        assert exc.value.args[0] == "testStream is not a stream"
+
+    def test_read_all(self):
+        async def scenario(client):
+            await client.write("testStream-123", "Event1", {"foo": "bar"})
+            await client.write("otherStream-123", "Event1", {"foo": "baz"})
+            return await client.read("$all")
+
+        assert len(run(scenario)) == 2
+
+    def test_read_last_message(self):
+        async def scenario(client):
+            for index in range(3):
+                await client.write("testStream-123", "Event1", {"index": index})
+            return (
+                await client.read_last_message("testStream-123"),
+                await client.read_last_message("emptyStream-123"),
+            )
+
+        message, missing = run(scenario)
+
+        assert message["position"] == 2
+        assert message["data"] == {"index": 2}
+        assert missing is None
+
+    def test_stream_identifiers(self):
+        async def scenario(client):
+            await client.write("testCategory-beta", "Event1", {"k": "v"})
+            await client.write("testCategory-alpha", "Event1", {"k": "v"})
+            await client.write("testCategory:snapshot-alpha", "SNAPSHOT", {"k": "v"})
+            return await client.stream_identifiers("testCategory")
+
+        assert run(scenario) == ["alpha", "beta"]
+
+
+class TestAsyncMessageTypes:
+    def test_read_category_with_message_types(self):
+        async def scenario(client):
+            for message_type in ["Event1", "Event2", "Event1"]:
+                await client.write("testStream-123", message_type, {"foo": "bar"})
+
+            return await client.read_category("testStream", message_types=["Event2"])
+
+        messages = run(scenario)
+
+        assert [message["global_position"] for message in messages] == [2]
+        assert messages.last_position == 3
+
+
+class TestAsyncReadStreams:
+    def test_read_streams(self):
+        async def scenario(client):
+            await client.write("testStream-1", "Event1", {"foo": "bar"})
+            await client.write("testStream-2", "Event1", {"foo": "baz"})
+
+            return await client.read_streams(
+                ["testStream-1", "testStream-2", "testStream-3"]
+            )
+
+        messages = run(scenario)
+
+        assert messages["testStream-1"][0]["data"] == {"foo": "bar"}
+        assert messages["testStream-2"][0]["data"] == {"foo": "baz"}
+        assert messages["testStream-3"] == []
+
+
+class TestAsyncSnapshots:
+    def test_load_entity_after_snapshot(self):
+        async def scenario(client):
+            for amount in [10, 20]:
+                await client.write("account-123", "Deposited", {"amount": amount})
+            entity = await client.load_entity("account", "123")
+            await client.write_snapshot(entity, {"balance": 30})
+            await client.write("account-123", "Deposited", {"amount": 5})
+
+            return await client.load_entity("account", "123")
+
+        entity = run(scenario)
+
+        assert entity.snapshot == {"balance": 30}
+        assert entity.snapshot_version == 1
+        assert [message["data"] for message in entity.messages] == [{"amount": 5}]
+
+
+class TestAsyncStreamVersion:
+    def test_stream_version(self):
+        async def scenario(client):
+            empty = await client.stream_version("testStream-123")
+            await client.write("testStream-123", "Event1", {"foo": "bar"})
+            return empty, await client.stream_version("testStream-123")
+
+        assert run(scenario) == (-1, 0)
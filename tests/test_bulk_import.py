@@ -0,0 +1,93 @@
+import pytest
+
+from message_db.cache import VersionCache
+from message_db.client import MessageDB
+
+CONNECT_URL = "postgresql://message_store@localhost:5432/message_store"
+
+
+class TestBulkImport:
+    def test_import_returns_number_of_messages(self, client):
+        messages = [("testStream-123", "Event1", {"foo": i}) for i in range(5)]
+
+        assert client.bulk_import(messages) == 5
+        assert len(client.read_stream("testStream-123")) == 5
+
+    def test_positions_follow_input_order_per_stream(self, client):
+        messages = [
+            ("testStream-1", "Event1", {"i": 0}),
+            ("testStream-2", "Event1", {"i": 1}),
+            ("testStream-1", "Event2", {"i": 2}),
+            ("other-1", "Event1", {"i": 3}),
+        ]
+
+        client.bulk_import(messages, chunk_size=3)
+
+        assert [
+            (message["stream_name"], message["position"], message["data"]["i"])
+            for message in client.read("$all")
+        ] == [
+            ("testStream-1", 0, 0),
+            ("testStream-2", 0, 1),
+            ("testStream-1", 1, 2),
+            ("other-1", 0, 3),
+        ]
+
+    def test_import_continues_after_existing_messages(self, client):
+        client.write("testStream-123", "Event1", {"foo": "bar"})
+
+        client.bulk_import(("testStream-123", "Event2", {"i": i}) for i in range(3))
+
+        assert [
+            message["position"] for message in client.read_stream("testStream-123")
+        ] == [0, 1, 2, 3]
+        assert client.write("testStream-123", "Event3", {}, expected_version=3) == 4
+
+    def test_import_data_and_metadata(self, client):
+        client.bulk_import(
+            [
+                ("testStream-123", "Event1", {"text": 'a "quoted", multi\nline'}),
+                ("testStream-123", "Event1", {"foo": "bar"}, {"source": "legacy"}),
+            ]
+        )
+
+        messages = client.read_stream("testStream-123")
+        assert messages[0]["data"] == {"text": 'a "quoted", multi\nline'}
+        assert messages[0]["metadata"] is None
+        assert messages[1]["metadata"] == {"source": "legacy"}
+        assert messages[0]["id"] != messages[1]["id"]
+
+    def test_import_of_empty_iterable(self, client):
+        assert client.bulk_import([]) == 0
+
+    def test_invalid_stream_name_raises_error(self, client):
+        with pytest.raises(ValueError) as exc:
+            client.bulk_import([("testStream", "Event1", {})])
+
+        assert exc.value.args[0] == "testStream is not a stream"
+
+    def test_invalid_chunk_size_raises_error(self, client):
+        with pytest.raises(ValueError) as exc:
+            client.bulk_import([], chunk_size=0)
+
+        assert exc.value.args[0] == "chunk_size must be > 0, got 0"
+
+    def test_failed_chunk_keeps_earlier_chunks(self, client):
+        def messages():
+            yield ("testStream-123", "Event1", {"foo": "bar"})
+            yield ("testStream-123", "Event1", {"foo": "bar"})
+            yield ("testStream", "Event1", {})
+
+        with pytest.raises(ValueError):
+            client.bulk_import(messages(), chunk_size=2)
+
+        assert len(client.read_stream("testStream-123")) == 2
+
+    def test_import_updates_version_cache(self):
+        client = MessageDB.from_url(CONNECT_URL, version_cache=VersionCache())
+        try:
+            client.bulk_import(("testStream-123", "Event1", {}) for _ in range(3))
+
+            assert client.version_cache.get("testStream-123") == 2
+        finally:
+            client.connection_pool.closeall()
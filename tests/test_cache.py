@@ -0,0 +1,150 @@
+import pytest
+
+from message_db.cache import StreamCache
+from message_db.client import MessageDB
+
+CONNECT_URL = "postgresql://message_store@localhost:5432/message_store"
+
+
+@pytest.fixture
+def cached_client():
+    client = MessageDB.from_url(CONNECT_URL, stream_cache=StreamCache(max_messages=10))
+    yield client
+
+    client.connection_pool.closeall()
+
+
+@pytest.fixture
+def reads(cached_client, monkeypatch):
+    """Record the positions and sizes of the reads that reach the database."""
+    calls = []
+    read = cached_client.read
+
+    def recording_read(stream_name, **kwargs):
+        calls.append((kwargs["position"], kwargs["no_of_messages"]))
+        return read(stream_name, **kwargs)
+
+    monkeypatch.setattr(cached_client, "read", recording_read)
+    return calls
+
+
+def write_events(client, count, stream_name="testStream-123"):
+    for index in range(count):
+        client.write(stream_name, "Event1", {"index": index})
+
+
+class TestStreamCache:
+    def test_invalid_size_raises_error(self):
+        with pytest.raises(ValueError) as exc:
+            StreamCache(max_messages=0)
+
+        assert exc.value.args[0] == "max_messages must be > 0, got 0"
+
+    def test_extend_and_read(self):
+        cache = StreamCache()
+        cache.extend("testStream-1", 0, ["m0", "m1", "m2"])
+
+        assert cache.read("testStream-1", 1, 5) == (["m1", "m2"], 3)
+        assert cache.read("testStream-2", 0, 5) == ([], 0)
+
+    def test_extend_skips_cached_messages_and_ignores_gaps(self):
+        cache = StreamCache()
+        cache.extend("testStream-1", 0, ["m0", "m1"])
+        cache.extend("testStream-1", 1, ["m1", "m2"])
+        cache.extend("testStream-1", 5, ["m5"])
+        cache.extend("testStream-2", 1, ["m1"])
+
+        assert cache.read("testStream-1", 0, 10) == (["m0", "m1", "m2"], 3)
+        assert "testStream-2" not in cache
+        assert cache.size == 3
+
+    def test_least_recently_used_streams_are_evicted(self):
+        cache = StreamCache(max_messages=4)
+        cache.extend("testStream-1", 0, ["m0", "m1"])
+        cache.extend("testStream-2", 0, ["m0", "m1"])
+        cache.read("testStream-1", 0, 1)
+        cache.extend("testStream-3", 0, ["m0"])
+
+        assert "testStream-1" in cache
+        assert "testStream-2" not in cache
+        assert "testStream-3" in cache
+        assert cache.size == 3
+
+    def test_invalidate_and_clear(self):
+        cache = StreamCache()
+        cache.extend("testStream-1", 0, ["m0"])
+        cache.extend("testStream-2", 0, ["m0", "m1"])
+
+        cache.invalidate("testStream-1")
+        assert "testStream-1" not in cache
+        assert cache.size == 2
+
+        cache.clear()
+        assert len(cache) == 0
+        assert cache.size == 0
+
+
+class TestCachedReadStream:
+    def test_only_messages_after_the_cached_prefix_are_read(self, cached_client, reads):
+        write_events(cached_client, 3)
+        first = cached_client.read_stream("testStream-123")
+
+        write_events(cached_client, 2)
+        second = cached_client.read_stream("testStream-123")
+
+        assert reads == [(0, 1000), (3, 997)]
+        assert len(first) == 3
+        assert [message["data"]["index"] for message in second] == [0, 1, 2, 0, 1]
+
+    def test_fully_cached_range_does_not_hit_the_database(self, cached_client, reads):
+        write_events(cached_client, 5)
+        cached_client.read_stream("testStream-123")
+
+        messages = cached_client.read_stream(
+            "testStream-123", position=1, no_of_messages=3
+        )
+
+        assert reads == [(0, 1000)]
+        assert [message["position"] for message in messages] == [1, 2, 3]
+
+    def test_cached_reads_match_uncached_reads(self, cached_client, client):
+        write_events(cached_client, 6)
+        cached_client.read_stream("testStream-123", no_of_messages=2)
+
+        for position, no_of_messages in [(0, 3), (1, 10), (4, 1), (6, 5)]:
+            assert cached_client.read_stream(
+                "testStream-123", position=position, no_of_messages=no_of_messages
+            ) == client.read_stream(
+                "testStream-123", position=position, no_of_messages=no_of_messages
+            )
+
+    def test_reads_beyond_the_cached_prefix_are_not_cached(self, cached_client, reads):
+        write_events(cached_client, 5)
+
+        cached_client.read_stream("testStream-123", position=3)
+
+        assert "testStream-123" not in cached_client.stream_cache
+
+    def test_writes_from_other_clients_are_read(self, cached_client, client):
+        write_events(cached_client, 2)
+        cached_client.read_stream("testStream-123")
+
+        write_events(client, 1)
+
+        assert len(cached_client.read_stream("testStream-123")) == 3
+
+    def test_filtered_reads_bypass_the_cache(self, cached_client):
+        write_events(cached_client, 2)
+
+        cached_client.read_stream("testStream-123", message_types=["Event1"])
+
+        assert "testStream-123" not in cached_client.stream_cache
+
+    def test_streams_larger_than_the_cache_are_read_from_the_database(
+        self, cached_client
+    ):
+        write_events(cached_client, 12)
+
+        assert len(cached_client.read_stream("testStream-123")) == 12
+        assert len(cached_client.read_stream("testStream-123")) == 12
+        assert cached_client.stream_cache.size == 0
@@ -0,0 +1,104 @@
+import pytest
+
+from message_db.client import MessageDB
+from message_db.codec import (
+    Codec,
+    JsonCodec,
+    MsgspecCodec,
+    OrjsonCodec,
+    RawCodec,
+    default_codec,
+)
+from message_db.subscription import Subscription
+
+CONNECT_URL = "postgresql://message_store@localhost:5432/message_store"
+
+VALUE = {"name": "Jane", "tags": ["a", "b"], "count": 3, "ratio": 0.5, "nested": {}}
+
+
+class CountingCodec(JsonCodec):
+    def __init__(self):
+        self.encoded = 0
+        self.decoded = 0
+
+    def encode(self, value):
+        self.encoded += 1
+        return super().encode(value)
+
+    def decode(self, value):
+        self.decoded += 1
+        return super().decode(value)
+
+
+class TestCodecs:
+    @pytest.mark.parametrize("codec_class", [JsonCodec, OrjsonCodec, MsgspecCodec])
+    def test_round_trip(self, codec_class):
+        try:
+            codec = codec_class()
+        except ImportError:
+            pytest.skip(f"{codec_class.__name__} is not available")
+
+        assert codec.decode(codec.encode(VALUE)) == VALUE
+
+    def test_raw_codec_passes_json_text_through(self):
+        codec = RawCodec()
+
+        assert codec.decode('{"a": 1}') == '{"a": 1}'
+        assert codec.encode('{"a": 1}') == '{"a": 1}'
+        assert codec.encode(b'{"a": 1}') == '{"a": 1}'
+        assert codec.encode({"a": 1}) == '{"a": 1}'
+
+    @pytest.mark.parametrize("codec_class", [JsonCodec, OrjsonCodec, MsgspecCodec])
+    def test_non_string_keys_are_converted_to_strings(self, codec_class):
+        try:
+            codec = codec_class()
+        except ImportError:
+            pytest.skip(f"{codec_class.__name__} is not available")
+
+        assert codec.decode(codec.encode({1: "a"})) == {"1": "a"}
+
+    def test_default_codec_is_json(self):
+        assert type(default_codec()) is JsonCodec
+
+    def test_base_codec_is_abstract(self):
+        with pytest.raises(TypeError):
+            Codec()
+
+
+class TestClientCodec:
+    def test_client_uses_default_codec(self, client):
+        assert isinstance(client.codec, type(default_codec()))
+
+    def test_default_codec_stores_non_string_keys_as_strings(self, client):
+        client.write("testStream-123", "Event1", {1: "a"})
+
+        assert client.read_last_message("testStream-123")["data"] == {"1": "a"}
+
+    def test_custom_codec_is_used_for_writes_and_reads(self):
+        codec = CountingCodec()
+        store = MessageDB.from_url(CONNECT_URL, codec=codec)
+
+        store.write("testStream-123", "Event1", {"foo": "bar"}, {"trace_id": "t"})
+        store.write_batch("testStream-123", [("Event2", {"foo": "baz"})])
+        messages = store.read_stream("testStream-123")
+
+        assert codec.encoded == 3
+        assert codec.decoded == 3
+        assert messages[0]["metadata"] == {"trace_id": "t"}
+
+    def test_raw_codec_returns_json_text(self):
+        store = MessageDB.from_url(CONNECT_URL, codec=RawCodec())
+
+        store.write("testStream-123", "Event1", '{"foo": "bar"}')
+        message = store.read_last_message("testStream-123")
+
+        assert message["data"] == '{"foo": "bar"}'
+        assert message["metadata"] is None
+
+    def test_subscription_with_raw_codec_loads_position(self):
+        store = MessageDB.from_url(CONNECT_URL, codec=RawCodec())
+        store.write("testStream:position-testSubscriber", "Recorded", {"position": 7})
+
+        subscription = Subscription(store, "testStream", print, "testSubscriber")
+
+        assert subscription.load_position() == 7
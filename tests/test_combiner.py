@@ -0,0 +1,219 @@
+import threading
+
+import pytest
+from psycopg2.pool import PoolError
+
+from message_db.client import MessageDB
+from message_db.combiner import WriteCombiner
+
+CONNECT_URL = "postgresql://message_store@localhost:5432/message_store"
+
+
+@pytest.fixture
+def combining_client():
+    client = MessageDB.from_url(CONNECT_URL, combine_writes=True)
+    client.write_combiner = WriteCombiner(client, max_delay=0.05, max_batch_size=10)
+    yield client
+
+    client.connection_pool.closeall()
+
+
+@pytest.fixture
+def checkouts(combining_client, monkeypatch):
+    """Count the connections checked out of the pool."""
+    calls = []
+    get_connection = combining_client.connection_pool.get_connection
+
+    def counting_get_connection():
+        calls.append(1)
+        return get_connection()
+
+    monkeypatch.setattr(
+        combining_client.connection_pool, "get_connection", counting_get_connection
+    )
+    return calls
+
+
+@pytest.fixture
+def combining_clients():
+    clients = [MessageDB.from_url(CONNECT_URL, combine_writes=True) for _ in range(2)]
+    for client in clients:
+        client.write_combiner = WriteCombiner(
+            client, max_delay=0.005, max_batch_size=10
+        )
+    yield clients
+
+    for client in clients:
+        client.connection_pool.closeall()
+
+
+@pytest.fixture
+def fallbacks(monkeypatch):
+    """Record the size of the batches written one by one."""
+    sizes = []
+    write_one_by_one = WriteCombiner._write_one_by_one
+
+    def recording_write_one_by_one(combiner, conn, batch):
+        sizes.append(len(batch))
+        write_one_by_one(combiner, conn, batch)
+
+    monkeypatch.setattr(WriteCombiner, "_write_one_by_one", recording_write_one_by_one)
+    return sizes
+
+
+def write_concurrently(client, writes):
+    """Run each write in its own thread, and return positions or errors in order."""
+    results = [None] * len(writes)
+    barrier = threading.Barrier(len(writes))
+
+    def run(index, args, kwargs):
+        barrier.wait()
+        try:
+            results[index] = client.write(*args, **kwargs)
+        except (ValueError, PoolError) as exc:
+            results[index] = exc
+
+    threads = [
+        threading.Thread(target=run, args=(index, args, kwargs))
+        for index, (args, kwargs) in enumerate(writes)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(timeout=10)
+
+    return results
+
+
+class TestWriteCombiner:
+    def test_invalid_parameters_raise_error(self, client):
+        with pytest.raises(ValueError) as exc:
+            WriteCombiner(client, max_delay=-1)
+        assert exc.value.args[0] == "max_delay must be >= 0, got -1"
+
+        with pytest.raises(ValueError) as exc:
+            WriteCombiner(client, max_batch_size=0)
+        assert exc.value.args[0] == "max_batch_size must be > 0, got 0"
+
+    def test_single_write(self, combining_client):
+        position = combining_client.write("testStream-1", "Event1", {"foo": "bar"})
+
+        assert position == 0
+        assert combining_client.read_last_message("testStream-1")["data"] == {
+            "foo": "bar"
+        }
+
+    def test_concurrent_writes_share_transactions(self, combining_client, checkouts):
+        writes = [
+            ((f"testStream-{index}", "Event1", {"index": index}), {})
+            for index in range(10)
+        ]
+
+        results = write_concurrently(combining_client, writes)
+
+        assert results == [0] * 10
+        assert len(checkouts) < 10
+        for index in range(10):
+            messages = combining_client.read_stream(f"testStream-{index}")
+            assert [message["data"] for message in messages] == [{"index": index}]
+
+    def test_conflicting_write_fails_alone(self, combining_client):
+        combining_client.write("testStream-0", "Event1", {"foo": "bar"})
+        writes = [
+            ((f"testStream-{index}", "Event1", {"index": index}), {})
+            for index in range(1, 6)
+        ]
+        writes.append(
+            (("testStream-0", "Event1", {"foo": "bar"}), {"expected_version": 5})
+        )
+
+        results = write_concurrently(combining_client, writes)
+
+        assert results[:5] == [0] * 5
+        assert isinstance(results[5], ValueError)
+        assert "Wrong expected version: 5" in str(results[5])
+        assert len(combining_client.read_stream("testStream-0")) == 1
+
+    def test_writes_to_the_same_stream_are_ordered(self, combining_client):
+        writes = [(("testStream-1", "Event1", {"foo": "bar"}), {}) for _ in range(10)]
+
+        results = write_concurrently(combining_client, writes)
+
+        assert sorted(results) == list(range(10))
+        positions = [
+            message["position"]
+            for message in combining_client.read_stream("testStream-1")
+        ]
+        assert positions == list(range(10))
+
+    def test_batches_are_bounded(self, combining_client, checkouts):
+        writes = [
+            ((f"testStream-{index}", "Event1", {"index": index}), {})
+            for index in range(25)
+        ]
+
+        results = write_concurrently(combining_client, writes)
+
+        assert results == [0] * 25
+        assert len(checkouts) >= 3
+
+    def test_without_delay(self, combining_client):
+        combining_client.write_combiner = WriteCombiner(combining_client, max_delay=0)
+        writes = [
+            ((f"testStream-{index}", "Event1", {"index": index}), {})
+            for index in range(5)
+        ]
+
+        assert write_concurrently(combining_client, writes) == [0] * 5
+
+    def test_every_caller_is_released_when_checkout_fails(
+        self, combining_client, monkeypatch
+    ):
+        def exhausted():
+            raise PoolError("connection pool exhausted")
+
+        monkeypatch.setattr(
+            combining_client.connection_pool, "get_connection", exhausted
+        )
+        writes = [
+            ((f"testStream-{index}", "Event1", {"index": index}), {})
+            for index in range(5)
+        ]
+
+        results = write_concurrently(combining_client, writes)
+
+        assert all(isinstance(result, PoolError) for result in results)
+
+    def test_combining_clients_do_not_deadlock(self, combining_clients, fallbacks):
+        categories = [f"testCategory{index}" for index in range(4)]
+        barrier = threading.Barrier(16)
+        errors = []
+
+        def run(client, order):
+            barrier.wait()
+            try:
+                for index in range(20):
+                    category = order[index % len(order)]
+                    client.write(f"{category}-1", "Event1", {"index": index})
+            except Exception as exc:
+                errors.append(exc)
+
+        # The clients write to the categories in opposite orders
+        threads = []
+        for index in range(16):
+            order = categories if index % 2 == 0 else categories[::-1]
+            shift = index // 2 % len(order)
+            threads.append(
+                threading.Thread(
+                    target=run,
+                    args=(combining_clients[index % 2], order[shift:] + order[:shift]),
+                )
+            )
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join(timeout=60)
+
+        assert errors == []
+        # A deadlock makes the batch fall back to one-by-one writes
+        assert fallbacks == []
@@ -1,13 +1,15 @@
 import concurrent.futures
 import threading
+import time
 from unittest.mock import patch
 
+import psycopg2
 import pytest
 from psycopg2 import OperationalError, ProgrammingError
 from psycopg2.extensions import TRANSACTION_STATUS_ACTIVE
 from psycopg2.pool import PoolError, ThreadedConnectionPool
 
-from message_db.connection import ConnectionPool
+from message_db.connection import ConnectionPool, PoolTimeout
 
 CONNECT_URL = "postgresql://message_store@localhost:5432/message_store"
 
@@ -138,3 +140,211 @@ def test_concurrent_get_and_release():
 
     pool.closeall()
     assert errors == [], f"Errors during concurrent access: {errors}"
+
+
+def terminate(conn):
+    """Terminate the server process of *conn*, as a failover or idle timeout would."""
+    admin = psycopg2.connect(
+        dbname="message_store", user="postgres", port=5432, host="localhost"
+    )
+    admin.autocommit = True
+    with admin.cursor() as cursor:
+        cursor.execute("SELECT pg_terminate_backend(%s)", (conn.info.backend_pid,))
+    admin.close()
+
+
+def test_error_on_invalid_min_connections():
+    with pytest.raises(ValueError) as exc:
+        ConnectionPool(CONNECT_URL, max_connections=2, min_connections=3)
+    assert (
+        exc.value.args[0]
+        == '"min_connections" must not be greater than "max_connections"'
+    )
+
+    with pytest.raises(ValueError) as exc:
+        ConnectionPool(CONNECT_URL, max_lifetime=0)
+    assert exc.value.args[0] == '"max_lifetime" must be a positive number of seconds'
+
+
+def test_min_connections_are_opened_upfront_and_kept():
+    pool = ConnectionPool(CONNECT_URL, max_connections=10, min_connections=3)
+    assert len(pool._connection_pool._pool) == 3
+
+    connections = [pool.get_connection() for _ in range(5)]
+    for conn in connections:
+        pool.release(conn)
+
+    assert len(pool._connection_pool._pool) == 3
+    pool.closeall()
+
+
+def test_closed_connection_is_replaced():
+    pool = ConnectionPool(CONNECT_URL, max_connections=5)
+    conn = pool.get_connection()
+    pool.release(conn)
+    conn.close()
+
+    new_conn = pool.get_connection()
+
+    assert new_conn is not conn
+    assert not new_conn.closed
+    pool.release(new_conn)
+    pool.closeall()
+
+
+def test_pre_ping_replaces_dead_connection():
+    pool = ConnectionPool(CONNECT_URL, max_connections=5, pre_ping=True)
+    conn = pool.get_connection()
+    pool.release(conn)
+    terminate(conn)
+
+    new_conn = pool.get_connection()
+    with new_conn.cursor() as cursor:
+        cursor.execute("SELECT 1")
+        assert cursor.fetchone() == (1,)
+
+    assert new_conn is not conn
+    pool.release(new_conn)
+    pool.closeall()
+
+
+def test_dead_connection_is_handed_out_without_pre_ping():
+    pool = ConnectionPool(CONNECT_URL, max_connections=5)
+    conn = pool.get_connection()
+    pool.release(conn)
+    terminate(conn)
+
+    assert pool.get_connection() is conn
+    pool.closeall()
+
+
+def test_connections_are_recycled_after_max_lifetime():
+    pool = ConnectionPool(CONNECT_URL, max_connections=5, max_lifetime=0.1)
+    conn = pool.get_connection()
+    pool.release(conn)
+    assert pool.get_connection() is conn
+    pool.release(conn)
+
+    time.sleep(0.15)
+
+    new_conn = pool.get_connection()
+    assert new_conn is not conn
+    assert conn.closed
+    pool.release(new_conn)
+    pool.closeall()
+
+
+def test_expired_connection_is_closed_on_release():
+    pool = ConnectionPool(CONNECT_URL, max_connections=5, max_lifetime=0.1)
+    conn = pool.get_connection()
+
+    time.sleep(0.15)
+    pool.release(conn)
+
+    assert conn.closed
+
+
+def test_prune_replaces_idle_connections():
+    pool = ConnectionPool(
+        CONNECT_URL, max_connections=5, min_connections=2, max_idle=0.1
+    )
+    idle = list(pool._connection_pool._pool)
+
+    time.sleep(0.15)
+
+    assert pool.prune() == 2
+    assert all(conn.closed for conn in idle)
+    assert len(pool._connection_pool._pool) == 2
+    assert not any(conn in idle for conn in pool._connection_pool._pool)
+    pool.closeall()
+
+
+def test_error_on_negative_acquire_timeout():
+    with pytest.raises(ValueError) as exc:
+        ConnectionPool(CONNECT_URL, acquire_timeout=-1)
+    assert exc.value.args[0] == '"acquire_timeout" must not be negative'
+
+
+def test_acquire_timeout_waits_for_a_released_connection():
+    pool = ConnectionPool(CONNECT_URL, max_connections=1, acquire_timeout=5)
+    conn = pool.get_connection()
+    threading.Timer(0.1, pool.release, args=(conn,)).start()
+
+    started = time.monotonic()
+    assert pool.get_connection() is conn
+    assert time.monotonic() - started >= 0.05
+
+    stats = pool.stats()
+    assert stats["acquired"] == 2
+    assert stats["waited"] == 1
+    assert stats["wait_time"] > 0
+    assert stats["in_use"] == 1
+    pool.release(conn)
+    pool.closeall()
+
+
+def test_acquire_timeout_expires():
+    pool = ConnectionPool(CONNECT_URL, max_connections=1, acquire_timeout=0.1)
+    conn = pool.get_connection()
+
+    with pytest.raises(PoolTimeout) as exc:
+        pool.get_connection()
+
+    assert "Timed out after 0.1s waiting for a connection" in str(exc.value)
+    assert isinstance(exc.value, PoolError)
+    assert pool.stats()["timeouts"] == 1
+    assert pool.stats()["waiting"] == 0
+    pool.release(conn)
+    pool.closeall()
+
+
+def test_waiting_callers_are_served_in_arrival_order():
+    pool = ConnectionPool(CONNECT_URL, max_connections=1, acquire_timeout=5)
+    conn = pool.get_connection()
+    served = []
+
+    def worker(index):
+        acquired = pool.get_connection()
+        served.append(index)
+        time.sleep(0.01)
+        pool.release(acquired)
+
+    threads = []
+    for index in range(5):
+        thread = threading.Thread(target=worker, args=(index,))
+        thread.start()
+        threads.append(thread)
+        while pool.stats()["waiting"] < index + 1:
+            time.sleep(0.001)
+
+    pool.release(conn)
+    for thread in threads:
+        thread.join(timeout=5)
+
+    assert served == [0, 1, 2, 3, 4]
+    assert pool.stats()["waited"] == 5
+    pool.closeall()
+
+
+def test_load_spike_is_absorbed_by_waiting():
+    pool = ConnectionPool(CONNECT_URL, max_connections=2, acquire_timeout=5)
+    errors = []
+
+    def worker():
+        try:
+            conn = pool.get_connection()
+            with conn.cursor() as cursor:
+                cursor.execute("SELECT pg_sleep(0.01)")
+            conn.commit()
+            pool.release(conn)
+        except Exception as exc:
+            errors.append(exc)
+
+    with concurrent.futures.ThreadPoolExecutor(max_workers=16) as executor:
+        for _ in range(64):
+            executor.submit(worker)
+
+    assert errors == []
+    assert pool.stats()["acquired"] == 64
+    assert pool.stats()["in_use"] == 0
+    pool.closeall()
@@ -0,0 +1,152 @@
+import io
+import json
+
+import pytest
+
+from message_db.export import export, last_exported_position, main
+
+CONNECT_URL = "postgresql://message_store@localhost:5432/message_store"
+
+
+def exported(output):
+    return [json.loads(line) for line in output.getvalue().splitlines()]
+
+
+@pytest.fixture
+def messages(client):
+    client.write("testStream-1", "Event1", {"text": 'a "quoted", \\ multi\nline'})
+    client.write("testStream-2", "Event2", {"foo": "bar"}, {"meta": "data"})
+    client.write("otherStream-1", "Event1", {"foo": "baz"})
+    client.write("testStream-1", "Event3", {"foo": "qux"})
+
+
+@pytest.mark.usefixtures("messages")
+class TestExport:
+    def test_export_all_to_ndjson(self, client):
+        output = io.BytesIO()
+
+        assert client.export("$all", output) == 4
+
+        records = exported(output)
+        assert [record["global_position"] for record in records] == [1, 2, 3, 4]
+        assert list(records[0]) == [
+            "id",
+            "stream_name",
+            "type",
+            "position",
+            "global_position",
+            "data",
+            "metadata",
+            "time",
+        ]
+        assert records[0]["data"] == {"text": 'a "quoted", \\ multi\nline'}
+        assert records[0]["metadata"] is None
+        assert records[1]["metadata"] == {"meta": "data"}
+
+    def test_export_category(self, client):
+        output = io.BytesIO()
+
+        assert client.export("testStream", output) == 4
+
+        assert [
+            (record["stream_name"], record["position"]) for record in exported(output)
+        ] == [("testStream-1", 0), ("testStream-2", 0), ("testStream-1", 1)]
+
+    def test_export_stream(self, client):
+        output = io.BytesIO()
+
+        assert client.export("testStream-1", output) == 4
+
+        assert [record["type"] for record in exported(output)] == ["Event1", "Event3"]
+
+    def test_export_between_global_positions(self, client):
+        output = io.BytesIO()
+
+        assert client.export("$all", output, after=1, until=3) == 3
+
+        assert [record["global_position"] for record in exported(output)] == [2, 3]
+
+    def test_export_without_messages_returns_after(self, client):
+        output = io.BytesIO()
+
+        assert client.export("testStream", output, after=4) == 4
+        assert output.getvalue() == b""
+
+    def test_resume_export(self, client):
+        output = io.BytesIO()
+        last_position = client.export("testStream", output)
+
+        client.write("testStream-2", "Event4", {"foo": "bar"})
+        client.export("testStream", output, after=last_position)
+
+        assert [record["global_position"] for record in exported(output)] == [
+            1,
+            2,
+            4,
+            5,
+        ]
+
+    def test_unknown_format_raises_error(self, client):
+        with pytest.raises(ValueError) as exc:
+            client.export("$all", io.BytesIO(), format="csv")
+
+        assert exc.value.args[0].startswith("Unknown export format 'csv'")
+
+    def test_connection_is_restored_after_export(self, pool):
+        conn = pool.get_connection()
+        try:
+            export(conn, "$all", io.BytesIO())
+
+            assert conn.isolation_level is None
+            assert conn.info.transaction_status == 0
+        finally:
+            pool.release(conn)
+
+    @pytest.mark.parametrize("format", ["parquet", "arrow"])
+    def test_export_to_columnar_formats(self, client, format):
+        pyarrow = pytest.importorskip("pyarrow")
+        import pyarrow.ipc
+        import pyarrow.parquet
+
+        output = io.BytesIO()
+        assert client.export("testStream", output, format=format) == 4
+
+        output.seek(0)
+        if format == "parquet":
+            table = pyarrow.parquet.read_table(output)
+        else:
+            table = pyarrow.ipc.open_file(output).read_all()
+
+        rows = table.to_pylist()
+        assert [row["global_position"] for row in rows] == [1, 2, 4]
+        assert json.loads(rows[0]["data"]) == {"text": 'a "quoted", \\ multi\nline'}
+        assert rows[0]["metadata"] is None
+        assert json.loads(rows[1]["metadata"]) == {"meta": "data"}
+
+
+class TestExportCommand:
+    @pytest.mark.usefixtures("messages")
+    def test_export_and_resume(self, client, tmp_path, capsys):
+        path = str(tmp_path / "testStream.ndjson")
+
+        main([CONNECT_URL, "testStream", path])
+        assert capsys.readouterr().out == "4\n"
+        assert last_exported_position(path) == 4
+
+        client.write("testStream-2", "Event4", {"foo": "bar"})
+        main([CONNECT_URL, "testStream", path, "--resume"])
+        assert capsys.readouterr().out == "5\n"
+
+        with open(path) as file:
+            records = [json.loads(line) for line in file]
+        assert [record["global_position"] for record in records] == [1, 2, 4, 5]
+
+    def test_last_exported_position_of_empty_file(self, tmp_path):
+        path = tmp_path / "empty.ndjson"
+        path.write_bytes(b"")
+
+        assert last_exported_position(str(path)) is None
+
+    def test_format_must_be_known(self, tmp_path):
+        with pytest.raises(SystemExit):
+            main([CONNECT_URL, "$all", str(tmp_path / "export.csv")])
@@ -0,0 +1,170 @@
+import pytest
+
+from message_db.client import MessageDB
+from message_db.connection import ConnectionPool
+from message_db.instrumentation import Instrumentation
+
+CONNECT_URL = "postgresql://message_store@localhost:5432/message_store"
+
+
+class RecordingInstrumentation(Instrumentation):
+    def __init__(self):
+        self.operations = []
+        self.conflicts = []
+        self.acquisitions = []
+
+    def operation_completed(self, metrics):
+        self.operations.append(metrics)
+
+    def version_conflict(self, stream_name, actual_version):
+        self.conflicts.append((stream_name, actual_version))
+
+    def connection_acquired(self, pool, wait_time):
+        self.acquisitions.append((pool, wait_time))
+
+
+@pytest.fixture
+def instrumentation():
+    return RecordingInstrumentation()
+
+
+@pytest.fixture
+def instrumented_client(instrumentation):
+    client = MessageDB.from_url(CONNECT_URL, instrumentation=instrumentation)
+    yield client
+
+    client.connection_pool.closeall()
+
+
+class TestInstrumentation:
+    def test_client_is_not_instrumented_by_default(self, client):
+        assert client.instrumentation is None
+        assert client.connection_pool.instrumentation is None
+        assert client._timer("write") is None
+
+    def test_write_phases(self, instrumented_client, instrumentation):
+        instrumented_client.write("testStream-123", "Event1", {"foo": "bar"})
+
+        [metrics] = instrumentation.operations
+        assert metrics.operation == "write"
+        assert list(metrics.phases) == ["checkout", "execute", "commit"]
+        assert metrics.duration == pytest.approx(sum(metrics.phases.values()))
+
+    def test_write_batch_phases(self, instrumented_client, instrumentation):
+        instrumented_client.write_batch("testStream-123", [("Event1", {"foo": "bar"})])
+
+        [metrics] = instrumentation.operations
+        assert metrics.operation == "write_batch"
+        assert list(metrics.phases) == ["checkout", "execute", "commit"]
+
+    def test_read_phases_rows_and_bytes(self, instrumented_client, instrumentation):
+        instrumented_client.write("testStream-123", "Event1", {"foo": "bar"})
+        instrumented_client.write(
+            "testStream-123", "Event1", {"foo": "bar"}, metadata={"a": 1}
+        )
+        instrumentation.operations.clear()
+
+        instrumented_client.read_stream("testStream-123")
+
+        [metrics] = instrumentation.operations
+        assert metrics.operation == "read_stream"
+        assert list(metrics.phases) == ["checkout", "execute", "fetch", "decode"]
+        assert metrics.rows == 2
+        assert metrics.bytes_decoded == 2 * len('{"foo": "bar"}') + len('{"a": 1}')
+
+    def test_read_operation_names(self, instrumented_client, instrumentation):
+        instrumented_client.write("testStream-123", "Event1", {"foo": "bar"})
+        instrumentation.operations.clear()
+
+        instrumented_client.read_category("testStream")
+        instrumented_client.read("$all")
+        instrumented_client.read_all()
+        instrumented_client.read_streams(["testStream-123"])
+        instrumented_client.read_last_message("testStream-123")
+        instrumented_client.stream_version("testStream-123")
+
+        assert [metrics.operation for metrics in instrumentation.operations] == [
+            "read_category",
+            "read_all",
+            "read_all",
+            "read_streams",
+            "read_last_message",
+            "stream_version",
+        ]
+        assert all(metrics.rows == 1 for metrics in instrumentation.operations[:5])
+
+    def test_version_conflicts(self, instrumented_client, instrumentation):
+        instrumented_client.write("testStream-123", "Event1", {"foo": "bar"})
+
+        with pytest.raises(ValueError):
+            instrumented_client.write(
+                "testStream-123", "Event1", {"foo": "bar"}, expected_version=5
+            )
+
+        assert instrumentation.conflicts == [("testStream-123", 0)]
+        assert [metrics.operation for metrics in instrumentation.operations] == [
+            "write"
+        ]
+
+    def test_combined_write_phase(self, instrumentation):
+        client = MessageDB.from_url(
+            CONNECT_URL, instrumentation=instrumentation, combine_writes=True
+        )
+        try:
+            client.write("testStream-123", "Event1", {"foo": "bar"})
+        finally:
+            client.connection_pool.closeall()
+
+        [metrics] = instrumentation.operations
+        assert list(metrics.phases) == ["combine"]
+
+    def test_pool_reports_connection_checkouts(self, instrumentation):
+        pool = ConnectionPool(CONNECT_URL, instrumentation=instrumentation)
+        try:
+            conn = pool.get_connection()
+            pool.release(conn)
+        finally:
+            pool.closeall()
+
+        [(acquired_from, wait_time)] = instrumentation.acquisitions
+        assert acquired_from is pool
+        assert wait_time >= 0
+
+
+class TestPrometheusInstrumentation:
+    def test_metrics(self):
+        prometheus_client = pytest.importorskip("prometheus_client")
+        from message_db.instrumentation import PrometheusInstrumentation
+
+        registry = prometheus_client.CollectorRegistry()
+        instrumentation = PrometheusInstrumentation(registry=registry)
+        client = MessageDB.from_url(CONNECT_URL, instrumentation=instrumentation)
+        instrumentation.track_pool(client.connection_pool)
+        try:
+            client.write("testStream-123", "Event1", {"foo": "bar"})
+            client.read_stream("testStream-123")
+            with pytest.raises(ValueError):
+                client.write(
+                    "testStream-123", "Event1", {"foo": "bar"}, expected_version=5
+                )
+
+            def value(name, **labels):
+                return registry.get_sample_value(name, labels)
+
+            assert (
+                value(
+                    "message_db_operation_seconds_count",
+                    operation="write",
+                    phase="execute",
+                )
+                == 1
+            )
+            assert value("message_db_rows_total", operation="read_stream") == 1
+            assert value("message_db_decoded_bytes_total", operation="read_stream") > 0
+            assert value("message_db_version_conflicts_total") == 1
+            assert value("message_db_pool_wait_seconds_count") == 3
+            assert (
+                value("message_db_pool_connections", pool="default", state="idle") == 1
+            )
+        finally:
+            client.connection_pool.closeall()
@@ -0,0 +1,99 @@
+import pytest
+
+
+class TestIterRead:
+    def test_iterates_over_all_stream_messages_across_pages(self, client):
+        client.write_batch(
+            "testStream-123", [("Event1", {"index": index}) for index in range(25)]
+        )
+
+        messages = list(client.iter_read("testStream-123", batch_size=10, itersize=3))
+
+        assert [message["position"] for message in messages] == list(range(25))
+        assert messages[24]["data"] == {"index": 24}
+
+    def test_iterates_from_position(self, client):
+        client.write_batch(
+            "testStream-123", [("Event1", {"index": index}) for index in range(5)]
+        )
+
+        messages = list(client.iter_read("testStream-123", position=3))
+
+        assert [message["position"] for message in messages] == [3, 4]
+
+    def test_iterates_over_empty_stream(self, client):
+        assert list(client.iter_read("emptyStream-123")) == []
+
+    def test_iterates_over_page_sized_stream(self, client):
+        client.write_batch(
+            "testStream-123", [("Event1", {"index": index}) for index in range(10)]
+        )
+
+        messages = list(client.iter_read("testStream-123", batch_size=5))
+
+        assert len(messages) == 10
+
+    def test_early_exit_releases_connection(self, client):
+        client.write_batch(
+            "testStream-123", [("Event1", {"index": index}) for index in range(10)]
+        )
+        used_count = len(client.connection_pool._connection_pool._used)
+
+        iterator = client.iter_read("testStream-123", batch_size=4, itersize=2)
+        next(iterator)
+        assert len(client.connection_pool._connection_pool._used) == used_count + 1
+
+        iterator.close()
+        assert len(client.connection_pool._connection_pool._used) == used_count
+
+
+class TestIterCategory:
+    def test_reading_a_stream_throws_error(self, client):
+        with pytest.raises(ValueError) as exc:
+            client.iter_category("testStream-123")
+
+        assert exc.value.args[0] == "testStream-123 is not a category"
+
+    def test_iterates_over_category_across_pages(self, client):
+        for index in range(12):
+            client.write(f"testStream-{index % 3}", "Event1", {"index": index})
+
+        messages = list(client.iter_category("testStream", batch_size=5, itersize=2))
+
+        assert [message["data"]["index"] for message in messages] == list(range(12))
+
+    def test_iterates_with_consumer_group(self, client):
+        for index in range(10):
+            client.write(f"testStream-{index}", "Event1", {"index": index})
+
+        messages = [
+            list(
+                client.iter_category(
+                    "testStream",
+                    batch_size=2,
+                    consumer_group_member=member,
+                    consumer_group_size=3,
+                )
+            )
+            for member in range(3)
+        ]
+
+        assert sum(len(member_messages) for member_messages in messages) == 10
+
+
+class TestIterAll:
+    def test_iterates_over_all_messages_in_order(self, client):
+        for index in range(7):
+            client.write(f"stream{index % 2}-123", "Event1", {"index": index})
+
+        messages = list(client.iter_all(batch_size=3))
+
+        assert [message["global_position"] for message in messages] == list(range(1, 8))
+
+    def test_iterates_after_position(self, client):
+        for index in range(5):
+            client.write("testStream-123", "Event1", {"index": index})
+
+        messages = list(client.iter_all(position=3))
+
+        assert [message["global_position"] for message in messages] == [4, 5]
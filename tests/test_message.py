@@ -0,0 +1,117 @@
+import pytest
+
+from message_db.client import MessageDB
+from message_db.message import Message
+from message_db.subscription import Subscription
+
+from .test_codec import CountingCodec
+
+CONNECT_URL = "postgresql://message_store@localhost:5432/message_store"
+
+
+@pytest.fixture
+def codec():
+    return CountingCodec()
+
+
+@pytest.fixture
+def lazy_client(codec):
+    client = MessageDB.from_url(CONNECT_URL, codec=codec, lazy_decoding=True)
+    yield client
+
+    client.connection_pool.closeall()
+
+
+class TestMessage:
+    def test_fields_are_decoded_on_first_access_only(self, codec):
+        message = Message(
+            "id",
+            "testStream-123",
+            "Event1",
+            0,
+            1,
+            '{"foo": "bar"}',
+            '{"meta": "data"}',
+            None,
+            codec,
+        )
+        assert codec.decoded == 0
+
+        assert message.data == {"foo": "bar"}
+        assert message.data == {"foo": "bar"}
+        assert codec.decoded == 1
+
+        assert message.metadata == {"meta": "data"}
+        assert codec.decoded == 2
+
+    def test_missing_metadata_is_none(self, codec):
+        message = Message(
+            "id", "testStream-123", "Event1", 0, 1, '{"foo": "bar"}', None, None, codec
+        )
+
+        assert message.metadata is None
+        assert codec.decoded == 0
+
+    def test_item_access(self, codec):
+        message = Message(
+            "id", "testStream-123", "Event1", 0, 1, '{"foo": "bar"}', None, None, codec
+        )
+
+        assert message["type"] == "Event1"
+        assert message["data"] == {"foo": "bar"}
+        with pytest.raises(KeyError):
+            message["_raw_data"]
+
+    def test_messages_have_no_instance_dict(self, codec):
+        message = Message(
+            "id", "testStream-123", "Event1", 0, 1, "{}", None, None, codec
+        )
+
+        with pytest.raises(AttributeError):
+            message.extra = "value"
+
+
+class TestLazyDecodingClient:
+    def test_read_returns_undecoded_messages(self, lazy_client, codec):
+        lazy_client.write("testStream-123", "Event1", {"foo": "bar"}, {"meta": "data"})
+        codec.decoded = 0
+
+        messages = lazy_client.read("testStream-123")
+
+        assert isinstance(messages[0], Message)
+        assert messages[0].type == "Event1"
+        assert codec.decoded == 0
+        assert messages[0].data == {"foo": "bar"}
+        assert codec.decoded == 1
+
+    def test_to_dict_matches_eager_decoding(self, client, lazy_client):
+        client.write("testStream-123", "Event1", {"foo": "bar"}, {"meta": "data"})
+
+        lazy = lazy_client.read_last_message("testStream-123")
+
+        assert lazy.to_dict() == client.read_last_message("testStream-123")
+
+    def test_iterators_return_messages(self, lazy_client):
+        lazy_client.write_batch("testStream-123", [("Event1", {"index": 0}, None)] * 3)
+
+        messages = list(lazy_client.iter_read("testStream-123", batch_size=2))
+
+        assert len(messages) == 3
+        assert all(isinstance(message, Message) for message in messages)
+
+    def test_subscription_with_lazy_messages(self, lazy_client):
+        lazy_client.write("testStream-123", "Event1", {"foo": "bar"})
+        received = []
+        subscription = Subscription(
+            lazy_client,
+            "testStream",
+            lambda message: received.append(message.data),
+            "testSubscriber",
+        )
+
+        subscription.load_position()
+        subscription.poll()
+        subscription.record_position()
+
+        assert received == [{"foo": "bar"}]
+        assert subscription.load_position() == 1
@@ -0,0 +1,160 @@
+from message_db.message import MessageBatch
+from message_db.notifications import consumer_group_member
+from message_db.subscription import Subscription
+
+
+def write_mixed(client, stream_name="testStream-123"):
+    """Write Event1, Event2, Event1, Event3 to *stream_name*."""
+    for message_type in ["Event1", "Event2", "Event1", "Event3"]:
+        client.write(stream_name, message_type, {"type": message_type})
+
+
+class TestFilteredReads:
+    def test_read_stream_returns_only_matching_types(self, client):
+        write_mixed(client)
+
+        messages = client.read_stream("testStream-123", message_types=["Event1"])
+
+        assert isinstance(messages, MessageBatch)
+        assert [message["position"] for message in messages] == [0, 2]
+        assert messages.scanned == 4
+        assert messages.last_position == 3
+
+    def test_read_category_returns_only_matching_types(self, client):
+        write_mixed(client)
+
+        messages = client.read_category(
+            "testStream", message_types=["Event2", "Event3"]
+        )
+
+        assert [message["type"] for message in messages] == ["Event2", "Event3"]
+        assert messages.last_position == 4
+
+    def test_filtered_messages_match_unfiltered_messages(self, client):
+        write_mixed(client)
+
+        filtered = client.read_category("testStream", message_types=["Event2"])
+        unfiltered = client.read_category("testStream")
+
+        assert filtered == [unfiltered[1]]
+
+    def test_last_position_is_reported_when_nothing_matches(self, client):
+        write_mixed(client)
+
+        messages = client.read_category(
+            "testStream", no_of_messages=2, message_types=["Unknown"]
+        )
+
+        assert messages == []
+        assert messages.scanned == 2
+        assert messages.last_position == 2
+
+    def test_empty_read_has_no_last_position(self, client):
+        messages = client.read_category("testStream", message_types=["Event1"])
+
+        assert messages == []
+        assert messages.scanned == 0
+        assert messages.last_position is None
+
+    def test_readers_advance_past_filtered_messages(self, client):
+        write_mixed(client)
+
+        first = client.read_category(
+            "testStream", no_of_messages=2, message_types=["Event3"]
+        )
+        second = client.read_category(
+            "testStream",
+            position=first.last_position + 1,
+            no_of_messages=2,
+            message_types=["Event3"],
+        )
+
+        assert first == []
+        assert [message["global_position"] for message in second] == [4]
+
+    def test_read_all_with_message_types(self, client):
+        write_mixed(client)
+        client.write("otherStream-1", "Event1", {"type": "Event1"})
+
+        messages = client.read("$all", position=1, message_types=["Event1"])
+
+        assert [message["global_position"] for message in messages] == [3, 5]
+
+    def test_consumer_group_with_message_types(self, client):
+        for index in range(10):
+            write_mixed(client, f"testStream-{index}")
+
+        for member in range(2):
+            messages = client.read_category(
+                "testStream",
+                consumer_group_member=member,
+                consumer_group_size=2,
+                message_types=["Event3"],
+            )
+            expected = [
+                message
+                for message in client.read_category(
+                    "testStream", consumer_group_member=member, consumer_group_size=2
+                )
+                if message["type"] == "Event3"
+            ]
+
+            assert messages == expected
+            assert all(
+                consumer_group_member(message["stream_name"], 2) == member
+                for message in messages
+            )
+
+
+class TestFilteredIterators:
+    def test_iter_category_pages_past_filtered_messages(self, client):
+        for _ in range(5):
+            write_mixed(client)
+
+        messages = list(
+            client.iter_category("testStream", batch_size=3, message_types=["Event3"])
+        )
+
+        assert [message["global_position"] for message in messages] == [
+            4,
+            8,
+            12,
+            16,
+            20,
+        ]
+
+    def test_iter_read_stream_with_message_types(self, client):
+        for _ in range(3):
+            write_mixed(client)
+
+        messages = list(
+            client.iter_read("testStream-123", batch_size=2, message_types=["Event1"])
+        )
+
+        assert [message["position"] for message in messages] == [0, 2, 4, 6, 8, 10]
+
+    def test_iter_all_with_message_types(self, client):
+        write_mixed(client)
+
+        messages = list(client.iter_all(batch_size=1, message_types=["Event2"]))
+
+        assert [message["global_position"] for message in messages] == [2]
+
+
+class TestSubscriptionWithMessageTypes:
+    def test_subscription_dispatches_matching_messages_and_advances(self, client):
+        write_mixed(client)
+        received = []
+        subscription = Subscription(
+            client,
+            "testStream",
+            lambda message: received.append(message["type"]),
+            "testSubscriber",
+            message_types=["Event2"],
+        )
+
+        subscription.load_position()
+        subscription.poll()
+
+        assert received == ["Event2"]
+        assert subscription.position == 4
@@ -0,0 +1,129 @@
+import threading
+import time
+
+import psycopg2
+import pytest
+
+from message_db.migrations import install_notifications, uninstall_notifications
+from message_db.notifications import (
+    NotificationListener,
+    consumer_group_member,
+    hash_64,
+)
+from message_db.subscription import Subscription
+
+CONNECT_URL = "postgresql://message_store@localhost:5432/message_store"
+
+
+@pytest.fixture
+def admin_connection():
+    conn = psycopg2.connect(
+        dbname="message_store", user="postgres", port=5432, host="localhost"
+    )
+    yield conn
+    conn.close()
+
+
+@pytest.fixture
+def listener(admin_connection):
+    install_notifications(admin_connection)
+    listener = NotificationListener.from_url(CONNECT_URL)
+    listener.start()
+
+    yield listener
+
+    listener.stop()
+    uninstall_notifications(admin_connection)
+
+
+class TestHashing:
+    @pytest.mark.parametrize("value", ["123", "abc", "stream-7", "x" * 40])
+    def test_hash_64_matches_message_db(self, admin_connection, value):
+        with admin_connection.cursor() as cursor:
+            cursor.execute("SELECT message_store.hash_64(%s)", (value,))
+            assert hash_64(value) == cursor.fetchone()[0]
+
+    def test_consumer_group_member_matches_category_reads(self, client):
+        for index in range(10):
+            client.write(f"testStream-{index}+part", "Event1", {"index": index})
+
+        for member in range(3):
+            messages = client.read_category(
+                "testStream", consumer_group_member=member, consumer_group_size=3
+            )
+            assert all(
+                consumer_group_member(message["stream_name"], 3) == member
+                for message in messages
+            )
+
+
+class TestNotificationListener:
+    def test_write_sets_category_event(self, client, listener):
+        event = listener.subscribe("testStream")
+        other = listener.subscribe("otherStream")
+
+        client.write("testStream-123", "Event1", {"foo": "bar"})
+
+        assert event.wait(timeout=5)
+        assert not other.is_set()
+
+    def test_write_only_wakes_the_consumer_group_member_of_the_stream(
+        self, client, listener
+    ):
+        member = consumer_group_member("testStream-123", 2)
+        owner = listener.subscribe("testStream", member, 2)
+        other = listener.subscribe("testStream", 1 - member, 2)
+
+        client.write("testStream-123", "Event1", {"foo": "bar"})
+
+        assert owner.wait(timeout=5)
+        assert not other.is_set()
+
+    def test_unsubscribed_event_is_not_set(self, listener):
+        event = listener.subscribe("testStream")
+        listener.unsubscribe("testStream", event)
+
+        listener.notify("testStream-123")
+
+        assert not event.is_set()
+
+    def test_uninstalled_trigger_sends_no_notifications(
+        self, client, listener, admin_connection
+    ):
+        uninstall_notifications(admin_connection)
+        event = listener.subscribe("testStream")
+
+        client.write("testStream-123", "Event1", {"foo": "bar"})
+
+        assert not event.wait(timeout=0.5)
+
+
+class TestSubscriptionWithListener:
+    def test_notification_ends_the_wait_early(self, client, listener):
+        received = []
+        subscription = Subscription(
+            client,
+            "testStream",
+            lambda message: received.append(time.monotonic()),
+            "testSubscriber",
+            poll_interval=30,
+            max_poll_interval=30,
+            listener=listener,
+        )
+        thread = threading.Thread(target=subscription.start)
+        thread.start()
+
+        try:
+            time.sleep(0.2)  # Let the subscription start waiting
+            started = time.monotonic()
+            client.write("testStream-123", "Event1", {"foo": "bar"})
+
+            while not received and time.monotonic() - started < 5:
+                time.sleep(0.01)
+        finally:
+            subscription.stop()
+            thread.join(timeout=5)
+
+        assert len(received) == 1
+        assert received[0] - started < 2
+        assert not thread.is_alive()
@@ -0,0 +1,156 @@
+import pytest
+
+from message_db.client import PREPARED_STATEMENTS, MessageDB
+from message_db.prepared import PreparedStatement
+
+CONNECT_URL = "postgresql://message_store@localhost:5432/message_store"
+
+
+@pytest.fixture
+def prepared_client():
+    client = MessageDB.from_url(
+        CONNECT_URL, max_connections=1, prepared_statements=True
+    )
+    yield client
+
+    client.connection_pool.closeall()
+
+
+def prepared_names(client):
+    conn = client.connection_pool.get_connection()
+    try:
+        with conn.cursor() as cursor:
+            cursor.execute("SELECT name FROM pg_prepared_statements")
+            names = {row[0] for row in cursor.fetchall()}
+        conn.commit()
+    finally:
+        client.connection_pool.release(conn)
+    return names
+
+
+def deallocate(client, name="ALL"):
+    conn = client.connection_pool.get_connection()
+    try:
+        with conn.cursor() as cursor:
+            cursor.execute(f"DEALLOCATE {name}")
+        conn.commit()
+    finally:
+        client.connection_pool.release(conn)
+
+
+class TestPreparedStatement:
+    def test_placeholders_become_positional_parameters(self):
+        statement = PreparedStatement(
+            "test_statement",
+            "SELECT %(a)s::bigint + %(b)s + %(a)s;",
+            {"a": "bigint", "b": "integer"},
+        )
+
+        assert statement.parameters == ("a", "b")
+        assert statement.prepare_sql == (
+            "PREPARE test_statement (bigint, integer) AS SELECT $1::bigint + $2 + $1"
+        )
+        assert statement.execute_sql == "EXECUTE test_statement (%(a)s, %(b)s)"
+
+    def test_all_statement_parameters_have_types(self):
+        names = [statement.name for statement in PREPARED_STATEMENTS.values()]
+
+        assert len(set(names)) == len(names)
+        for statement in PREPARED_STATEMENTS.values():
+            assert "%(" not in statement.prepare_sql
+
+
+class TestPreparedStatements:
+    def test_statements_are_not_prepared_by_default(self, client):
+        client.write("testStream-123", "Event1", {"foo": "bar"})
+        client.read_stream("testStream-123")
+
+        assert prepared_names(client) == set()
+
+    def test_statements_are_prepared_once_per_connection(self, prepared_client):
+        for i in range(3):
+            prepared_client.write("testStream-123", "Event1", {"foo": i})
+            prepared_client.read_category("testStream")
+
+        assert prepared_names(prepared_client) == {
+            "message_db_write_message",
+            "message_db_category_messages",
+        }
+
+    def test_stream_reads_are_not_prepared(self, prepared_client):
+        prepared_client.write("testStream-123", "Event1", {"foo": "bar"})
+
+        assert len(prepared_client.read_stream("testStream-123")) == 1
+        assert prepared_names(prepared_client) == {"message_db_write_message"}
+
+    def test_prepared_reads_and_writes(self, prepared_client):
+        prepared_client.write("testStream-123", "Event1", {"foo": "bar"})
+        prepared_client.write(
+            "testStream-123",
+            "Event2",
+            {"foo": "baz"},
+            metadata={"meta": "data"},
+            expected_version=0,
+        )
+
+        messages = prepared_client.read_stream("testStream-123")
+        assert [message["data"] for message in messages] == [
+            {"foo": "bar"},
+            {"foo": "baz"},
+        ]
+        assert messages[1]["metadata"] == {"meta": "data"}
+
+        assert len(prepared_client.read_category("testStream")) == 2
+        assert len(prepared_client.read("$all")) == 2
+        assert (
+            len(
+                prepared_client.read_category(
+                    "testStream", consumer_group_member=0, consumer_group_size=1
+                )
+            )
+            == 2
+        )
+        assert prepared_client.read_last_message("testStream-123")["type"] == "Event2"
+        assert prepared_client.stream_version("testStream-123") == 1
+        assert prepared_client.stream_version("testStream-456") == -1
+
+    def test_wrong_expected_version_with_prepared_write(self, prepared_client):
+        prepared_client.write("testStream-123", "Event1", {"foo": "bar"})
+
+        with pytest.raises(ValueError) as exc:
+            prepared_client.write(
+                "testStream-123", "Event1", {"foo": "bar"}, expected_version=5
+            )
+        assert "Wrong expected version: 5" in exc.value.args[0]
+
+        # The statement stays prepared after the failed transaction
+        assert prepared_client.write("testStream-123", "Event1", {"foo": "bar"}) == 1
+
+    def test_failed_first_execution_keeps_statement_prepared(self, prepared_client):
+        with pytest.raises(ValueError):
+            prepared_client.write(
+                "testStream-123", "Event1", {"foo": "bar"}, expected_version=5
+            )
+
+        assert prepared_client.write("testStream-123", "Event1", {"foo": "bar"}) == 0
+
+    def test_statements_are_prepared_again_when_deallocated(self, prepared_client):
+        prepared_client.write("testStream-123", "Event1", {"foo": "bar"})
+        deallocate(prepared_client)
+
+        assert prepared_client.write("testStream-123", "Event1", {"foo": "bar"}) == 1
+        assert len(prepared_client.read_stream("testStream-123")) == 2
+
+    def test_single_deallocated_statement_is_prepared_again(self, prepared_client):
+        prepared_client.write("testStream-123", "Event1", {"foo": "bar"})
+        prepared_client.stream_version("testStream-123")
+        deallocate(prepared_client, "message_db_stream_version")
+
+        assert prepared_client.stream_version("testStream-123") == 0
+        assert prepared_client.read_last_message("testStream-123")["position"] == 0
+        assert prepared_client.write("testStream-123", "Event1", {"foo": "bar"}) == 1
+        assert prepared_names(prepared_client) == {
+            "message_db_write_message",
+            "message_db_stream_version",
+            "message_db_last_stream_message",
+        }
@@ -1,3 +1,28 @@
+import threading
+import time
+
+import psycopg2
+import pytest
+
+CONNECT_URL = "postgresql://message_store@localhost:5432/message_store"
+
+
+@pytest.fixture
+def in_flight_write():
+    """Hold a write to another category in an open transaction."""
+    conn = psycopg2.connect(CONNECT_URL)
+    with conn.cursor() as cursor:
+        cursor.execute(
+            "SELECT message_store.write_message("
+            "gen_random_uuid()::varchar, 'inFlight-1', 'Event1', '{}')"
+        )
+    yield conn
+
+    if not conn.closed:
+        conn.rollback()
+        conn.close()
+
+
 class TestReadAll:
     def test_reading_all_streams(self, client):
         client.write("stream1-123", "Event1", {"foo": "bar"})
@@ -18,3 +43,134 @@ class TestReadAll:
         assert len(messages) == 5
         messages = client.read("$all", position=5, no_of_messages=2)
         assert len(messages) == 2
+
+
+class TestReadAllAPI:
+    def test_messages_are_in_global_position_order(self, client):
+        for i in range(5):
+            client.write(f"stream{i % 2}-123", "Event1", {"i": i})
+
+        messages = client.read_all()
+        assert [message["global_position"] for message in messages] == [1, 2, 3, 4, 5]
+
+    def test_paging_by_global_position(self, client):
+        for i in range(5):
+            client.write("stream1-123", "Event1", {"i": i})
+
+        messages = client.read_all(position=2, no_of_messages=2)
+        assert [message["global_position"] for message in messages] == [3, 4]
+
+    def test_category_filter(self, client):
+        client.write("stream1-123", "Event1", {})
+        client.write("stream2-123", "Event1", {})
+        client.write("stream1-456", "Event1", {})
+
+        messages = client.read_all(category="stream1")
+        assert [message["stream_name"] for message in messages] == [
+            "stream1-123",
+            "stream1-456",
+        ]
+
+        messages = client.read_all(position=1, category="stream1")
+        assert [message["global_position"] for message in messages] == [3]
+
+    def test_invalid_parameters_raise_error(self, client):
+        with pytest.raises(ValueError):
+            client.read_all(category="stream1-123")
+
+        with pytest.raises(ValueError) as exc:
+            client.read_all(gap_timeout=-1)
+        assert exc.value.args[0] == "gap_timeout must be >= 0, got -1"
+
+    def test_gaps_are_ignored_by_default(self, client, in_flight_write):
+        client.write("stream1-123", "Event1", {})
+
+        messages = client.read_all()
+        assert [message["global_position"] for message in messages] == [2]
+
+    def test_rolled_back_position_is_skipped_after_the_timeout(
+        self, client, in_flight_write
+    ):
+        client.write("stream1-123", "Event1", {})  # Global position 2
+        in_flight_write.rollback()
+        client.write("stream1-123", "Event1", {})  # Global position 3
+
+        # Position 1 was rolled back: wait for it, then skip it
+        started = time.monotonic()
+        messages = client.read_all(gap_timeout=0.1)
+        assert time.monotonic() - started >= 0.1
+        assert [message["global_position"] for message in messages] == [2, 3]
+
+    def test_read_returns_messages_before_a_gap(self, client):
+        client.write("stream1-123", "Event1", {})  # Global position 1
+
+        conn = psycopg2.connect(CONNECT_URL)
+        try:
+            with conn.cursor() as cursor:
+                cursor.execute(
+                    "SELECT message_store.write_message("
+                    "gen_random_uuid()::varchar, 'inFlight-1', 'Event1', '{}')"
+                )
+            client.write("stream1-123", "Event1", {})  # Global position 3
+
+            messages = client.read_all(gap_timeout=10)
+            assert [message["global_position"] for message in messages] == [1]
+
+            messages = client.read_all(category="stream1", gap_timeout=10)
+            assert [message["global_position"] for message in messages] == [1]
+        finally:
+            conn.rollback()
+            conn.close()
+
+    def test_read_waits_for_a_gap_to_be_filled(self, client, in_flight_write):
+        client.write("stream1-123", "Event1", {})  # Global position 2
+
+        threading.Timer(0.05, in_flight_write.commit).start()
+        messages = client.read_all(gap_timeout=5)
+
+        assert [message["global_position"] for message in messages] == [1, 2]
+        assert messages[0]["stream_name"] == "inFlight-1"
+
+    def test_read_skips_a_gap_after_the_timeout(self, client, in_flight_write):
+        client.write("stream1-123", "Event1", {})  # Global position 2
+
+        messages = client.read_all(category="stream1", gap_timeout=0.05)
+        assert [message["global_position"] for message in messages] == [2]
+
+    def test_foreign_rolled_back_position_is_skipped_with_category(self, client):
+        client.write("stream1-123", "Event1", {})  # Global position 1
+
+        conn = psycopg2.connect(CONNECT_URL)
+        with conn.cursor() as cursor:
+            cursor.execute(
+                "SELECT message_store.write_message("
+                "gen_random_uuid()::varchar, 'inFlight-1', 'Event1', '{}')"
+            )
+        conn.rollback()
+        conn.close()
+        client.write("stream2-123", "Event1", {})  # Global position 3
+
+        # Position 2 belonged to another category, but might have been stream2's
+        messages = client.read_all(category="stream2", gap_timeout=0.1)
+        assert [message["global_position"] for message in messages] == [3]
+
+        messages = list(client.iter_all(category="stream2", gap_timeout=0.1))
+        assert [message["global_position"] for message in messages] == [3]
+
+    def test_iter_all_with_category(self, client):
+        for i in range(5):
+            client.write(f"stream{i % 2}-123", "Event1", {"i": i})
+
+        messages = list(client.iter_all(batch_size=2, category="stream0"))
+        assert [message["data"]["i"] for message in messages] == [0, 2, 4]
+
+    def test_iter_all_with_gap_timeout(self, client, in_flight_write):
+        client.write("stream1-123", "Event1", {})
+        client.write("stream1-123", "Event1", {})
+
+        messages = list(client.iter_all(batch_size=1, gap_timeout=0.05))
+        assert [message["global_position"] for message in messages] == [2, 3]
+
+    def test_iter_all_message_types_cannot_be_combined(self, client):
+        with pytest.raises(ValueError):
+            client.iter_all(message_types=["Event1"], category="stream1")
@@ -0,0 +1,154 @@
+import io
+
+import pytest
+
+from message_db.client import MessageDB
+from message_db.connection import ConnectionPool
+
+URL = "postgresql://message_store@localhost:5432/message_store"
+
+
+def acquired(pool):
+    return pool.stats()["acquired"]
+
+
+@pytest.fixture
+def pools():
+    # The replicas are connections to the same database, told apart by their pools
+    primary = ConnectionPool.from_url(URL, max_connections=4)
+    replicas = [ConnectionPool.from_url(URL, max_connections=4) for _ in range(2)]
+    yield primary, replicas
+
+    primary.closeall()
+    for replica in replicas:
+        replica.closeall()
+
+
+def make_client(pools, **kwargs):
+    primary, replicas = pools
+    return MessageDB(connection_pool=primary, read_pools=replicas, **kwargs)
+
+
+class TestReadReplicaConstruction:
+    def test_invalid_read_your_writes_throws_error(self, pools):
+        with pytest.raises(ValueError) as exc:
+            make_client(pools, read_your_writes=0)
+
+        assert exc.value.args[0] == "read_your_writes must be > 0, got 0"
+
+    def test_invalid_replica_wait_timeout_throws_error(self, pools):
+        with pytest.raises(ValueError) as exc:
+            make_client(pools, read_your_writes=1.0, replica_wait_timeout=-1)
+
+        assert exc.value.args[0] == "replica_wait_timeout must be >= 0, got -1"
+
+    def test_from_url_creates_read_pools(self):
+        client = MessageDB.from_url(URL, read_urls=[URL, URL], max_connections=2)
+        try:
+            assert len(client.read_pools) == 2
+            assert all(pool.max_connections == 2 for pool in client.read_pools)
+        finally:
+            client.connection_pool.closeall()
+            for pool in client.read_pools:
+                pool.closeall()
+
+
+class TestReadReplicaRouting:
+    def test_writes_go_to_the_primary(self, pools):
+        primary, replicas = pools
+        client = make_client(pools)
+
+        client.write("testStream-1", "Event1", {})
+        client.write_batch("testStream-1", [("Event2", {})])
+
+        assert acquired(primary) == 2
+        assert [acquired(replica) for replica in replicas] == [0, 0]
+
+    def test_reads_are_balanced_over_the_replicas(self, pools):
+        primary, replicas = pools
+        client = make_client(pools)
+        client.write("testStream-1", "Event1", {"key": "value"})
+
+        messages = client.read_stream("testStream-1")
+        client.read_category("testStream")
+        client.read_all()
+        client.stream_identifiers("testStream")
+
+        assert messages[0]["data"] == {"key": "value"}
+        assert acquired(primary) == 1
+        assert [acquired(replica) for replica in replicas] == [2, 2]
+
+    def test_iterators_and_exports_read_from_the_replicas(self, pools):
+        primary, replicas = pools
+        client = make_client(pools)
+        client.write("testStream-1", "Event1", {})
+
+        assert len(list(client.iter_read("testStream-1"))) == 1
+        assert list(client.iter_stream_identifiers("testStream")) == ["1"]
+        client.export("testStream-1", io.BytesIO())
+
+        assert acquired(primary) == 1
+        assert sum(acquired(replica) for replica in replicas) == 3
+
+    def test_stream_version_reads_from_the_primary(self, pools):
+        primary, replicas = pools
+        client = make_client(pools)
+
+        assert client.stream_version("testStream-1") == -1
+        assert acquired(primary) == 1
+        assert sum(acquired(replica) for replica in replicas) == 0
+
+    def test_without_read_pools_reads_go_to_the_primary(self, pools):
+        primary, _ = pools
+        client = MessageDB(connection_pool=primary)
+
+        client.read_stream("testStream-1")
+
+        assert acquired(primary) == 1
+
+
+class TestReadYourWrites:
+    def test_recently_written_stream_is_read_from_the_primary(self, pools):
+        primary, replicas = pools
+        client = make_client(pools, read_your_writes=60.0)
+        client.write("testStream-1", "Event1", {})
+
+        assert len(client.read_stream("testStream-1")) == 1
+        assert client.read_last_message("testStream-1") is not None
+        assert acquired(primary) == 3
+
+        client.read_stream("testStream-2")
+        client.read_category("testStream")
+        assert sum(acquired(replica) for replica in replicas) == 2
+
+    def test_read_streams_with_a_recent_write_reads_from_the_primary(self, pools):
+        primary, replicas = pools
+        client = make_client(pools, read_your_writes=60.0)
+        client.write("testStream-1", "Event1", {})
+
+        client.read_streams(["testStream-1", "testStream-2"])
+
+        assert acquired(primary) == 2
+        assert sum(acquired(replica) for replica in replicas) == 0
+
+    def test_waits_for_a_replica_that_caught_up(self, pools):
+        primary, replicas = pools
+        client = make_client(pools, read_your_writes=60.0, replica_wait_timeout=1.0)
+        client.write("testStream-1", "Event1", {})
+
+        assert len(client.read_stream("testStream-1")) == 1
+        assert acquired(primary) == 1
+        # One checkout to check the version, one to read
+        assert sum(acquired(replica) for replica in replicas) == 2
+
+    def test_falls_back_to_the_primary_when_the_replica_lags(self, pools):
+        primary, replicas = pools
+        client = make_client(pools, read_your_writes=60.0, replica_wait_timeout=0.05)
+        client.write("testStream-1", "Event1", {})
+        # A write the replicas have not received yet
+        client.recent_writes.set("testStream-1", 5)
+
+        client.read_stream("testStream-1")
+
+        assert acquired(primary) == 2
+        assert sum(acquired(replica) for replica in replicas) == 1
@@ -0,0 +1,67 @@
+import pytest
+
+
+class TestReadStreams:
+    def test_category_name_raises_error(self, client):
+        with pytest.raises(ValueError) as exc:
+            client.read_streams(["testStream-1", "testStream"])
+
+        assert exc.value.args[0] == "testStream is not a stream"
+
+    def test_empty_list_returns_empty_dict(self, client):
+        assert client.read_streams([]) == {}
+
+    def test_reads_each_stream_in_order(self, client):
+        for index in range(3):
+            client.write("testStream-1", "Event1", {"index": index})
+            client.write("testStream-2", "Event1", {"index": index})
+
+        messages = client.read_streams(["testStream-2", "testStream-1"])
+
+        assert list(messages) == ["testStream-2", "testStream-1"]
+        for stream_name in messages:
+            assert [message["data"]["index"] for message in messages[stream_name]] == [
+                0,
+                1,
+                2,
+            ]
+            assert messages[stream_name] == client.read_stream(stream_name)
+
+    def test_streams_without_messages_map_to_empty_lists(self, client):
+        client.write("testStream-1", "Event1", {"foo": "bar"})
+
+        messages = client.read_streams(["testStream-1", "testStream-2"])
+
+        assert len(messages["testStream-1"]) == 1
+        assert messages["testStream-2"] == []
+
+    def test_duplicate_stream_names_are_read_once(self, client):
+        client.write("testStream-1", "Event1", {"foo": "bar"})
+
+        messages = client.read_streams(["testStream-1", "testStream-1"])
+
+        assert len(messages["testStream-1"]) == 1
+
+    def test_position_and_limit_apply_to_each_stream(self, client):
+        for index in range(5):
+            client.write("testStream-1", "Event1", {"index": index})
+            client.write("testStream-2", "Event1", {"index": index})
+
+        messages = client.read_streams(
+            ["testStream-1", "testStream-2"], position=2, no_of_messages=2
+        )
+
+        for stream_name in messages:
+            assert [message["position"] for message in messages[stream_name]] == [2, 3]
+
+    def test_positions_by_stream_name(self, client):
+        for index in range(3):
+            client.write("testStream-1", "Event1", {"index": index})
+            client.write("testStream-2", "Event1", {"index": index})
+
+        messages = client.read_streams(
+            ["testStream-1", "testStream-2"], position={"testStream-2": 2}
+        )
+
+        assert len(messages["testStream-1"]) == 3
+        assert [message["position"] for message in messages["testStream-2"]] == [2]
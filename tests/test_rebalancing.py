@@ -0,0 +1,202 @@
+import threading
+import time
+
+import psycopg2
+import pytest
+
+from message_db.migrations import (
+    install_consumer_group_leases,
+    uninstall_consumer_group_leases,
+)
+from message_db.rebalancing import ConsumerGroupLease, RebalancingSubscription
+
+
+@pytest.fixture(autouse=True)
+def lease_tables():
+    conn = psycopg2.connect(
+        dbname="message_store", user="postgres", port=5432, host="localhost"
+    )
+    install_consumer_group_leases(conn)
+    yield
+    uninstall_consumer_group_leases(conn)
+    conn.close()
+
+
+def make_lease(client, member_id, lease_duration=10.0):
+    return ConsumerGroupLease(
+        client.connection_pool, "testGroup", member_id, lease_duration
+    )
+
+
+def assignment_of(assignment):
+    return (assignment.member, assignment.size, assignment.position)
+
+
+class TestConsumerGroupLease:
+    def test_invalid_lease_duration_throws_error(self, client):
+        with pytest.raises(ValueError) as exc:
+            make_lease(client, "a", lease_duration=0)
+
+        assert exc.value.args[0] == "lease_duration must be > 0, got 0"
+
+    def test_single_member_is_assigned_the_whole_group(self, client):
+        lease = make_lease(client, "a")
+
+        assignment = lease.heartbeat()
+
+        assert assignment_of(assignment) == (0, 1, 0)
+        assert not lease.expired()
+
+    def test_heartbeat_keeps_the_assignment(self, client):
+        lease = make_lease(client, "a")
+        first = lease.heartbeat()
+
+        second = lease.heartbeat(position=5)
+
+        assert second.generation == first.generation
+        assert assignment_of(second) == (0, 1, 5)
+
+    def test_joining_member_waits_for_the_others_to_hand_over(self, client):
+        a, b = make_lease(client, "a"), make_lease(client, "b")
+        a.heartbeat()
+
+        assert b.heartbeat() is None
+
+        assert assignment_of(a.heartbeat(position=5)) == (0, 2, 5)
+        assert assignment_of(b.heartbeat()) == (1, 2, 5)
+
+    def test_next_generation_starts_at_the_lowest_position(self, client):
+        a, b = make_lease(client, "a"), make_lease(client, "b")
+        a.heartbeat()
+        b.heartbeat()
+        a.heartbeat()
+        b.heartbeat()
+        a.record_position(7)
+        b.record_position(4)
+
+        c = make_lease(client, "c")
+        assert c.heartbeat() is None
+        assert a.heartbeat(position=9) is None
+        assert assignment_of(b.heartbeat(position=6)) == (1, 3, 6)
+
+        assert assignment_of(c.heartbeat()) == (2, 3, 6)
+        assert assignment_of(a.heartbeat()) == (0, 3, 6)
+
+    def test_leaving_member_hands_its_position_over(self, client):
+        a, b = make_lease(client, "a"), make_lease(client, "b")
+        a.heartbeat()
+        b.heartbeat()
+        a.heartbeat()
+
+        a.leave(position=3)
+
+        assert a.assignment is None
+        assert assignment_of(b.heartbeat(position=8)) == (0, 1, 3)
+
+    def test_expired_member_is_removed(self, client):
+        a, b = make_lease(client, "a"), make_lease(client, "b", lease_duration=0.2)
+        a.heartbeat()
+        b.heartbeat()
+        a.heartbeat()
+        b.heartbeat()
+        b.record_position(2)
+
+        time.sleep(0.3)
+
+        assert b.expired()
+        assert assignment_of(a.heartbeat(position=10)) == (0, 1, 2)
+
+    def test_expired_member_cannot_record_its_position(self, client):
+        a, b = make_lease(client, "a", lease_duration=0.2), make_lease(client, "b")
+        a.heartbeat()
+        time.sleep(0.3)
+        b.heartbeat()
+
+        assert a.record_position(5) is False
+        assert a.assignment is None
+
+
+class TestRebalancingSubscription:
+    def test_consumer_group_options_are_rejected(self, client):
+        with pytest.raises(ValueError) as exc:
+            RebalancingSubscription(
+                client, "rebalanced", print, "testSubscriber", consumer_group_size=2
+            )
+
+        assert (
+            exc.value.args[0] == "consumer_group_size is assigned by the consumer group"
+        )
+
+    def test_invalid_heartbeat_interval_throws_error(self, client):
+        with pytest.raises(ValueError):
+            RebalancingSubscription(
+                client,
+                "rebalanced",
+                print,
+                "testSubscriber",
+                lease_duration=1.0,
+                heartbeat_interval=1.0,
+            )
+
+    def test_members_share_the_category_after_a_rebalance(self, client):
+        handled = []
+        lock = threading.Lock()
+
+        def make_subscription(member_id):
+            def handle(message):
+                with lock:
+                    handled.append((member_id, message["global_position"]))
+
+            return RebalancingSubscription(
+                client,
+                "rebalanced",
+                handle,
+                "testSubscriber",
+                member_id=member_id,
+                lease_duration=1.0,
+                heartbeat_interval=0.05,
+                poll_interval=0.02,
+                max_poll_interval=0.05,
+                batch_size=5,
+            )
+
+        def wait_for(count):
+            deadline = time.monotonic() + 10
+            while time.monotonic() < deadline:
+                with lock:
+                    if len({position for _, position in handled}) >= count:
+                        return
+                time.sleep(0.02)
+            raise AssertionError(f"Expected {count} messages, handled {handled}")
+
+        for i in range(20):
+            client.write(f"rebalanced-{i}", "Written", {"i": i})
+
+        subscriptions = [make_subscription("a")]
+        threads = [threading.Thread(target=subscriptions[0].start)]
+        threads[0].start()
+        try:
+            wait_for(20)
+
+            subscriptions.append(make_subscription("b"))
+            threads.append(threading.Thread(target=subscriptions[1].start))
+            threads[1].start()
+
+            deadline = time.monotonic() + 10
+            while subscriptions[1].assignment is None:
+                assert time.monotonic() < deadline, "The group did not rebalance"
+                time.sleep(0.02)
+
+            for i in range(20):
+                client.write(f"rebalanced-{i}", "Written", {"i": i})
+            wait_for(40)
+        finally:
+            for subscription in subscriptions:
+                subscription.stop()
+            for thread in threads:
+                thread.join()
+
+        positions = {position for _, position in handled}
+        assert positions == set(range(1, 41))
+        assert {member for member, position in handled if position > 20} == {"a", "b"}
+        assert subscriptions[0].assignment is None
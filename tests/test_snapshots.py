@@ -0,0 +1,209 @@
+import pytest
+
+from message_db.cache import StreamCache
+from message_db.client import MessageDB
+from message_db.codec import RawCodec
+from message_db.message import Entity
+
+CONNECT_URL = "postgresql://message_store@localhost:5432/message_store"
+
+
+def deposit(client, amount, stream_name="account-123"):
+    return client.write(stream_name, "Deposited", {"amount": amount})
+
+
+def balance(entity):
+    state = entity.snapshot or {"balance": 0}
+    return state["balance"] + sum(
+        message["data"]["amount"] for message in entity.messages
+    )
+
+
+class TestLoadEntity:
+    def test_invalid_names_raise_error(self, client):
+        with pytest.raises(ValueError) as exc:
+            client.load_entity("account-1", "123")
+
+        assert exc.value.args[0] == "account-1 is not a category"
+
+        with pytest.raises(ValueError) as exc:
+            client.load_entity("account", "")
+
+        assert exc.value.args[0] == "Entity identifier must not be empty"
+
+    def test_empty_entity(self, client):
+        entity = client.load_entity("account", "123")
+
+        assert entity.stream_name == "account-123"
+        assert entity.snapshot is None
+        assert entity.snapshot_version is None
+        assert entity.messages == []
+        assert entity.version == -1
+
+    def test_entity_without_snapshot_reads_whole_stream(self, client):
+        for amount in [10, 20, 30]:
+            deposit(client, amount)
+
+        entity = client.load_entity("account", "123")
+
+        assert len(entity.messages) == 3
+        assert entity.version == 2
+        assert balance(entity) == 60
+
+    def test_entity_reads_messages_after_snapshot(self, client):
+        for amount in [10, 20, 30]:
+            deposit(client, amount)
+        client.write_snapshot(client.load_entity("account", "123"), {"balance": 60})
+        deposit(client, 40)
+
+        entity = client.load_entity("account", "123")
+
+        assert entity.snapshot == {"balance": 60}
+        assert entity.snapshot_version == 2
+        assert [message["position"] for message in entity.messages] == [3]
+        assert entity.version == 3
+        assert balance(entity) == 100
+
+    def test_entity_with_up_to_date_snapshot(self, client):
+        deposit(client, 10)
+        client.write_snapshot(client.load_entity("account", "123"), {"balance": 10})
+
+        entity = client.load_entity("account", "123")
+
+        assert entity.messages == []
+        assert entity.version == 0
+
+    def test_latest_snapshot_is_used(self, client):
+        deposit(client, 10)
+        client.write_snapshot(client.load_entity("account", "123"), {"balance": 10})
+        deposit(client, 20)
+        client.write_snapshot(client.load_entity("account", "123"), {"balance": 30})
+
+        entity = client.load_entity("account", "123")
+
+        assert entity.snapshot == {"balance": 30}
+        assert entity.snapshot_version == 1
+
+    def test_snapshot_without_version_is_ignored(self, client):
+        for amount in [10, 20]:
+            deposit(client, amount)
+        client.write("account:snapshot-123", "SNAPSHOT", {"balance": 30})
+
+        entity = client.load_entity("account", "123")
+
+        assert entity.snapshot is None
+        assert entity.snapshot_version is None
+        assert balance(entity) == 30
+
+    def test_entity_messages_are_read_page_by_page(self, client, monkeypatch):
+        monkeypatch.setattr("message_db.client.LOAD_ENTITY_BATCH_SIZE", 2)
+        for amount in range(1, 6):
+            deposit(client, amount)
+
+        entity = client.load_entity("account", "123")
+
+        assert [message["position"] for message in entity.messages] == [0, 1, 2, 3, 4]
+        assert balance(entity) == 15
+
+    def test_entity_messages_are_read_through_the_stream_cache(self):
+        client = MessageDB.from_url(CONNECT_URL, stream_cache=StreamCache())
+        try:
+            deposit(client, 10)
+            client.load_entity("account", "123")
+
+            assert "account-123" in client.stream_cache
+        finally:
+            client.connection_pool.closeall()
+
+    def test_entity_version_can_be_used_as_expected_version(self, client):
+        deposit(client, 10)
+        entity = client.load_entity("account", "123")
+
+        client.write("account-123", "Deposited", {"amount": 5}, None, entity.version)
+
+        with pytest.raises(ValueError):
+            client.write(
+                "account-123", "Deposited", {"amount": 5}, None, entity.version
+            )
+
+    def test_snapshots_are_excluded_from_stream_identifiers(self, client):
+        deposit(client, 10)
+        client.write_snapshot(client.load_entity("account", "123"), {"balance": 10})
+
+        assert client.stream_identifiers("account") == ["123"]
+
+    def test_raw_codec_snapshots(self):
+        client = MessageDB.from_url(CONNECT_URL, codec=RawCodec())
+        try:
+            deposit(client, 10)
+            client.write_snapshot(
+                client.load_entity("account", "123"), '{"balance": 10}'
+            )
+
+            entity = client.load_entity("account", "123")
+        finally:
+            client.connection_pool.closeall()
+
+        assert entity.snapshot_version == 0
+        assert entity.snapshot == '{"balance": 10}'
+
+
+class TestWriteSnapshot:
+    def test_snapshot_is_written_to_snapshot_stream(self, client):
+        deposit(client, 10)
+        entity = client.load_entity("account", "123")
+
+        client.write_snapshot(entity, {"balance": 10})
+
+        snapshot = client.read_last_message("account:snapshot-123")
+        assert snapshot["type"] == "SNAPSHOT"
+        assert snapshot["data"] == {"balance": 10}
+        assert snapshot["metadata"] == {"version": 0}
+
+    def test_snapshot_updates_entity(self, client):
+        for amount in [10, 20]:
+            deposit(client, amount)
+        entity = client.load_entity("account", "123")
+
+        client.write_snapshot(entity, {"balance": 10}, version=0)
+
+        assert entity.snapshot == {"balance": 10}
+        assert entity.snapshot_version == 0
+        assert [message["position"] for message in entity.messages] == [1]
+        assert balance(entity) == 30
+
+    def test_empty_entity_is_not_snapshotted(self, client):
+        entity = client.load_entity("account", "123")
+
+        assert client.write_snapshot(entity, {"balance": 0}) is None
+        assert client.read_last_message("account:snapshot-123") is None
+
+    def test_snapshot_every_n_messages(self, client):
+        snapshots = []
+        for amount in range(1, 8):
+            deposit(client, amount)
+            entity = client.load_entity("account", "123")
+            position = client.write_snapshot(
+                entity, {"balance": balance(entity)}, every=3
+            )
+            if position is not None:
+                snapshots.append(entity.snapshot_version)
+
+        assert snapshots == [2, 5]
+        assert balance(client.load_entity("account", "123")) == 28
+
+    def test_invalid_interval_raises_error(self, client):
+        deposit(client, 10)
+        entity = client.load_entity("account", "123")
+
+        with pytest.raises(ValueError) as exc:
+            client.write_snapshot(entity, {"balance": 10}, every=0)
+
+        assert exc.value.args[0] == "every must be > 0, got 0"
+
+
+class TestEntity:
+    def test_version(self):
+        assert Entity("account-1").version == -1
+        assert Entity("account-1", {}, 4).version == 4
+        assert Entity("account-1", {}, 4, [{"position": 5}]).version == 5
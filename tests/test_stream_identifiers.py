@@ -1,5 +1,8 @@
+import psycopg2
 import pytest
 
+from message_db.migrations import install_stream_name_index, uninstall_stream_name_index
+
 
 class TestStreamIdentifiers:
     def test_stream_name_raises_error(self, client):
@@ -48,3 +51,67 @@ class TestStreamIdentifiers:
 
         identifiers = client.stream_identifiers("testCategory")
         assert identifiers == ["alpha", "bravo", "charlie"]
+
+
+@pytest.fixture
+def stream_name_index():
+    conn = psycopg2.connect(
+        dbname="message_store", user="postgres", port=5432, host="localhost"
+    )
+    install_stream_name_index(conn)
+    yield
+
+    uninstall_stream_name_index(conn)
+    conn.close()
+
+
+class TestIterStreamIdentifiers:
+    def test_stream_name_raises_error(self, client):
+        with pytest.raises(ValueError) as exc:
+            client.iter_stream_identifiers("testStream-123")
+
+        assert exc.value.args[0] == "testStream-123 is not a category"
+
+    def test_invalid_batch_size_raises_error(self, client):
+        with pytest.raises(ValueError) as exc:
+            client.iter_stream_identifiers("testCategory", batch_size=0)
+
+        assert exc.value.args[0] == "batch_size must be > 0, got 0"
+
+    def test_returns_empty_for_no_messages(self, client):
+        assert list(client.iter_stream_identifiers("testCategory")) == []
+
+    def test_pages_through_unique_identifiers(self, client):
+        for identifier in ["d", "b", "a", "c", "b", "e"]:
+            client.write(f"testCategory-{identifier}", "Event1", {"k": "v"})
+
+        identifiers = list(client.iter_stream_identifiers("testCategory", batch_size=2))
+
+        assert identifiers == ["a", "b", "c", "d", "e"]
+
+    def test_excludes_other_categories_and_snapshot_streams(self, client):
+        client.write("testCategory-id1", "Event1", {"k": "v"})
+        client.write("testCategory:snapshot-id1", "SNAPSHOT", {"k": "v"})
+        client.write("testCategoryOther-id2", "Event1", {"k": "v"})
+
+        assert list(client.iter_stream_identifiers("testCategory")) == ["id1"]
+
+    def test_after_and_limit(self, client):
+        for identifier in ["a", "b", "c", "d", "e"]:
+            client.write(f"testCategory-{identifier}", "Event1", {"k": "v"})
+
+        identifiers = client.iter_stream_identifiers(
+            "testCategory", after="b", limit=2, batch_size=1
+        )
+
+        assert list(identifiers) == ["c", "d"]
+
+    def test_matches_stream_identifiers_with_index(self, client, stream_name_index):
+        for index in range(20):
+            client.write(f"testCategory-{index}", "Event1", {"k": "v"})
+            client.write(f"testCategory-{index}+part", "Event1", {"k": "v"})
+
+        identifiers = list(client.iter_stream_identifiers("testCategory", batch_size=7))
+
+        assert identifiers == client.stream_identifiers("testCategory")
+        assert len(identifiers) == 40
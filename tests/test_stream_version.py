@@ -0,0 +1,145 @@
+import time
+
+import pytest
+
+from message_db.cache import VersionCache
+from message_db.client import MessageDB, version_from_error
+
+CONNECT_URL = "postgresql://message_store@localhost:5432/message_store"
+
+
+@pytest.fixture
+def cached_client():
+    client = MessageDB.from_url(CONNECT_URL, version_cache=VersionCache())
+    yield client
+
+    client.connection_pool.closeall()
+
+
+class TestStreamVersion:
+    def test_empty_stream_version(self, client):
+        assert client.stream_version("testStream-123") == -1
+
+    def test_stream_version_is_last_position(self, client):
+        for _ in range(3):
+            client.write("testStream-123", "Event1", {"foo": "bar"})
+
+        assert client.stream_version("testStream-123") == 2
+
+    def test_stream_version_can_be_used_as_expected_version(self, client):
+        client.write("testStream-123", "Event1", {"foo": "bar"})
+
+        position = client.write(
+            "testStream-123",
+            "Event1",
+            {"foo": "bar"},
+            expected_version=client.stream_version("testStream-123"),
+        )
+
+        assert position == 1
+
+
+class TestVersionCache:
+    def test_invalid_parameters_raise_error(self):
+        with pytest.raises(ValueError) as exc:
+            VersionCache(max_streams=0)
+        assert exc.value.args[0] == "max_streams must be > 0, got 0"
+
+        with pytest.raises(ValueError) as exc:
+            VersionCache(ttl=0)
+        assert exc.value.args[0] == "ttl must be > 0, got 0"
+
+    def test_versions_expire(self):
+        cache = VersionCache(ttl=0.05)
+        cache.set("testStream-1", 3)
+        assert cache.get("testStream-1") == 3
+
+        time.sleep(0.1)
+
+        assert cache.get("testStream-1") is None
+        assert len(cache) == 0
+
+    def test_least_recently_used_streams_are_evicted(self):
+        cache = VersionCache(max_streams=2)
+        cache.set("testStream-1", 1)
+        cache.set("testStream-2", 2)
+        cache.get("testStream-1")
+        cache.set("testStream-3", 3)
+
+        assert "testStream-1" in cache
+        assert "testStream-2" not in cache
+        assert "testStream-3" in cache
+
+    def test_invalidate_and_clear(self):
+        cache = VersionCache()
+        cache.set("testStream-1", 1)
+        cache.set("testStream-2", 2)
+
+        cache.invalidate("testStream-1")
+        assert cache.get("testStream-1") is None
+
+        cache.clear()
+        assert len(cache) == 0
+
+
+class TestCachedStreamVersion:
+    def test_version_is_cached(self, cached_client, client):
+        cached_client.write("testStream-123", "Event1", {"foo": "bar"})
+        cached_client.version_cache.clear()
+        assert cached_client.stream_version("testStream-123") == 0
+
+        client.write("testStream-123", "Event1", {"foo": "bar"})
+
+        assert cached_client.stream_version("testStream-123") == 0
+        assert cached_client.version_cache.hits == 1
+
+    def test_writes_update_the_cache(self, cached_client):
+        cached_client.write("testStream-123", "Event1", {"foo": "bar"})
+        assert cached_client.version_cache.get("testStream-123") == 0
+
+        cached_client.write_batch(
+            "testStream-123", [("Event1", {"foo": "bar"}), ("Event1", {"foo": "bar"})]
+        )
+        assert cached_client.version_cache.get("testStream-123") == 2
+
+    def test_wrong_expected_version_corrects_the_cache(self, cached_client, client):
+        cached_client.write("testStream-123", "Event1", {"foo": "bar"})
+        client.write("testStream-123", "Event1", {"foo": "bar"})
+
+        with pytest.raises(ValueError):
+            cached_client.write(
+                "testStream-123",
+                "Event1",
+                {"foo": "bar"},
+                expected_version=cached_client.stream_version("testStream-123"),
+            )
+
+        assert cached_client.stream_version("testStream-123") == 1
+
+    def test_wrong_expected_version_in_batch_corrects_the_cache(
+        self, cached_client, client
+    ):
+        client.write("testStream-123", "Event1", {"foo": "bar"})
+
+        with pytest.raises(ValueError):
+            cached_client.write_batch(
+                "testStream-123", [("Event1", {"foo": "bar"})], expected_version=-1
+            )
+
+        assert cached_client.version_cache.get("testStream-123") == 0
+
+    def test_missing_stream_is_cached(self, cached_client):
+        assert cached_client.stream_version("testStream-123") == -1
+        assert cached_client.version_cache.get("testStream-123") == -1
+
+
+class TestVersionFromError:
+    def test_parses_wrong_expected_version_errors(self):
+        exc = ValueError(
+            "P0001-ERROR:  Wrong expected version: 3 (Stream: testStream-1, Stream Version: -1)"
+        )
+
+        assert version_from_error(exc) == ("testStream-1", -1)
+
+    def test_ignores_other_errors(self):
+        assert version_from_error(ValueError("No messages to write")) is None
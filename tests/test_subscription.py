@@ -0,0 +1,180 @@
+import threading
+import time
+
+import pytest
+
+from message_db.subscription import Subscription
+
+
+def make_subscription(client, handler=None, **kwargs):
+    received = []
+    subscription = Subscription(
+        client,
+        "testStream",
+        handler or received.append,
+        "testSubscriber",
+        **kwargs,
+    )
+    return subscription, received
+
+
+class TestSubscriptionConstruction:
+    def test_subscribing_to_a_stream_throws_error(self, client):
+        with pytest.raises(ValueError) as exc:
+            Subscription(client, "testStream-123", print, "testSubscriber")
+
+        assert exc.value.args[0] == "testStream-123 is not a category"
+
+    def test_invalid_consumer_group_throws_error(self, client):
+        with pytest.raises(ValueError):
+            Subscription(
+                client, "testStream", print, "testSubscriber", consumer_group_member=0
+            )
+
+    def test_position_stream_name(self, client):
+        subscription, _ = make_subscription(client)
+
+        assert subscription.position_stream_name == "testStream:position-testSubscriber"
+
+    def test_position_stream_name_for_consumer_group_member(self, client):
+        subscription, _ = make_subscription(
+            client, consumer_group_member=1, consumer_group_size=3
+        )
+
+        assert (
+            subscription.position_stream_name == "testStream:position-testSubscriber-1"
+        )
+
+
+class TestSubscriptionPolling:
+    def test_poll_dispatches_messages_in_order(self, client):
+        for index in range(3):
+            client.write(f"testStream-{index}", "Event1", {"index": index})
+        subscription, received = make_subscription(client)
+
+        assert subscription.poll() == 3
+
+        assert [message["data"]["index"] for message in received] == [0, 1, 2]
+        assert subscription.position == 3
+
+    def test_poll_continues_from_last_processed_position(self, client):
+        subscription, received = make_subscription(client)
+        client.write("testStream-1", "Event1", {"index": 0})
+        subscription.poll()
+
+        client.write("testStream-1", "Event1", {"index": 1})
+        subscription.poll()
+
+        assert [message["data"]["index"] for message in received] == [0, 1]
+
+    def test_position_is_recorded_every_update_interval(self, client):
+        for index in range(5):
+            client.write("testStream-1", "Event1", {"index": index})
+        subscription, _ = make_subscription(client, position_update_interval=2)
+
+        subscription.poll()
+
+        recorded = client.read_stream(subscription.position_stream_name)
+        assert [message["data"]["position"] for message in recorded] == [2, 4]
+        assert recorded[0]["type"] == "Recorded"
+
+    def test_position_is_loaded_from_position_stream(self, client):
+        for index in range(4):
+            client.write("testStream-1", "Event1", {"index": index})
+        client.write("testStream:position-testSubscriber", "Recorded", {"position": 2})
+        subscription, received = make_subscription(client)
+
+        assert subscription.load_position() == 2
+        subscription.poll()
+
+        assert [message["data"]["index"] for message in received] == [2, 3]
+
+    def test_poll_with_consumer_group_only_receives_member_streams(self, client):
+        for index in range(10):
+            client.write(f"testStream-{index}", "Event1", {"index": index})
+        received = []
+        for member in range(2):
+            Subscription(
+                client,
+                "testStream",
+                received.append,
+                "testSubscriber",
+                consumer_group_member=member,
+                consumer_group_size=2,
+            ).poll()
+
+        assert sorted(message["data"]["index"] for message in received) == list(
+            range(10)
+        )
+
+
+class TestAdaptivePolling:
+    def test_poll_interval_backs_off_when_idle(self, client):
+        subscription, _ = make_subscription(
+            client, poll_interval=0.1, max_poll_interval=0.5, backoff_multiplier=2
+        )
+
+        intervals = []
+        for _ in range(4):
+            subscription.poll()
+            intervals.append(subscription.poll_interval)
+
+        assert intervals == [0.2, 0.4, 0.5, 0.5]
+
+    def test_poll_interval_resets_when_messages_arrive(self, client):
+        subscription, _ = make_subscription(client, poll_interval=0.1)
+        subscription.poll()
+        subscription.poll()
+
+        client.write("testStream-1", "Event1", {"index": 0})
+        subscription.poll()
+
+        assert subscription.poll_interval == 0.1
+
+    def test_full_batch_is_followed_by_immediate_read(self, client):
+        for index in range(3):
+            client.write("testStream-1", "Event1", {"index": index})
+        subscription, _ = make_subscription(client, batch_size=2)
+
+        subscription.poll()
+
+        assert subscription.poll_interval == 0.0
+
+
+class TestSubscriptionLifecycle:
+    def test_start_processes_messages_until_stopped(self, client):
+        for index in range(5):
+            client.write("testStream-1", "Event1", {"index": index})
+        subscription, received = make_subscription(
+            client, poll_interval=0.01, max_poll_interval=0.05
+        )
+
+        thread = threading.Thread(target=subscription.start)
+        thread.start()
+
+        deadline = time.monotonic() + 5
+        while len(received) < 5 and time.monotonic() < deadline:
+            time.sleep(0.01)
+        subscription.stop()
+        thread.join(timeout=5)
+
+        assert not thread.is_alive()
+        assert len(received) == 5
+        last = client.read_last_message(subscription.position_stream_name)
+        assert last["data"]["position"] == 5
+
+    def test_position_is_recorded_when_handler_fails(self, client):
+        for index in range(3):
+            client.write("testStream-1", "Event1", {"index": index})
+
+        def handler(message):
+            if message["data"]["index"] == 2:
+                raise RuntimeError("handler failed")
+
+        subscription, _ = make_subscription(client, handler=handler)
+
+        with pytest.raises(RuntimeError):
+            subscription.start()
+
+        last = client.read_last_message(subscription.position_stream_name)
+        assert last["data"]["position"] == 2
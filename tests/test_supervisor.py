@@ -0,0 +1,157 @@
+import functools
+import os
+import threading
+import time
+
+import pytest
+
+from message_db.supervisor import ConsumerSupervisor
+
+URL = "postgresql://message_store@localhost:5432/message_store"
+
+
+def record(path, message):
+    """Handler of the workers: append the member's pid and the message position."""
+    with open(path, "a") as file:
+        file.write(f"{os.getpid()} {message['global_position']}\n")
+
+
+def crash_once(path, marker, message):
+    """Handler that exits the worker on the first `Crash` message it sees."""
+    if message["type"] == "Crash" and not os.path.exists(marker):
+        open(marker, "w").close()
+        raise RuntimeError("Handler crashed")
+    record(path, message)
+
+
+def read_records(path):
+    if not os.path.exists(path):
+        return []
+    with open(path) as file:
+        return [tuple(map(int, line.split())) for line in file]
+
+
+def wait_for_records(path, count, timeout=30.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        records = read_records(path)
+        if len(records) >= count:
+            return records
+        time.sleep(0.05)
+    raise AssertionError(f"Expected {count} records, got {read_records(path)}")
+
+
+@pytest.fixture
+def run_supervisor():
+    supervisors = []
+
+    def run(supervisor):
+        thread = threading.Thread(target=supervisor.run, args=(0.05,))
+        thread.start()
+        supervisors.append((supervisor, thread))
+        return thread
+
+    yield run
+
+    for supervisor, thread in supervisors:
+        supervisor.stop()
+        thread.join()
+
+
+def make_supervisor(handler, **kwargs):
+    kwargs.setdefault("processes", 2)
+    kwargs.setdefault("poll_interval", 0.05)
+    kwargs.setdefault("max_poll_interval", 0.1)
+    return ConsumerSupervisor(
+        URL,
+        "supervised",
+        handler,
+        "testSubscriber",
+        client_options={"max_connections": 2},
+        **kwargs,
+    )
+
+
+class TestConsumerSupervisorConstruction:
+    def test_supervising_a_stream_throws_error(self):
+        with pytest.raises(ValueError) as exc:
+            ConsumerSupervisor(URL, "supervised-1", print, "testSubscriber")
+
+        assert exc.value.args[0] == "supervised-1 is not a category"
+
+    def test_invalid_number_of_processes_throws_error(self):
+        with pytest.raises(ValueError) as exc:
+            ConsumerSupervisor(URL, "supervised", print, "testSubscriber", processes=0)
+
+        assert exc.value.args[0] == "processes must be > 0, got 0"
+
+    def test_consumer_group_options_are_rejected(self):
+        with pytest.raises(ValueError) as exc:
+            ConsumerSupervisor(
+                URL, "supervised", print, "testSubscriber", consumer_group_member=0
+            )
+
+        assert (
+            exc.value.args[0] == "consumer_group_member is assigned by the supervisor"
+        )
+
+    def test_processes_default_to_cpu_count(self):
+        supervisor = ConsumerSupervisor(URL, "supervised", print, "testSubscriber")
+
+        assert supervisor.processes == (os.cpu_count() or 1)
+
+
+class TestConsumerSupervisor:
+    def test_workers_share_the_category(self, client, tmp_path, run_supervisor):
+        path = str(tmp_path / "records")
+        for i in range(20):
+            client.write(f"supervised-{i}", "Written", {"i": i})
+
+        run_supervisor(make_supervisor(functools.partial(record, path)))
+        records = wait_for_records(path, 20)
+
+        positions = sorted(position for _, position in records)
+        assert positions == list(range(1, 21))
+        assert len({pid for pid, _ in records}) == 2
+
+    def test_positions_are_recorded_per_member_on_stop(
+        self, client, tmp_path, run_supervisor
+    ):
+        path = str(tmp_path / "records")
+        for i in range(10):
+            client.write(f"supervised-{i}", "Written", {"i": i})
+
+        supervisor = make_supervisor(functools.partial(record, path))
+        thread = run_supervisor(supervisor)
+        wait_for_records(path, 10)
+        supervisor.stop()
+        thread.join()
+
+        assert supervisor.workers == {}
+        for member in range(2):
+            position = client.read_last_message(
+                f"supervised:position-testSubscriber-{member}"
+            )
+            assert position is not None
+            assert position["data"]["position"] > 0
+
+    def test_crashed_worker_is_restarted_and_resumes(
+        self, client, tmp_path, run_supervisor
+    ):
+        path = str(tmp_path / "records")
+        marker = str(tmp_path / "crashed")
+        client.write("supervised-1", "Written", {})
+        client.write("supervised-1", "Crash", {})
+        client.write("supervised-1", "Written", {})
+
+        supervisor = make_supervisor(
+            functools.partial(crash_once, path, marker),
+            processes=1,
+            restart_delay=0.1,
+        )
+        run_supervisor(supervisor)
+        records = wait_for_records(path, 3)
+
+        assert [position for _, position in records] == [1, 2, 3]
+        assert records[0][0] != records[1][0]  # Processed by the restarted worker
+        assert supervisor.restarts == {0: 1}
@@ -36,6 +36,50 @@ class TestMessageWrite:
 
         assert last_position == 3
 
+    def test_write_message_batch_with_metadata(self, client):
+        events = [
+            ("Event1", {"foo1": "bar1"}, {"trace_id": "t1"}),
+            ("Event2", {"foo2": "bar2"}),
+        ]
+
+        client.write_batch("testStream-123", events)
+
+        messages = client.read("testStream-123")
+        assert [message["position"] for message in messages] == [0, 1]
+        assert [message["type"] for message in messages] == ["Event1", "Event2"]
+        assert messages[0]["metadata"] == {"trace_id": "t1"}
+        assert messages[1]["metadata"] is None
+
+    def test_write_message_batch_with_expected_version(self, client):
+        client.write("testStream-123", "Event0", {"foo": "bar"})
+
+        last_position = client.write_batch(
+            "testStream-123",
+            [("Event1", {"foo": "bar"}), ("Event2", {"foo": "bar"})],
+            expected_version=0,
+        )
+
+        assert last_position == 2
+
+    def test_write_message_batch_is_atomic_on_expected_version_mismatch(self, client):
+        client.write("testStream-123", "Event0", {"foo": "bar"})
+
+        with pytest.raises(ValueError) as exc:
+            client.write_batch(
+                "testStream-123",
+                [("Event1", {"foo": "bar"}), ("Event2", {"foo": "bar"})],
+                expected_version=5,
+            )
+
+        assert "Wrong expected version: 5" in exc.value.args[0]
+        assert len(client.read("testStream-123")) == 1
+
+    def test_write_empty_message_batch_raises_error(self, client):
+        with pytest.raises(ValueError) as exc:
+            client.write_batch("testStream-123", [])
+
+        assert exc.value.args[0] == "No messages to write"
+
     def test_write_failure_on_no_result_returned_after_cursor_execution(self, client):
         with pytest.raises(ValueError) as exc:
             client.write("testStream-123", "Event1", {"foo": "bar"}, expected_version=1)